@@ -8,8 +8,11 @@ which provides estimated processing timelines for various USCIS forms.
 import os
 from uscis import create_app
 
-# Create application instance with appropriate configuration
-app = create_app(os.getenv('FLASK_CONFIG', 'default'))
+# Create application instance with appropriate configuration.
+# Chart render workers are spawned processes that re-import this module as
+# __mp_main__; they must not build (and start scraping for) their own app.
+if __name__ != '__mp_main__':
+    app = create_app(os.getenv('FLASK_CONFIG', 'default'))
 
 if __name__ == '__main__':
     # Run the application with debug mode enabled for development
@@ -0,0 +1,107 @@
+"""
+Benchmark for timeline chart rendering.
+
+Renders a series of distinct chart specs with render_chart_file (PNG, with
+the configured encoding, as the app writes charts) and render_chart_svg and
+reports the per-chart render time of each, then the
+mean chart size as a default matplotlib PNG, as an optimized (palette
+quantized) PNG and as WebP and AVIF.
+
+Usage:
+    python benchmarks/bench_chart_render.py [--charts 50]
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+import config
+from uscis.services.timeline import generate_timeline, add_day_offsets
+from uscis.services.visualization import (
+    build_chart_spec, render_chart_file, render_chart_svg, encode_chart_png
+)
+from uscis.services.chart_encoding import transcode_chart, format_supported
+
+
+def build_specs(count):
+    """Build chart specs for a range of filing dates and processing times."""
+    today = datetime.date.today()
+    specs = []
+    for i in range(count):
+        median_months = 4.0 + (i % 20)
+        data_item = add_day_offsets({
+            "form_number": "I-485",
+            "form_description": "Application to Register Permanent Residence or Adjust Status",
+            "service_center": "National Benefits Center",
+            "min_months": round(median_months * 0.7, 1),
+            "median_months": median_months,
+            "max_months": round(median_months * 1.7, 1),
+            "last_updated": today.strftime("%B %d, %Y")
+        })
+        filing_date = (today - datetime.timedelta(days=7 * i)).isoformat()
+        specs.append(build_chart_spec(generate_timeline(data_item, filing_date, "Family-based"), today))
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--charts", type=int, default=50, help="number of charts to render")
+    args = parser.parse_args()
+    
+    specs = build_specs(args.charts)
+    
+    # render_chart_file reads the PNG encoding options from the app config
+    app = Flask(__name__)
+    app.config.from_object(config.Config)
+    
+    with app.app_context(), tempfile.TemporaryDirectory() as output_dir:
+        # The first render pays one-off setup costs (imports, fonts, templates)
+        start = time.perf_counter()
+        render_chart_file(specs[0], os.path.join(output_dir, "warmup.png"))
+        first_seconds = time.perf_counter() - start
+        
+        timings = []
+        for i, spec in enumerate(specs):
+            start = time.perf_counter()
+            render_chart_file(spec, os.path.join(output_dir, f"chart_{i}.png"))
+            timings.append(time.perf_counter() - start)
+    
+    print(f"First render:        {first_seconds * 1000:.1f} ms")
+    print(f"Median per chart:    {statistics.median(timings) * 1000:.1f} ms")
+    print(f"Mean per chart:      {statistics.mean(timings) * 1000:.1f} ms")
+    print(f"Charts per second:   {len(timings) / sum(timings):.1f}")
+    
+    svg_timings = []
+    for spec in specs:
+        start = time.perf_counter()
+        render_chart_svg(spec)
+        svg_timings.append(time.perf_counter() - start)
+    
+    print(f"SVG median per chart: {statistics.median(svg_timings) * 1e6:.0f} us")
+    print(f"SVG charts per second: {len(svg_timings) / sum(svg_timings):.0f}")
+    
+    sizes = {"default PNG": [], "optimized PNG": []}
+    variant_formats = [chart_format for chart_format in ("webp", "avif") if format_supported(chart_format)]
+    for spec in specs:
+        data, baseline_size = encode_chart_png(spec, {"measure_baseline": True})
+        sizes["default PNG"].append(baseline_size)
+        sizes["optimized PNG"].append(len(data))
+        for chart_format in variant_formats:
+            sizes.setdefault(chart_format.upper(), []).append(len(transcode_chart(data, chart_format)))
+    
+    baseline = statistics.mean(sizes["default PNG"])
+    for name, values in sizes.items():
+        mean_size = statistics.mean(values)
+        print(f"{name + ' mean size:':<26}{mean_size / 1024:.1f} KB ({1 - mean_size / baseline:.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark for concurrent form office scraping.
+
+Runs update_uscis_data against the local USCIS stand-in server (landing
+page, api/formtypes and api/formoffices/<id>, each answered after a fixed
+latency) and compares sequential fetching with the concurrent mode of
+USCISFormScraper, under different settings of the HTTP client's per-host
+token bucket.
+
+Usage:
+    python benchmarks/bench_form_scraper.py [--latency-ms 400] [--workers 4] [--rate 4] [--burst 4]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from create import USCISFormScraper, update_uscis_data
+from uscis.services.http_client import HTTPClient
+from uscis_stand_in import USCISStandIn
+
+
+def time_refresh(stand_in, max_workers, rate, burst):
+    """Run one full form data refresh and return its duration in seconds."""
+    # Each run downloads everything and fetches the form ID index itself instead of
+    # revalidating or reusing what the previous run cached
+    client = HTTPClient(rate_limit=rate, rate_burst=burst)
+    scraper = USCISFormScraper(stand_in.base_url, max_workers=max_workers, cache_folder=None,
+                               http_client=client, form_index_path=None)
+    start = time.perf_counter()
+    data = update_uscis_data(scraper)
+    elapsed = time.perf_counter() - start
+    client.close()
+    assert len(data["form_options"]) == stand_in.form_count and data["service_centers"], "refresh failed"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=400, help="stand-in server latency per request")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent fetches in the concurrent mode")
+    parser.add_argument("--rate", type=float, default=4, help="requests per second per host")
+    parser.add_argument("--burst", type=int, default=4, help="token bucket size")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    stand_in = USCISStandIn(latency=args.latency_ms / 1000)
+    stand_in.start()
+    
+    # update_uscis_data saves its result to the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            runs = [
+                ("Sequential, 1 req/s", 1, 1.0, 1),
+                (f"Sequential, {args.rate:g} req/s", 1, args.rate, 1),
+                (f"{args.workers} workers, {args.rate:g} req/s, no burst", args.workers, args.rate, 1),
+                (f"{args.workers} workers, {args.rate:g} req/s, burst {args.burst}", args.workers, args.rate, args.burst),
+                (f"{args.workers} workers, no rate limit", args.workers, 0, 1)
+            ]
+            for label, workers, rate, burst in runs:
+                print(f"{label + ':':<40}{time_refresh(stand_in, workers, rate, burst):.2f} s")
+        finally:
+            os.chdir(cwd)
+            stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark for the HTML parser backends.
+
+Extracts the form select options from a saved copy of the processing times
+page with every installed backend of uscis.services.html_parsing, after
+checking that they all return the same options, and compares them with
+building a full BeautifulSoup tree with html.parser as scraping used to.
+
+Usage:
+    python benchmarks/bench_html_parsing.py [--repeat 50] [--scale 1]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uscis.services.html_parsing import available_backends, select_options
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "processing_times.html")
+
+
+def load_page(scale):
+    """Load the fixture page, repeating its navigation markup to enlarge it."""
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        html = f.read()
+    if scale > 1:
+        start = html.index("<header class=\"usa-header")
+        end = html.index("</header>", start) + len("</header>")
+        html = html[:end] + html[start:end] * (scale - 1) + html[end:]
+    return html
+
+
+def full_tree_options(html):
+    """Extract the options the way scraping did before: a full html.parser tree of the page."""
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, "html.parser")
+    select = soup.find("select", {"id": "selectForm"})
+    return [(option.get("value") or "", option.text.strip()) for option in select.find_all("option")]
+
+
+def time_call(function, repeat):
+    """Return the mean duration of a call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="extractions per backend")
+    parser.add_argument("--scale", type=int, default=1, help="repeat the page navigation to enlarge the page")
+    args = parser.parse_args()
+    
+    html = load_page(args.scale)
+    backends = available_backends()
+    expected = full_tree_options(html)
+    for backend in backends:
+        assert select_options(html, "selectForm", backend) == expected, f"{backend} extracted different options"
+    
+    print(f"Page: {len(html) / 1024:.1f} KB, {len(expected) - 1} forms, backends: {', '.join(backends)}")
+    baseline = time_call(lambda: full_tree_options(html), args.repeat)
+    print(f"{'Full html.parser tree:':<28}{baseline:8.2f} ms")
+    for backend in backends:
+        elapsed = time_call(lambda: select_options(html, "selectForm", backend), args.repeat)
+        print(f"{backend + ':':<28}{elapsed:8.2f} ms  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
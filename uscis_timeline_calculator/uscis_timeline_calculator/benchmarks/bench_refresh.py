@@ -0,0 +1,100 @@
+"""
+Benchmark for end-to-end scraping refresh throughput.
+
+Runs a full refresh against the local USCIS stand-in server: the processing
+times page through scrape_processing_times, then the form options and the
+offices of every form through USCISFormScraper. The refresh runs once with an
+empty response cache and once with the cache filled, so the second pass
+shows the cost of revalidating unchanged data. Database imports are not
+part of the measurement.
+
+Usage:
+    python benchmarks/bench_refresh.py [--forms 100] [--offices 90] [--latency-ms 50]
+                                       [--error-rate 0.02] [--workers 8] [--rate 0]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+import config
+from create import USCISFormScraper
+from uscis.services.scraping import scrape_processing_times
+from uscis.services.http_cache import configure_http_cache
+from uscis.services.http_client import configure_http_client
+from uscis_stand_in import add_stand_in_arguments, stand_in_from_arguments
+
+
+def refresh_page(app):
+    """Scrape the processing times page and return the duration and outcome."""
+    with app.app_context():
+        start = time.perf_counter()
+        data = scrape_processing_times()
+        elapsed = time.perf_counter() - start
+    outcome = "not modified" if data is None else f"{len(data)} rows" if data else "failed"
+    return elapsed, outcome
+
+
+def refresh_forms(base_url, cache_folder, args):
+    """Scrape the form options and the offices of every form and return the duration and counts."""
+    scraper = USCISFormScraper(base_url, max_workers=args.workers, cache_folder=cache_folder,
+                               form_index_path=None)
+    start = time.perf_counter()
+    form_options = scraper.scrape_form_options()
+    results = scraper.scrape_forms([option["value"] for option in form_options])
+    elapsed = time.perf_counter() - start
+    offices = sum(len(centers) for _, centers in results.values())
+    failed = sum(1 for _, centers in results.values() if not centers)
+    return elapsed, len(form_options), offices, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_stand_in_arguments(parser, latency_ms=50)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent form office fetches")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second per host (0: no rate limit)")
+    parser.add_argument("--burst", type=int, default=4, help="token bucket size")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.ERROR)
+    # Short backoffs, so that injected errors cost retries rather than waiting time
+    client = configure_http_client(pool_size=max(10, args.workers), max_retries=3, backoff_factor=0.05,
+                                   backoff_max=0.5, time_budget=30, timeout=15, rate_limit=args.rate,
+                                   rate_burst=args.burst)
+    
+    with stand_in_from_arguments(args) as stand_in, tempfile.TemporaryDirectory() as cache_dir:
+        print(f"Stand-in: {stand_in.form_count} forms x {stand_in.office_count} offices, "
+              f"{args.latency_ms:g} ms latency, {args.error_rate:.0%} errors")
+        
+        app = Flask(__name__)
+        app.config.from_object(config.TestingConfig)
+        app.config['USCIS_PROCESSING_TIMES_URL'] = stand_in.base_url
+        configure_http_cache(os.path.join(cache_dir, "page"))
+        
+        for label in ("Cold cache", "Warm cache"):
+            stand_in.reset_stats()
+            retries = client.stats()["retries"]
+            page_seconds, page_outcome = refresh_page(app)
+            form_seconds, forms, offices, failed = refresh_forms(stand_in.base_url,
+                                                                 os.path.join(cache_dir, "forms"), args)
+            requests = sum(counters["requests"] for counters in stand_in.stats().values())
+            not_modified = sum(counters["304"] for counters in stand_in.stats().values())
+            total = page_seconds + form_seconds
+            print(f"{label}:")
+            print(f"  processing times page: {page_seconds * 1000:8.1f} ms ({page_outcome})")
+            print(f"  form data:             {form_seconds * 1000:8.1f} ms ({forms} forms, {offices} office rows, "
+                  f"{failed} failed)")
+            print(f"  throughput:            {forms / form_seconds:8.1f} forms/s, {requests / total:.1f} requests/s "
+                  f"({requests} requests, {not_modified} not modified, "
+                  f"{client.stats()['retries'] - retries} retries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for application cold-start time.
+
+Measures, in fresh interpreter processes, how long importing the uscis package
+and running create_app take, and which heavy libraries are loaded by then.
+Database initialization and the initial data refresh are replaced by no-ops so
+that only import and application setup costs are measured.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--config testing] [--max-ms 0]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only be loaded on first use
+HEAVY_MODULES = ["matplotlib", "numpy", "bs4"]
+
+STARTUP_SCRIPT = """
+import sys
+import json
+import time
+
+start = time.perf_counter()
+import uscis
+import_seconds = time.perf_counter() - start
+
+uscis.init_db = lambda: None
+uscis.update_processing_data = lambda: None
+
+start = time.perf_counter()
+uscis.create_app(sys.argv[1])
+create_seconds = time.perf_counter() - start
+
+print(json.dumps({
+    "import": import_seconds,
+    "create_app": create_seconds,
+    "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+}))
+"""
+
+
+def measure_startup(config_name):
+    """Run one cold start in a fresh interpreter and return its measurements."""
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT, config_name, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--config", default="testing", help="configuration passed to create_app")
+    parser.add_argument("--max-ms", type=float, default=0,
+                        help="fail if the median import + create_app time exceeds this (0 disables)")
+    args = parser.parse_args()
+    
+    results = [measure_startup(args.config) for _ in range(args.runs)]
+    import_ms = statistics.median(result["import"] for result in results) * 1000
+    create_ms = statistics.median(result["create_app"] for result in results) * 1000
+    total_ms = statistics.median(result["import"] + result["create_app"] for result in results) * 1000
+    
+    print(f"Median import uscis:  {import_ms:.1f} ms")
+    print(f"Median create_app:    {create_ms:.1f} ms")
+    print(f"Median total:         {total_ms:.1f} ms")
+    print(f"Heavy modules loaded: {', '.join(results[-1]['loaded']) or 'none'}")
+    
+    if args.max_ms and total_ms > args.max_ms:
+        print(f"Startup regression: {total_ms:.1f} ms exceeds the {args.max_ms:.1f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark for the vectorized timeline engine.
+
+Compares generate_timelines_batch against calling generate_timeline once per
+filing, after checking that both produce identical results.
+
+Usage:
+    python benchmarks/bench_timeline_batch.py [--cases 100000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uscis.services.timeline import (
+    generate_timeline, generate_timelines_batch, expand_timeline_batch, add_day_offsets
+)
+
+
+def build_cases(count, seed=42):
+    """Build random processing time rows and filing dates."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    data_items = []
+    filing_dates = []
+    
+    for _ in range(count):
+        median_months = round(rng.uniform(2.0, 30.0), 1)
+        data_items.append(add_day_offsets({
+            "form_number": rng.choice(["I-130", "I-485", "I-765", "N-400", "I-129"]),
+            "form_description": "Benchmark form",
+            "service_center": rng.choice(["California Service Center", "Texas Service Center"]),
+            "min_months": round(median_months * 0.7, 1),
+            "median_months": median_months,
+            "max_months": round(median_months * 1.6, 1),
+            "last_updated": today.strftime("%B %d, %Y")
+        }))
+        filing_dates.append((today - datetime.timedelta(days=rng.randint(-60, 1500))).isoformat())
+    
+    return data_items, filing_dates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100000, help="number of filings to compute")
+    args = parser.parse_args()
+    
+    data_items, filing_dates = build_cases(args.cases)
+    
+    # Verify equivalence on a sample before timing
+    sample = min(args.cases, 5000)
+    batch = generate_timelines_batch(data_items[:sample], filing_dates[:sample])
+    expanded = expand_timeline_batch(batch, data_items[:sample])
+    for data_item, filing_date, batch_timeline in zip(data_items, filing_dates, expanded):
+        if generate_timeline(data_item, filing_date) != batch_timeline:
+            sys.exit(f"Mismatch for {data_item['form_number']} filed {filing_date}")
+    print(f"Verified {sample} timelines match generate_timeline")
+    
+    start = time.perf_counter()
+    for data_item, filing_date in zip(data_items, filing_dates):
+        generate_timeline(data_item, filing_date)
+    scalar_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    generate_timelines_batch(data_items, filing_dates)
+    batch_seconds = time.perf_counter() - start
+    
+    print(f"generate_timeline x {args.cases}: {scalar_seconds:.3f}s")
+    print(f"generate_timelines_batch ({args.cases}): {batch_seconds:.3f}s")
+    print(f"Speedup: {scalar_seconds / batch_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Local stand-in for the USCIS processing times site.
+
+Replays the recorded landing page and API payloads in benchmarks/fixtures so
+that the scraping pipeline (scrape_processing_times, USCISFormScraper,
+api/formtypes and api/formoffices/<id>) can be load-tested and profiled
+without hitting egov.uscis.gov. Latency, error rate and payload scale are
+configurable; forms and offices beyond the recorded ones are synthesized.
+Responses carry an ETag and honor If-None-Match, like the real site.
+
+Used by the scraping benchmarks, or run on its own and point
+USCIS_PROCESSING_TIMES_URL or USCISFormScraper at it:
+    python benchmarks/uscis_stand_in.py [--port 8089] [--forms 100] [--offices 90]
+                                        [--latency-ms 200] [--error-rate 0.02]
+"""
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASE_PATH = "/processing-times/"
+
+SELECT_FORM_PATTERN = re.compile(r'(<select[^>]*id="selectForm"[^>]*>\s*<option value="">[^<]*</option>).*?(\s*</select>)',
+                                 re.DOTALL)
+
+
+def load_fixture(name: str) -> str:
+    """Read a recorded page or payload from benchmarks/fixtures."""
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class USCISStandIn:
+    """
+    Threaded HTTP server answering like the USCIS processing times site.
+    
+    Every request waits latency seconds plus up to jitter seconds, then fails
+    with a 503 (Retry-After: 0) with probability error_rate. Served requests
+    are counted per endpoint.
+    """
+    
+    def __init__(self, forms: Optional[int] = None, offices: Optional[int] = None, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 42,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._build_payloads(forms, offices)
+        
+        stand_in = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                stand_in._handle(self)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        """URL of the processing times page, as configured in USCIS_PROCESSING_TIMES_URL."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+    
+    def _build_payloads(self, forms: Optional[int], offices: Optional[int]) -> None:
+        """Scale the recorded fixtures to the requested number of forms and offices."""
+        form_types: List[Dict[str, Any]] = json.loads(load_fixture("formtypes.json"))
+        form_offices: Dict[str, Any] = json.loads(load_fixture("formoffices.json"))
+        
+        if forms is not None:
+            next_id = max(form["formId"] for form in form_types) + 1
+            form_types = form_types[:forms] + [
+                {"formId": next_id + index, "formName": f"X-{index + 1} | Synthesized form {index + 1}"}
+                for index in range(max(0, forms - len(form_types)))
+            ]
+        if offices is not None:
+            recorded = form_offices["offices"]
+            form_offices["offices"] = recorded[:offices] + [
+                {"officeCode": f"F{index + 1:02d}", "officeName": f"Synthesized Field Office {index + 1}"}
+                for index in range(max(0, offices - len(recorded)))
+            ]
+        
+        options = "".join(
+            f'\n              <option value="{form["formName"].split("|", 1)[0].strip()}">{form["formName"]}</option>'
+            for form in form_types
+        )
+        page = SELECT_FORM_PATTERN.sub(lambda match: match.group(1) + options + match.group(2),
+                                       load_fixture("processing_times.html"), count=1)
+        
+        self.form_count = len(form_types)
+        self.office_count = len(form_offices["offices"])
+        self._form_ids = {str(form["formId"]) for form in form_types}
+        self._page = self._entry("text/html; charset=utf-8", page)
+        self._form_types = self._entry("application/json", json.dumps(form_types))
+        self._form_offices = self._entry("application/json", json.dumps(form_offices))
+    
+    @staticmethod
+    def _entry(content_type: str, body: str) -> Dict[str, Any]:
+        data = body.encode("utf-8")
+        return {"content_type": content_type, "body": data, "etag": f'"{hashlib.sha1(data).hexdigest()[:16]}"'}
+    
+    def _route(self, path: str) -> Optional[Dict[str, Any]]:
+        """Return the payload for a path, or None if the path is unknown."""
+        if path == BASE_PATH:
+            return self._page
+        if path == f"{BASE_PATH}api/formtypes":
+            return self._form_types
+        prefix = f"{BASE_PATH}api/formoffices/"
+        if path.startswith(prefix) and path[len(prefix):] in self._form_ids:
+            return self._form_offices
+        return None
+    
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        path = handler.path.split("?", 1)[0]
+        endpoint = "formoffices" if "/api/formoffices/" in path else path[len(BASE_PATH):] or "page"
+        
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        
+        entry = self._route(path)
+        if entry is None:
+            status = 404
+            self._send(handler, status, b"Not Found", "text/plain")
+        elif fail:
+            status = 503
+            self._send(handler, status, b"Service Unavailable", "text/plain", {"Retry-After": "0"})
+        elif handler.headers.get("If-None-Match") == entry["etag"]:
+            status = 304
+            self._send(handler, status, b"", None, {"ETag": entry["etag"]})
+        else:
+            status = 200
+            self._send(handler, status, entry["body"], entry["content_type"], {"ETag": entry["etag"]})
+        
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, {"requests": 0, "200": 0, "304": 0, "404": 0, "503": 0})
+            counters["requests"] += 1
+            counters[str(status)] += 1
+    
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, body: bytes, content_type: Optional[str],
+              headers: Optional[Dict[str, str]] = None) -> None:
+        handler.send_response(status)
+        if content_type:
+            handler.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        if status != 304:
+            handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if status != 304:
+            handler.wfile.write(body)
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the responses served per endpoint and status."""
+        with self._lock:
+            return {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+    
+    def reset_stats(self) -> None:
+        """Clear the response counters."""
+        with self._lock:
+            self._counters.clear()
+    
+    def start(self) -> str:
+        """Serve in a background thread and return the base URL."""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="uscis-stand-in", daemon=True)
+        self._thread.start()
+        return self.base_url
+    
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __enter__(self) -> "USCISStandIn":
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def add_stand_in_arguments(parser: argparse.ArgumentParser, latency_ms: float = 200) -> None:
+    """Add the stand-in server options to a benchmark's argument parser."""
+    parser.add_argument("--forms", type=int, default=None, help="forms served (default: the recorded ones)")
+    parser.add_argument("--offices", type=int, default=None, help="offices per form (default: the recorded ones)")
+    parser.add_argument("--latency-ms", type=float, default=latency_ms, help="stand-in server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+
+
+def stand_in_from_arguments(args: argparse.Namespace, **kwargs: Any) -> USCISStandIn:
+    """Create a stand-in server from the options added by add_stand_in_arguments."""
+    return USCISStandIn(forms=args.forms, offices=args.offices, latency=args.latency_ms / 1000,
+                        jitter=args.jitter_ms / 1000, error_rate=args.error_rate, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8089, help="port to listen on")
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+    
+    stand_in = stand_in_from_arguments(args, host=args.host, port=args.port)
+    print(f"Serving {stand_in.form_count} forms x {stand_in.office_count} offices at {stand_in.base_url}")
+    try:
+        stand_in.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.server.server_close()
+        for endpoint, counters in sorted(stand_in.stats().items()):
+            print(f"{endpoint}: {counters}")
+
+
+if __name__ == "__main__":
+    main()
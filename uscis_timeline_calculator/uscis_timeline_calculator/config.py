@@ -20,7 +20,55 @@ class Config:
     APP_NAME = 'USCIS Timeline Calculator'
     
     # Data update settings
-    DATA_UPDATE_INTERVAL = timedelta(hours=6)  # Update processing times every 6 hours
+    DATA_UPDATE_INTERVAL = timedelta(hours=6)  # Update processing times every 6 hours (starting interval when adaptive)
+    ADAPTIVE_REFRESH_ENABLED = True  # Schedule refreshes by how often each form/office pair changes
+    DATA_UPDATE_MIN_INTERVAL = timedelta(minutes=30)  # Shortest interval for pairs that keep changing
+    DATA_UPDATE_MAX_INTERVAL = timedelta(hours=24)  # Longest interval stable pairs back off to
+    DATA_UPDATE_HOT_PAIRS = 20  # Most requested form/office pairs weigh more when scheduling scrapes
+    DATA_UPDATE_DUE_FRACTION = 0.5  # Share of traffic-weighted form/office pairs that must be due before a scrape
+    DATA_UPDATE_TRAFFIC_LOOKBACK_DAYS = 7  # Window of user_timelines used to rank pairs by traffic
+    
+    # Caching settings
+    TIMELINE_CACHE_SIZE = 1024  # Maximum number of computed timelines kept in memory
+    
+    # Chart rendering settings
+    CHART_RENDER_MODE = 'inline'  # 'inline' renders in the request thread, 'process' uses a worker pool
+    CHART_RENDER_WORKERS = 2  # Number of chart worker processes
+    CHART_RENDER_MAX_PENDING = 8  # Jobs queued or running before new charts are rejected
+    CHART_RENDER_TIMEOUT = 10  # seconds
+    CHART_FORMAT = 'png'  # 'png' renders with matplotlib, 'svg' uses the lightweight SVG renderer
+    CHART_INLINE_SVG = True  # Embed SVG charts in the results page instead of linking to /charts
+    
+    # Chart serving settings
+    CHART_RENDERING = 'server'  # 'client' draws charts in the browser from /api/timeline-chart-data
+    CHART_STORAGE = 'disk'  # 'disk' writes charts to CHARTS_FOLDER, 'memory' serves them from an in-process cache
+    CHART_MEMORY_CACHE_BYTES = 64 * 1024 * 1024  # Size of the in-memory chart cache
+    CHART_SPILL_TO_DISK = True  # With 'memory' storage, also write charts to CHARTS_FOLDER as a second tier
+    CHART_CACHE_MAX_AGE = 365 * 24 * 3600  # seconds; chart URLs are content-addressed and never change
+    CHART_PNG_COLORS = 32  # Palette size of PNG charts (0 keeps full color)
+    CHART_PNG_COMPRESS_LEVEL = 9  # zlib level for PNG charts (0-9)
+    CHART_NEGOTIATED_FORMATS = ('webp', 'avif')  # Sent instead of PNG when accepted and smaller, in order of preference
+    CHART_AVIF_QUALITY = 60  # AVIF quality (0-100)
+    CHART_ASYNC = False  # Render charts in the background and let the results page poll for them
+    CHART_JOB_WORKERS = 2  # Threads rendering background charts
+    CHART_JOB_MAX_PENDING = 32  # Background jobs queued or running before charts are rendered on request instead
+    CHART_STATUS_MAX_WAIT = 10  # seconds a chart status request may wait (long polling)
+    
+    # Cache warming settings
+    CACHE_WARMING_ENABLED = True  # Pre-compute popular timelines and charts after each data refresh
+    CACHE_WARMING_TOP_N = 200  # Most requested calculations to warm
+    CACHE_WARMING_LOOKBACK_DAYS = 7  # Window of user_timelines used to rank calculations
+    CACHE_WARMING_CPU_BUDGET = 30  # seconds of CPU time per warming run
+    
+    # Chart store settings
+    CHART_STORE_ENABLED = True  # Keep CHARTS_FOLDER within the budget below
+    CHART_STORE_MAX_BYTES = 512 * 1024 * 1024  # 0 disables the byte budget
+    CHART_STORE_MAX_FILES = 20000  # 0 disables the file budget
+    CHART_STORE_SWEEP_INTERVAL = 300  # seconds
+    CHART_STORE_SPEC_CACHE_SIZE = 4096  # Chart specs remembered in memory for re-rendering evicted charts
+    
+    # Startup settings
+    PRELOAD_HEAVY_MODULES = False  # Import matplotlib, NumPy and the HTML parser in create_app instead of on first use
     
     # Logging settings
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -28,7 +76,16 @@ class Config:
     
     # Scraping settings
     SCRAPING_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    SCRAPING_TIMEOUT = 15  # seconds
+    SCRAPING_TIMEOUT = 15  # seconds per attempt
+    SCRAPING_POOL_SIZE = 10  # Kept-alive connections per host in the shared scraping session
+    SCRAPING_MAX_RETRIES = 3  # Retries for connection errors, timeouts and 429/5xx responses
+    SCRAPING_BACKOFF_FACTOR = 0.5  # seconds; base of the exponential backoff (with full jitter)
+    SCRAPING_BACKOFF_MAX = 10  # seconds between two attempts at most
+    SCRAPING_TIME_BUDGET = 60  # seconds per request, including all retries
+    SCRAPING_RATE_LIMIT = 1  # Requests per second per host, as polite as the old fixed delay (token bucket; halved on 429, 0 disables)
+    SCRAPING_RATE_BURST = 1  # Requests per host that may be sent at once after an idle period; raise both per deployment
+    HTTP_CACHE_ENABLED = True  # Send conditional GETs and skip re-importing unchanged pages
+    HTTP_CACHE_FOLDER = 'http_cache'  # ETag/Last-Modified and bodies of scraped responses
     
     # URLs
     USCIS_PROCESSING_TIMES_URL = 'https://egov.uscis.gov/processing-times/'
@@ -69,6 +126,14 @@ class TestingConfig(Config):
     
     # For faster testing
     DATA_UPDATE_INTERVAL = timedelta(minutes=1)
+    DATA_UPDATE_MIN_INTERVAL = timedelta(minutes=1)
+    HTTP_CACHE_FOLDER = 'http_cache_test'
+    
+    # No background threads or disk caches unless a test enables them
+    ADAPTIVE_REFRESH_ENABLED = False
+    CACHE_WARMING_ENABLED = False
+    CHART_STORE_ENABLED = False
+    HTTP_CACHE_ENABLED = False
     
     # Database for testing
     DB_NAME = os.environ.get('DB_NAME', 'uscis_calculator_test')
@@ -81,7 +146,10 @@ class ProductionConfig(Config):
     
     # Production specific settings
     LOG_LEVEL = logging.WARNING
+    CHART_RENDER_MODE = 'process'
+    PRELOAD_HEAVY_MODULES = True  # Load once in the master process when the app is preloaded before forking
     FALLBACK_DATA_PATH = '/var/data/uscis_calculator/fallback_data.json'
+    HTTP_CACHE_FOLDER = '/var/data/uscis_calculator/http_cache'
     CHARTS_FOLDER = '/var/www/uscis_calculator/static/charts'
     
     # Production database
@@ -1,9 +1,13 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 import re
 import logging
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from uscis.services.http_cache import HTTPResponseCache
+from uscis.services.http_client import get_http_client
+from uscis.services.html_parsing import select_options
 
 # Configure logging to show timestamps and log level
 logging.basicConfig(
@@ -12,12 +16,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Forms whose offices are scraped to build the list of service centers
+COMMON_FORMS = ["I-485", "I-130", "I-765", "N-400", "I-90"]
+
 
 class USCISFormScraper:
     """Class to scrape form options, form categories, and service centers from the USCIS website."""
     
-    def __init__(self):
-        self.base_url = "https://egov.uscis.gov/processing-times/"
+    def __init__(self, base_url="https://egov.uscis.gov/processing-times/", max_workers=4,
+                 cache_folder="http_cache", http_client=None,
+                 form_index_path="uscis_form_index.json", form_index_ttl=24 * 3600, parser_backend=None):
+        """
+        Args:
+            base_url (str): Processing times site; the API endpoints live below it
+            max_workers (int): Number of form offices fetched concurrently (1 fetches sequentially)
+            cache_folder (str): Folder for conditional GET revalidation data (None disables the cache)
+            http_client (HTTPClient): Client to send requests with (defaults to the shared scraping client,
+                whose per-host token bucket sets the request rate)
+            form_index_path (str): File the form number to form ID index is persisted in (None keeps it in memory)
+            form_index_ttl (float): Seconds a persisted form ID index is reused before api/formtypes is fetched again
+            parser_backend (str): HTML parser backend, see html_parsing (None picks the fastest installed one)
+        """
+        self.base_url = base_url
         self.headers = {
             "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                            "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -31,12 +51,125 @@ class USCISFormScraper:
         self.form_categories = {}   # Will be stored as a dict; key: form number, value: list of categories
         self.service_centers = []   # A list for service centers (field offices)
         
-        # Use a session to maintain cookies between requests
-        self.session = requests.Session()
+        # Share the pooled, retrying session (and its cookies) with the rest of the scraping code
+        self.http_client = http_client or get_http_client()
+        
+        # Concurrency limit; the HTTP client's rate limiter keeps the requests polite
+        self.max_workers = max(1, max_workers)
+        # Guards the scraped data when forms are fetched concurrently
+        self._lock = threading.Lock()
+        
+        # Unchanged pages and payloads are answered with 304 and read from this cache
+        self.response_cache = HTTPResponseCache(cache_folder) if cache_folder else None
+        
+        # Form number to USCIS form ID, fetched once from api/formtypes and shared by all forms
+        self.form_index_path = form_index_path
+        self.parser_backend = parser_backend
+        self.form_index_ttl = form_index_ttl
+        self._form_index = None
+        self._form_index_lock = threading.Lock()
 
         # API endpoints used by the USCIS site to retrieve additional JSON data
-        self.form_types_api = "https://egov.uscis.gov/processing-times/api/formtypes"
-        self.form_data_api = "https://egov.uscis.gov/processing-times/api/formoffices"
+        self.form_types_api = f"{base_url}api/formtypes"
+        self.form_data_api = f"{base_url}api/formoffices"
+
+    def _get(self, url, endpoint):
+        """
+        Send a GET request through the shared, rate-limited HTTP client.
+        
+        With a response cache the request is conditional, and a resource that
+        has not changed is read from the cache instead of being downloaded.
+        
+        Args:
+            url (str): URL to request
+            endpoint (str): Endpoint name for the cache statistics
+        
+        Returns:
+            tuple: (status code, body text)
+        """
+        if self.response_cache is None:
+            response = self.http_client.get(url, headers=self.headers, timeout=15)
+            return response.status_code, response.text
+        
+        response, not_modified = self.response_cache.fetch(self.http_client.get, url, endpoint,
+                                                           headers=self.headers, timeout=15)
+        if not_modified:
+            cached_text = self.response_cache.cached_text(url)
+            if cached_text is not None:
+                return 200, cached_text
+        return response.status_code, response.text
+
+    def get_form_index(self):
+        """
+        Return the form number to form ID index.
+        
+        The index is built from a single api/formtypes request and reused by
+        every form of the refresh. It is persisted to form_index_path and read
+        back by later refreshes until it is older than form_index_ttl.
+        
+        Returns:
+            dict: Form ID per form number in API order, or None if the form types could not be retrieved
+        """
+        with self._form_index_lock:
+            if self._form_index is None:
+                self._form_index = self._load_form_index() or self._fetch_form_index()
+            return self._form_index
+
+    def _load_form_index(self):
+        """Read the persisted form ID index if it is still within its TTL."""
+        if not self.form_index_path:
+            return None
+        try:
+            with open(self.form_index_path, 'r') as f:
+                data = json.load(f)
+            if time.time() - data["fetched_at"] < self.form_index_ttl and data["base_url"] == self.base_url:
+                logger.info(f"Loaded form ID index for {len(data['form_ids'])} forms from {self.form_index_path}")
+                return data["form_ids"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _fetch_form_index(self):
+        """Build the form ID index from api/formtypes and persist it."""
+        status_code, form_types_text = self._get(self.form_types_api, "formtypes")
+        if status_code != 200:
+            logger.error(f"Failed to retrieve form types. Status code: {status_code}")
+            return None
+        
+        form_ids = {}
+        for form in json.loads(form_types_text):
+            form_name = form.get('formName', '')
+            form_number = form_name.split('|', 1)[0].split()[0] if form_name.strip() else ''
+            # Keep the first ID per form number, like the former linear scan
+            if form_number and form.get('formId') and form_number not in form_ids:
+                form_ids[form_number] = form.get('formId')
+        logger.info(f"Fetched form ID index for {len(form_ids)} forms")
+        
+        if self.form_index_path:
+            try:
+                with open(self.form_index_path, 'w') as f:
+                    json.dump({"fetched_at": time.time(), "base_url": self.base_url, "form_ids": form_ids}, f)
+            except OSError as e:
+                logger.warning(f"Failed to save form ID index: {e}")
+        return form_ids
+
+    def find_form_id(self, form_number):
+        """
+        Look up the USCIS form ID of a form number.
+        
+        Args:
+            form_number (str): e.g., "I-485"
+        
+        Returns:
+            The form ID, or None if the form is unknown or the form types could not be retrieved
+        """
+        form_index = self.get_form_index()
+        if not form_index:
+            return None
+        if form_number in form_index:
+            return form_index[form_number]
+        # Fall back to prefix matching for names that do not start with a bare form number
+        return next((form_id for name, form_id in form_index.items() if name.startswith(form_number)), None)
 
     def scrape_form_options(self):
         """
@@ -49,21 +182,20 @@ class USCISFormScraper:
         """
         try:
             logger.info(f"Attempting to scrape form options from {self.base_url}")
-            response = self.session.get(self.base_url, headers=self.headers, timeout=15)
-            if response.status_code != 200:
-                logger.error(f"Failed to retrieve data. Status code: {response.status_code}")
+            status_code, page = self._get(self.base_url, "form-options")
+            if status_code != 200:
+                logger.error(f"Failed to retrieve data. Status code: {status_code}")
                 return []
 
-            soup = BeautifulSoup(response.text, "html.parser")
-            form_select = soup.find('select', {'id': 'selectForm'})
-            if not form_select:
+            # Only the form select element is extracted from the page
+            options = select_options(page, 'selectForm', self.parser_backend)
+            if options is None:
                 logger.error("Could not find the form select element on the page")
                 return []
 
             form_options = []
-            for option in form_select.find_all('option'):
-                if option.get('value') and option.get('value') != '':
-                    text = option.text.strip()
+            for value, text in options:
+                if value:
                     if '|' in text:
                         form_number, description = text.split('|', 1)
                         form_number = form_number.strip()
@@ -104,30 +236,20 @@ class USCISFormScraper:
         """
         try:
             logger.info(f"Scraping categories and centers for form {form_number}")
-            # First, retrieve form types to get the form ID corresponding to the form number.
-            form_types_response = self.session.get(self.form_types_api, headers=self.headers, timeout=15)
-            if form_types_response.status_code != 200:
-                logger.error(f"Failed to retrieve form types. Status code: {form_types_response.status_code}")
-                return [], []
-            form_types_data = form_types_response.json()
-            form_id = None
-            for form in form_types_data:
-                if form.get('formName', '').startswith(form_number):
-                    form_id = form.get('formId')
-                    break
-
+            # First, look up the form ID corresponding to the form number.
+            form_id = self.find_form_id(form_number)
             if not form_id:
                 logger.error(f"Could not find form ID for {form_number}")
                 return [], []
 
             # Next, retrieve form data (categories and service centers) using the form ID.
             form_data_url = f"{self.form_data_api}/{form_id}"
-            form_data_response = self.session.get(form_data_url, headers=self.headers, timeout=15)
-            if form_data_response.status_code != 200:
-                logger.error(f"Failed to retrieve form data. Status code: {form_data_response.status_code}")
+            status_code, form_data_text = self._get(form_data_url, "formoffices")
+            if status_code != 200:
+                logger.error(f"Failed to retrieve form data. Status code: {status_code}")
                 return [], []
 
-            form_data = form_data_response.json()
+            form_data = json.loads(form_data_text)
 
             # Extract categories
             categories = []
@@ -142,14 +264,36 @@ class USCISFormScraper:
             logger.info(f"Found {len(categories)} categories and {len(service_centers)} service centers for form {form_number}")
 
             # Cache the categories per form and add centers to the overall list
-            self.form_categories[form_number] = categories
-            self.service_centers = list(set(self.service_centers + service_centers))
+            with self._lock:
+                self.form_categories[form_number] = categories
+                self.service_centers = list(set(self.service_centers + service_centers))
             return categories, service_centers
 
         except Exception as e:
             logger.error(f"Exception during categories and centers scraping: {e}")
             return [], []
 
+    def scrape_forms(self, form_numbers):
+        """
+        Retrieve categories and service centers for several forms.
+        
+        Forms are fetched by up to max_workers threads sharing the HTTP client;
+        the client's per-host token bucket keeps the request rate polite.
+        
+        Args:
+            form_numbers (list): Form numbers, e.g. ["I-485", "I-130"]
+        
+        Returns:
+            dict: (categories, service_centers) tuple per form number, in input order
+        """
+        if self.max_workers == 1 or len(form_numbers) < 2:
+            return {form: self.scrape_form_categories_and_centers(form) for form in form_numbers}
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(form_numbers)),
+                                thread_name_prefix="form-scraper") as executor:
+            results = executor.map(self.scrape_form_categories_and_centers, form_numbers)
+            return dict(zip(form_numbers, results))
+
     def get_all_service_centers(self):
         """
         Scrape multiple common forms to compile a comprehensive list of service centers.
@@ -163,12 +307,8 @@ class USCISFormScraper:
             self.scrape_form_options()
 
         # Use a list of common form numbers to aggregate service centers.
-        common_forms = ["I-485", "I-130", "I-765", "N-400", "I-90"]
-        for form in common_forms:
-            _, centers = self.scrape_form_categories_and_centers(form)
+        for _, centers in self.scrape_forms(COMMON_FORMS).values():
             all_centers.update(centers)
-            # Pause briefly to avoid overwhelming the API
-            time.sleep(1)
         self.service_centers = list(all_centers)
         return self.service_centers
 
@@ -281,27 +421,32 @@ def get_hardcoded_service_centers():
     ]
 
 
-def update_uscis_data():
+def update_uscis_data(scraper=None):
     """
     Update USCIS form-related data by scraping the official website.
     
     It will attempt scraping first. If that fails, it will try loading previously saved data.
     If both methods fail, fallback to hard-coded data.
     
+    Args:
+        scraper (USCISFormScraper): Scraper to use, e.g. with custom concurrency (optional)
+    
     Returns:
         dict: A dictionary containing 'form_options', 'form_categories', and 'service_centers'
     """
-    scraper = USCISFormScraper()
+    scraper = scraper or USCISFormScraper()
     
     form_options = scraper.scrape_form_options()
     
     if form_options:
-        # Scrape additional data for a more comprehensive data set.
+        # Scrape additional data for a more comprehensive data set; this also
+        # collects the categories of the common forms
         scraper.get_all_service_centers()
-        for form in ["I-130", "I-485", "I-765", "N-400", "I-90"]:
-            scraper.scrape_form_categories_and_centers(form)
-            time.sleep(1)  # Pause between requests to avoid rate limiting
         scraper.save_data_to_json()
+        if scraper.response_cache is not None:
+            for endpoint, counters in scraper.response_cache.stats()["endpoints"].items():
+                logger.info(f"HTTP cache {endpoint}: {counters['not_modified']}/{counters['requests']} "
+                            f"not modified (hit ratio {counters['hit_ratio']})")
     else:
         if not scraper.load_data_from_json():
             scraper.form_options = get_hardcoded_form_options()
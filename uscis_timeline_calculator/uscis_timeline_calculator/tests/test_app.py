@@ -0,0 +1,77 @@
+# Unit test for __init__.py
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("matplotlib", "numpy", "bs4")
+
+# Creates the testing app without a database or a scrape and reports the loaded heavy modules
+CREATE_APP_SCRIPT = """
+import sys, json
+from unittest import mock
+import uscis
+with mock.patch.object(uscis, 'init_db'), mock.patch.object(uscis, 'update_processing_data'):
+    app = uscis.create_app('testing')
+if len(sys.argv) > 1:
+    app.config['CHART_RENDER_MODE'] = 'inline'
+    uscis.preload_heavy_modules(app)
+print(json.dumps({name: name in sys.modules for name in %r}))
+""" % (HEAVY_MODULES,)
+
+
+# Creates the testing app and reports the background services it started
+BACKGROUND_SCRIPT = """
+import json, threading
+from unittest import mock
+import uscis
+from uscis.services.chart_store import get_chart_store
+from uscis.services.http_cache import get_http_cache
+from uscis.services.refresh_scheduler import get_refresh_scheduler
+with mock.patch.object(uscis, 'init_db'), mock.patch.object(uscis, 'update_processing_data'):
+    uscis.create_app('testing')
+print(json.dumps({
+    "threads": sorted(thread.name for thread in threading.enumerate() if thread is not threading.main_thread()),
+    "services": [service is not None for service in (get_chart_store(), get_http_cache(), get_refresh_scheduler())]
+}))
+"""
+
+
+def run_script(script, *args):
+    """Run a script in a fresh interpreter and return the JSON it printed last."""
+    output = subprocess.run([sys.executable, "-c", script, *args], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def loaded_modules(*args):
+    """Run create_app in a fresh interpreter and return which heavy modules it imported."""
+    return run_script(CREATE_APP_SCRIPT, *args)
+
+
+class LazyImportTest(unittest.TestCase):
+    """Heavy libraries are imported on first use, or up front by preload_heavy_modules."""
+    
+    def test_create_app_does_not_import_heavy_modules(self):
+        self.assertEqual(loaded_modules(), {name: False for name in HEAVY_MODULES})
+    
+    def test_preload_imports_matplotlib_and_numpy(self):
+        loaded = loaded_modules("preload")
+        self.assertTrue(loaded["matplotlib"])
+        self.assertTrue(loaded["numpy"])
+
+
+class TestingConfigTest(unittest.TestCase):
+    """The testing app starts no background threads or disk caches."""
+    
+    def test_no_background_services(self):
+        report = run_script(BACKGROUND_SCRIPT)
+        self.assertEqual(report["threads"], [])
+        self.assertEqual(report["services"], [False, False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
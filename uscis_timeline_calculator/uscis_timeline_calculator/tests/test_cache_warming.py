@@ -0,0 +1,72 @@
+# Unit test for cache_warming.py
+import datetime
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from uscis.services import cache_warming
+from uscis.services.scraping import ProcessingDataSnapshot, generate_simulated_data
+from uscis.services.timeline import timeline_cache
+
+
+def popular_row(form_id, center_name, filing_date, request_count=1):
+    """Build a row as returned by get_popular_timeline_requests."""
+    return {"form_id": form_id, "center_name": center_name, "category_name": None,
+            "filing_date": filing_date, "request_count": request_count}
+
+
+class WarmCachesTest(unittest.TestCase):
+    """Warming recomputes the most requested timelines and pre-renders their missing charts."""
+    
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(CACHE_WARMING_CPU_BUDGET=30, CACHE_WARMING_TOP_N=10,
+                               CACHE_WARMING_LOOKBACK_DAYS=7, CHART_RENDERING='server', CHART_FORMAT='png')
+        self.popular = [
+            popular_row("I-130", "Texas Service Center", datetime.date(2024, 1, 1), 5),
+            popular_row("I-485", "Nebraska Service Center", datetime.date(2024, 2, 1), 3),
+            popular_row("X-1", "Texas Service Center", datetime.date(2024, 3, 1), 2)
+        ]
+        snapshot = ProcessingDataSnapshot(generate_simulated_data(), timeline_cache.data_version)
+        self.chart_available = mock.Mock(side_effect=[True, False])
+        self.render = mock.Mock(return_value="timeline.png")
+        for name, value in (('get_popular_timeline_requests', mock.Mock(return_value=self.popular)),
+                            ('get_processing_snapshot', mock.Mock(return_value=snapshot)),
+                            ('chart_is_available', self.chart_available),
+                            ('timeline_chart_filename', mock.Mock(return_value="timeline.png")),
+                            ('render_timeline_chart', self.render),
+                            ('get_chart_renderer', mock.Mock(return_value=None))):
+            patcher = mock.patch.object(cache_warming, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_warms_timelines_and_renders_missing_charts(self):
+        report = cache_warming.warm_caches(self.app)
+        self.assertEqual((report["candidates"], report["timelines_warmed"], report["charts_rendered"],
+                          report["charts_already_cached"], report["skipped"]), (3, 2, 1, 1, 1))
+        self.assertFalse(report["budget_exhausted"])
+        self.render.assert_called_once()
+        self.assertIs(cache_warming.get_cache_warming_stats()["last_run"], report)
+    
+    def test_stops_when_the_budget_is_spent(self):
+        self.app.config['CACHE_WARMING_CPU_BUDGET'] = 0
+        report = cache_warming.warm_caches(self.app)
+        self.assertTrue(report["budget_exhausted"])
+        self.assertEqual(report["timelines_warmed"], 0)
+    
+    def test_client_side_charts_are_not_rendered(self):
+        self.app.config['CHART_RENDERING'] = 'client'
+        report = cache_warming.warm_caches(self.app)
+        self.assertEqual((report["timelines_warmed"], report["charts_rendered"]), (2, 0))
+        self.render.assert_not_called()
+    
+    def test_server_renders_charts(self):
+        self.assertTrue(cache_warming.server_renders_charts({'CHART_FORMAT': 'png'}))
+        self.assertFalse(cache_warming.server_renders_charts({'CHART_RENDERING': 'client'}))
+        self.assertFalse(cache_warming.server_renders_charts({'CHART_FORMAT': 'svg', 'CHART_INLINE_SVG': True}))
+        self.assertTrue(cache_warming.server_renders_charts({'CHART_FORMAT': 'svg', 'CHART_INLINE_SVG': False}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# Unit test for chart_cache.py
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from uscis.services import visualization
+from uscis.services.chart_cache import ChartCache
+
+
+class ChartCacheTest(unittest.TestCase):
+    """Chart bytes are kept in memory within a byte budget, least recently used first out."""
+    
+    def test_get_and_put(self):
+        cache = ChartCache(max_bytes=100)
+        self.assertIsNone(cache.get("a.png"))
+        cache.put("a.png", b"x" * 10)
+        self.assertEqual(cache.get("a.png"), b"x" * 10)
+        self.assertIn("a.png", cache)
+        stats = cache.stats()
+        self.assertEqual((stats["charts"], stats["bytes"], stats["hits"], stats["misses"]), (1, 10, 1, 1))
+    
+    def test_evicts_least_recently_used(self):
+        cache = ChartCache(max_bytes=30)
+        for name in ("a.png", "b.png", "c.png"):
+            cache.put(name, b"x" * 10)
+        cache.get("a.png")
+        cache.put("d.png", b"x" * 10)
+        self.assertNotIn("b.png", cache)
+        self.assertIn("a.png", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+    
+    def test_replacing_a_chart_updates_the_size(self):
+        cache = ChartCache(max_bytes=100)
+        cache.put("a.png", b"x" * 40)
+        cache.put("a.png", b"x" * 10)
+        self.assertEqual(cache.stats()["bytes"], 10)
+    
+    def test_charts_larger_than_the_cache_are_not_kept(self):
+        cache = ChartCache(max_bytes=10)
+        cache.put("a.png", b"x" * 5)
+        cache.put("b.png", b"x" * 11)
+        self.assertNotIn("b.png", cache)
+        self.assertIn("a.png", cache)
+
+
+class ChartMemoryStorageTest(unittest.TestCase):
+    """With memory storage, charts are served from the cache and spilled to CHARTS_FOLDER."""
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.charts_folder = temp_dir.name
+        self.app = Flask(__name__)
+        self.app.config.update(CHARTS_FOLDER=self.charts_folder, CHART_SPILL_TO_DISK=True)
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        self.cache = ChartCache(max_bytes=10)
+        for name, value in (('get_chart_cache', self.cache), ('get_chart_store', None)):
+            patcher = mock.patch.object(visualization, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_stored_charts_are_cached_and_spilled(self):
+        visualization.store_chart_bytes("a.png", b"chart")
+        self.assertEqual(self.cache.get("a.png"), b"chart")
+        with open(os.path.join(self.charts_folder, "a.png"), "rb") as f:
+            self.assertEqual(f.read(), b"chart")
+    
+    def test_evicted_charts_are_promoted_from_disk(self):
+        visualization.store_chart_bytes("a.png", b"chart")
+        visualization.store_chart_bytes("b.png", b"other")
+        visualization.store_chart_bytes("c.png", b"third")
+        self.assertNotIn("a.png", self.cache)
+        self.assertEqual(visualization.load_chart_bytes("a.png"), b"chart")
+        self.assertIn("a.png", self.cache)
+    
+    def test_missing_charts(self):
+        self.assertIsNone(visualization.load_chart_bytes("missing.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# Unit test for chart_encoding.py
+import io
+import unittest
+
+from PIL import Image, ImageDraw
+from werkzeug.datastructures import MIMEAccept
+
+from uscis.services.chart_encoding import (
+    encode_image, baseline_png_size, transcode_chart, format_supported, negotiate_chart_formats,
+    ChartEncodingStats
+)
+
+
+def chart_image():
+    """Draw a small chart-like RGB image with a few colors and anti-aliased shapes."""
+    image = Image.new("RGB", (200, 80), "white")
+    draw = ImageDraw.Draw(image)
+    draw.line((10, 40, 190, 40), fill="#d6d7d9", width=2)
+    for x, color in ((20, "#205493"), (80, "#0071bc"), (140, "#0071bc")):
+        draw.ellipse((x, 32, x + 16, 48), fill=color)
+    draw.rectangle((80, 10, 156, 70), outline="#02bfe7")
+    return image
+
+
+class EncodeImageTest(unittest.TestCase):
+    """Charts are encoded as palette PNGs and, when supported, WebP or AVIF."""
+    
+    def test_palette_png_is_smaller_than_the_default_png(self):
+        image = chart_image()
+        data = encode_image(image, "png", colors=32)
+        with Image.open(io.BytesIO(data)) as decoded:
+            self.assertEqual(decoded.mode, "P")
+            self.assertEqual(decoded.size, image.size)
+        self.assertLess(len(data), baseline_png_size(image))
+    
+    def test_full_color_png(self):
+        with Image.open(io.BytesIO(encode_image(chart_image(), "png", colors=0))) as decoded:
+            self.assertEqual(decoded.mode, "RGB")
+    
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            encode_image(chart_image(), "gif")
+    
+    def test_transcode_to_supported_formats(self):
+        png_data = encode_image(chart_image(), "png")
+        for chart_format in ("webp", "avif"):
+            if not format_supported(chart_format):
+                continue
+            with Image.open(io.BytesIO(transcode_chart(png_data, chart_format))) as decoded:
+                self.assertEqual(decoded.format, chart_format.upper())
+
+
+class NegotiateChartFormatsTest(unittest.TestCase):
+    """Only formats the client names explicitly are negotiated, in order of preference."""
+    
+    def negotiate(self, accept, formats=("webp", "avif")):
+        return negotiate_chart_formats(MIMEAccept(accept), formats)
+    
+    def test_explicitly_accepted_formats(self):
+        accept = [("image/avif", 1), ("image/webp", 1), ("*/*", 0.8)]
+        expected = [chart_format for chart_format in ("webp", "avif") if format_supported(chart_format)]
+        self.assertEqual(self.negotiate(accept), expected)
+    
+    def test_wildcards_and_rejected_formats_are_ignored(self):
+        self.assertEqual(self.negotiate([("*/*", 1), ("image/*", 1)]), [])
+        self.assertEqual(self.negotiate([("image/webp", 0)]), [])
+    
+    def test_only_candidate_formats(self):
+        self.assertEqual(self.negotiate([("image/webp", 1)], ()), [])
+
+
+class ChartEncodingStatsTest(unittest.TestCase):
+    """Encoded bytes are counted and savings estimated from sampled charts."""
+    
+    def test_sampling(self):
+        stats = ChartEncodingStats(sample_every=2)
+        samples = []
+        for _ in range(4):
+            samples.append(stats.should_sample())
+            stats.record_png(100)
+        self.assertEqual(samples, [True, False, True, False])
+        self.assertFalse(ChartEncodingStats(sample_every=0).should_sample())
+    
+    def test_savings(self):
+        stats = ChartEncodingStats()
+        stats.record_png(100, baseline_size=300)
+        stats.record_png(100)
+        stats.record_variant_served("webp", 100, 60)
+        report = stats.stats()
+        self.assertEqual(report["png_bytes"], 200)
+        self.assertEqual(report["png_compression_ratio"], 3.0)
+        self.assertEqual(report["png_bytes_saved_estimate"], 400)
+        self.assertEqual((report["variants_served"], report["variant_bytes_saved"]), ({"webp": 1}, 40))
+
+
+if __name__ == "__main__":
+    unittest.main()
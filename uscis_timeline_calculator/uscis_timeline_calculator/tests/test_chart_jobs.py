@@ -0,0 +1,53 @@
+# Unit test for chart_jobs.py
+import threading
+import unittest
+
+from uscis.services.chart_jobs import ChartJobQueue, ChartJobsBusy, JOB_READY, JOB_FAILED
+
+
+class ChartJobQueueTest(unittest.TestCase):
+    """Background chart jobs are coalesced by key and bounded in number."""
+    
+    def setUp(self):
+        self.release = threading.Event()
+        self.queue = ChartJobQueue(max_workers=1, max_pending=2)
+        self.addCleanup(self.queue.shutdown)
+        self.addCleanup(self.release.set)
+    
+    def blocked_render(self):
+        self.release.wait(5)
+    
+    def test_identical_jobs_are_coalesced(self):
+        job = self.queue.submit("timeline_a.png", self.blocked_render)
+        self.assertIs(self.queue.submit("timeline_a.png", self.blocked_render), job)
+        self.release.set()
+        self.assertEqual(self.queue.wait("timeline_a.png", 5).status, JOB_READY)
+        stats = self.queue.stats()
+        self.assertEqual((stats["submitted"], stats["coalesced"], stats["completed"]), (1, 1, 1))
+    
+    def test_full_queue_rejects_new_jobs(self):
+        self.queue.submit("timeline_a.png", self.blocked_render)
+        self.queue.submit("timeline_b.png", self.blocked_render)
+        with self.assertRaises(ChartJobsBusy):
+            self.queue.submit("timeline_c.png", self.blocked_render)
+        # Jobs already in flight are still joined
+        self.queue.submit("timeline_a.png", self.blocked_render)
+        self.assertEqual(self.queue.stats()["rejected"], 1)
+        
+        self.release.set()
+        self.queue.wait("timeline_a.png", 5)
+        self.queue.wait("timeline_b.png", 5)
+        self.queue.submit("timeline_c.png", self.blocked_render)
+    
+    def test_failed_jobs_are_reported(self):
+        def fail():
+            raise RuntimeError("render failed")
+        
+        self.queue.submit("timeline_a.png", fail)
+        job = self.queue.wait("timeline_a.png", 5)
+        self.assertEqual((job.status, job.error), (JOB_FAILED, "render failed"))
+        self.assertIsNone(self.queue.get("timeline_b.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
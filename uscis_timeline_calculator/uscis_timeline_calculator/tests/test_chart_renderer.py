@@ -0,0 +1,59 @@
+# Unit test for chart_renderer.py
+import os
+import time
+import tempfile
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+
+from uscis.services.chart_renderer import ChartRenderService, ChartRenderTimeout
+
+
+def crash_once(marker_path):
+    """Kill the worker process the first time it is called, then succeed."""
+    if not os.path.exists(marker_path):
+        open(marker_path, 'w').close()
+        os._exit(1)
+    return 'rendered'
+
+
+def crash():
+    """Kill the worker process."""
+    os._exit(1)
+
+
+class ChartRenderServiceTest(unittest.TestCase):
+    """Jobs run in worker processes; broken and stuck pools are replaced."""
+    
+    def setUp(self):
+        self.service = ChartRenderService(max_workers=1, max_pending=4, timeout=30)
+        self.addCleanup(self.service.shutdown)
+    
+    def test_runs_jobs_in_a_worker(self):
+        self.assertEqual(self.service._run(pow, (2, 10), 'job', None), 1024)
+        self.assertEqual(self.service.stats()['submitted'], 1)
+    
+    def test_broken_pool_is_replaced_and_the_job_retried(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result = self.service._run(crash_once, (os.path.join(temp_dir, 'crashed'),), 'job', None)
+        self.assertEqual(result, 'rendered')
+        self.assertEqual(self.service.stats()['recycled_pools'], 1)
+        self.assertEqual(self.service._run(pow, (2, 3), 'job', None), 8)
+    
+    def test_job_is_retried_only_once(self):
+        with self.assertRaises(BrokenProcessPool):
+            self.service._run(crash, (), 'job', None)
+        self.assertEqual(self.service.stats()['recycled_pools'], 2)
+        self.assertEqual(self.service._run(pow, (2, 3), 'job', None), 8)
+    
+    def test_timed_out_worker_does_not_block_the_next_job(self):
+        with self.assertRaises(ChartRenderTimeout):
+            self.service._run(time.sleep, (30,), 'job', 0.5)
+        start = time.monotonic()
+        self.assertEqual(self.service._run(pow, (2, 3), 'job', 10), 8)
+        self.assertLess(time.monotonic() - start, 10)
+        stats = self.service.stats()
+        self.assertEqual((stats['timed_out'], stats['recycled_pools'], stats['queue_depth']), (1, 1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
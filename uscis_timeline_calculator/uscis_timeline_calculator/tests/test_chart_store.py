@@ -0,0 +1,85 @@
+# Unit test for chart_store.py
+import os
+import time
+import tempfile
+import unittest
+
+from uscis.services.chart_store import ChartStore, chart_key_from_filename, STALE_TEMP_FILE_SECONDS
+
+CHART_KEY = "0123456789abcdef0123456789abcdef"
+
+
+class ChartStoreTest(unittest.TestCase):
+    """The sweeper keeps the chart folders within budget, evicting the least recently used charts."""
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.folder = temp_dir.name
+    
+    def write(self, name, size=100, age=0, folder=None):
+        """Write a file of size bytes, last used age seconds ago."""
+        path = os.path.join(folder or self.folder, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        used = time.time() - age
+        os.utime(path, (used, used))
+        return path
+    
+    def test_chart_key_from_filename(self):
+        self.assertEqual(chart_key_from_filename(f"timeline_{CHART_KEY}.png"), CHART_KEY)
+        self.assertIsNone(chart_key_from_filename("timeline_I-130_20250410210645.png"))
+        self.assertIsNone(chart_key_from_filename(f"timeline_{CHART_KEY}.png.1.2.tmp"))
+    
+    def test_sweep_evicts_least_recently_used_down_to_low_water(self):
+        for index in range(10):
+            self.write(f"timeline_{index:032x}.png", age=100 - index)
+        store = ChartStore(self.folder, max_bytes=0, max_files=5, low_water=0.6)
+        self.assertEqual(store.sweep(), 7)
+        self.assertEqual(sorted(os.listdir(self.folder)), [f"timeline_{index:032x}.png" for index in range(7, 10)])
+        self.assertEqual(store.stats()["files"], 3)
+    
+    def test_sweep_respects_the_byte_budget(self):
+        for index in range(4):
+            self.write(f"timeline_{index:032x}.png", size=1000, age=10 - index)
+        store = ChartStore(self.folder, max_bytes=2500, max_files=0, low_water=1.0)
+        self.assertEqual(store.sweep(), 2)
+        self.assertEqual(store.stats()["bytes"], 2000)
+    
+    def test_sweep_evicts_legacy_chart_names(self):
+        self.write("timeline_I-130_20250410210645.png", age=1000)
+        self.write(f"timeline_{CHART_KEY}.png")
+        self.write("notes.txt", age=2000)
+        store = ChartStore(self.folder, max_bytes=0, max_files=1, low_water=1.0)
+        self.assertEqual(store.sweep(), 1)
+        self.assertEqual(sorted(os.listdir(self.folder)), ["notes.txt", f"timeline_{CHART_KEY}.png"])
+    
+    def test_sweep_removes_stale_temp_files_only(self):
+        self.write(f"timeline_{CHART_KEY}.png.1.2.tmp", age=STALE_TEMP_FILE_SECONDS + 60)
+        self.write(f"timeline_{CHART_KEY}.png.1.3.tmp")
+        ChartStore(self.folder, max_bytes=0, max_files=0).sweep()
+        self.assertEqual(os.listdir(self.folder), [f"timeline_{CHART_KEY}.png.1.3.tmp"])
+    
+    def test_added_folders_share_the_budget(self):
+        with tempfile.TemporaryDirectory() as fallback_folder:
+            self.write(f"timeline_{CHART_KEY}.png")
+            self.write(f"timeline_{1:032x}.png", age=100, folder=fallback_folder)
+            store = ChartStore(self.folder, max_bytes=0, max_files=1, low_water=1.0)
+            store.add_folder(fallback_folder)
+            store.add_folder(os.path.join(fallback_folder, "."))
+            self.assertEqual(len(store.folders), 2)
+            self.assertEqual(store.sweep(), 1)
+            self.assertEqual(os.listdir(fallback_folder), [])
+    
+    def test_record_write_remembers_specs(self):
+        path = self.write(f"timeline_{CHART_KEY}.png")
+        store = ChartStore(self.folder, max_bytes=0, max_files=0, spec_cache_size=1)
+        store.record_write(path, {"title": "chart"})
+        self.assertEqual(store.get_spec(CHART_KEY), {"title": "chart"})
+        store.remember("f" * 32, {"title": "other"})
+        self.assertIsNone(store.get_spec(CHART_KEY))
+        self.assertEqual(store.stats()["files"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# Unit test for create.py
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+from create import USCISFormScraper
+
+BASE_URL = "http://uscis.test/processing-times/"
+
+FORM_TYPES = [
+    {"formId": 1, "formName": "I-130 | Petition for Alien Relative"},
+    {"formId": 2, "formName": "I-485 | Application to Register Permanent Residence or Adjust Status"},
+    {"formId": 3, "formName": "I-765 | Application for Employment Authorization"},
+    {"formId": 4, "formName": "I-765V | Application for Employment Authorization for Abused Spouse"},
+    {"formId": 5, "formName": "I-130 | Duplicate entry"}
+]
+
+
+class FakeHTTPClient:
+    """Answers the USCIS API endpoints from memory, counting requests and concurrency."""
+    
+    def __init__(self, delay=0.0, failing_form_ids=()):
+        self.delay = delay
+        self.failing_form_ids = set(failing_form_ids)
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+    
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.requests.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if url.endswith("api/formtypes"):
+                return SimpleNamespace(status_code=200, text=json.dumps(FORM_TYPES), headers={})
+            form_id = int(url.rsplit("/", 1)[1])
+            if form_id in self.failing_form_ids:
+                return SimpleNamespace(status_code=503, text="", headers={})
+            body = {"formSubTypes": [{"formSubType": f"Category {form_id}"}],
+                    "offices": [{"officeName": "Texas Service Center"}, {"officeName": f"Office {form_id}"}]}
+            return SimpleNamespace(status_code=200, text=json.dumps(body), headers={})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+    
+    def count(self, suffix):
+        return sum(1 for url in self.requests if url.endswith(suffix))
+
+
+def make_scraper(client, **kwargs):
+    kwargs.setdefault("form_index_path", None)
+    return USCISFormScraper(BASE_URL, cache_folder=None, http_client=client, **kwargs)
+
+
+class ScrapeFormsTest(unittest.TestCase):
+    """Form offices are fetched concurrently; results keep the input order."""
+    
+    def test_results_in_input_order(self):
+        client = FakeHTTPClient(delay=0.05)
+        scraper = make_scraper(client, max_workers=4)
+        results = scraper.scrape_forms(["I-765", "I-130", "I-485"])
+        self.assertEqual(list(results), ["I-765", "I-130", "I-485"])
+        self.assertEqual(results["I-130"], (["Category 1"], ["Texas Service Center", "Office 1"]))
+        self.assertGreater(client.max_in_flight, 1)
+        self.assertEqual(sorted(scraper.service_centers),
+                         ["Office 1", "Office 2", "Office 3", "Texas Service Center"])
+        self.assertEqual(scraper.form_categories["I-485"], ["Category 2"])
+    
+    def test_sequential_with_one_worker(self):
+        client = FakeHTTPClient(delay=0.01)
+        make_scraper(client, max_workers=1).scrape_forms(["I-765", "I-130", "I-485"])
+        self.assertEqual(client.max_in_flight, 1)
+    
+    def test_failed_forms_do_not_affect_the_others(self):
+        client = FakeHTTPClient(failing_form_ids=[2])
+        results = make_scraper(client, max_workers=4).scrape_forms(["I-130", "I-485", "X-1"])
+        self.assertEqual(results["I-485"], ([], []))
+        self.assertEqual(results["X-1"], ([], []))
+        self.assertEqual(results["I-130"][0], ["Category 1"])
+
+
+class FormIndexTest(unittest.TestCase):
+    """api/formtypes is fetched once into a form ID index shared by all forms."""
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.index_path = os.path.join(temp_dir.name, "form_index.json")
+    
+    def test_form_types_are_fetched_once_per_refresh(self):
+        client = FakeHTTPClient()
+        make_scraper(client, max_workers=4).scrape_forms(["I-130", "I-485", "I-765"])
+        self.assertEqual(client.count("api/formtypes"), 1)
+    
+    def test_find_form_id(self):
+        scraper = make_scraper(FakeHTTPClient())
+        self.assertEqual(scraper.find_form_id("I-130"), 1)
+        self.assertEqual(scraper.find_form_id("I-765V"), 4)
+        self.assertEqual(scraper.find_form_id("I-76"), 3)
+        self.assertIsNone(scraper.find_form_id("X-1"))
+    
+    def test_persisted_index_is_reused_within_its_ttl(self):
+        make_scraper(FakeHTTPClient(), form_index_path=self.index_path).get_form_index()
+        client = FakeHTTPClient()
+        scraper = make_scraper(client, form_index_path=self.index_path)
+        self.assertEqual(scraper.find_form_id("I-485"), 2)
+        self.assertEqual(client.count("api/formtypes"), 0)
+    
+    def test_expired_index_is_fetched_again(self):
+        make_scraper(FakeHTTPClient(), form_index_path=self.index_path).get_form_index()
+        client = FakeHTTPClient()
+        make_scraper(client, form_index_path=self.index_path, form_index_ttl=0).get_form_index()
+        self.assertEqual(client.count("api/formtypes"), 1)
+    
+    def test_index_of_another_site_is_not_reused(self):
+        make_scraper(FakeHTTPClient(), form_index_path=self.index_path).get_form_index()
+        client = FakeHTTPClient()
+        USCISFormScraper("http://other.test/", cache_folder=None, http_client=client,
+                         form_index_path=self.index_path).get_form_index()
+        self.assertEqual(client.count("api/formtypes"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+# Unit test for database.py
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import psycopg2
+from flask import Flask
+
+from uscis.services import database
+
+
+def mock_connection(rows=()):
+    """Return a mock connection whose cursor fetches the given rows."""
+    cursor = mock.MagicMock()
+    cursor.fetchone.side_effect = list(rows) + [None]
+    cursor.fetchall.return_value = list(rows)
+    conn = mock.MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    return conn, cursor
+
+
+class ChartSpecByHashTest(unittest.TestCase):
+    """Chart specs stored with user timelines are looked up by chart hash."""
+    
+    def test_returns_the_stored_spec(self):
+        conn, cursor = mock_connection([{'chart_spec': {'title': 'chart'}}])
+        with mock.patch.object(database, 'get_db_connection', return_value=conn):
+            self.assertEqual(database.get_chart_spec_by_hash('abc'), {'title': 'chart'})
+        self.assertEqual(cursor.execute.call_args[0][1], ('abc',))
+    
+    def test_unknown_hash(self):
+        conn, _ = mock_connection()
+        with mock.patch.object(database, 'get_db_connection', return_value=conn):
+            self.assertIsNone(database.get_chart_spec_by_hash('abc'))
+    
+    def test_database_unavailable(self):
+        with mock.patch.object(database, 'get_db_connection',
+                               side_effect=psycopg2.OperationalError('connection refused')):
+            self.assertIsNone(database.get_chart_spec_by_hash('abc'))
+
+
+class InitDbTest(unittest.TestCase):
+    """Schema migrations run by init_db."""
+    
+    def executed_sql(self):
+        conn, cursor = mock_connection()
+        with Flask(__name__).app_context(), mock.patch.object(database.psycopg2, 'connect', return_value=conn):
+            database.init_db()
+        return [" ".join(call[0][0].split()) for call in cursor.execute.call_args_list]
+    
+    def test_created_at_is_added_without_backfilling_existing_rows(self):
+        statements = self.executed_sql()
+        add_column = next(sql for sql in statements if "ADD COLUMN IF NOT EXISTS created_at" in sql)
+        self.assertNotIn("DEFAULT", add_column)
+        set_default = statements.index("ALTER TABLE IF EXISTS user_timelines "
+                                       "ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP")
+        self.assertGreater(set_default, statements.index(add_column))
+    
+    def test_popular_requests_ignore_rows_without_created_at(self):
+        conn, cursor = mock_connection()
+        with mock.patch.object(database, 'get_db_connection', return_value=conn):
+            database.get_popular_timeline_requests(10, 7)
+        self.assertIn("ut.created_at IS NOT NULL", cursor.execute.call_args[0][0])
+    
+    def test_popular_requests_database_unavailable(self):
+        with mock.patch.object(database, 'get_db_connection',
+                               side_effect=psycopg2.OperationalError('connection refused')):
+            self.assertIsNone(database.get_popular_timeline_requests(10, 7))
+
+
+def processing_row(form_number, service_center, median_months):
+    return {'form_number': form_number, 'service_center': service_center, 'form_description': form_number,
+            'min_months': 1.0, 'median_months': median_months, 'max_months': 12.0,
+            'last_updated': 'March 5, 2025'}
+
+
+def row_hash(row):
+    return database.processing_time_hash(row['form_number'], row['service_center'], row['form_description'],
+                                         row['min_months'], row['median_months'], row['max_months'])
+
+
+class ImportProcessingTimeChangesTest(unittest.TestCase):
+    """Only processing times that differ from the active rows are imported."""
+    
+    def setUp(self):
+        self.unchanged = processing_row('I-130', 'Texas Service Center', 6.0)
+        self.changed = processing_row('I-485', 'Texas Service Center', 8.0)
+        self.added = processing_row('I-765', 'Texas Service Center', 3.0)
+        self.active = {
+            ('I-130', 'Texas Service Center'): row_hash(self.unchanged),
+            ('I-485', 'Texas Service Center'): row_hash(processing_row('I-485', 'Texas Service Center', 7.0)),
+            ('I-90', 'Texas Service Center'): 'removed'
+        }
+    
+    def run_import(self, active, bulk_result=(2, 0)):
+        with mock.patch.object(database, 'get_active_processing_time_hashes', return_value=active), \
+                mock.patch.object(database, 'bulk_import_processing_times', return_value=bulk_result) as bulk, \
+                mock.patch.object(database, 'touch_processing_times', return_value=1) as touch:
+            counts = database.import_processing_time_changes([self.unchanged, self.changed, self.added])
+        return counts, bulk, touch
+    
+    def test_changed_rows_are_imported_in_one_call(self):
+        counts, bulk, touch = self.run_import(self.active)
+        self.assertEqual(counts, {'added': 1, 'changed': 1, 'unchanged': 1, 'removed': 1, 'errors': 0})
+        bulk.assert_called_once_with([self.changed, self.added])
+        touch.assert_called_once_with([self.unchanged])
+    
+    def test_import_errors_are_counted(self):
+        counts, _, _ = self.run_import(self.active, bulk_result=(1, 1))
+        self.assertEqual(counts['errors'], 1)
+    
+    def test_nothing_is_imported_when_nothing_changed(self):
+        active = {('I-130', 'Texas Service Center'): row_hash(self.unchanged),
+                  ('I-485', 'Texas Service Center'): row_hash(self.changed),
+                  ('I-765', 'Texas Service Center'): row_hash(self.added)}
+        counts, bulk, touch = self.run_import(active)
+        self.assertEqual(counts['unchanged'], 3)
+        bulk.assert_not_called()
+        touch.assert_called_once()
+    
+    def test_every_row_is_imported_when_active_rows_cannot_be_read(self):
+        counts, bulk, touch = self.run_import(None, bulk_result=(3, 0))
+        self.assertEqual(counts['changed'], 3)
+        bulk.assert_called_once_with([self.unchanged, self.changed, self.added])
+        touch.assert_not_called()
+    
+    def test_hash_is_not_rounded(self):
+        self.assertNotEqual(row_hash(processing_row('I-130', 'Texas Service Center', 6.001)),
+                            row_hash(processing_row('I-130', 'Texas Service Center', 6.0)))
+    
+    def test_hash_matches_database_decimals(self):
+        self.assertEqual(database.processing_time_hash('I-130', 'Texas Service Center', 'I-130',
+                                                       Decimal('1.00'), Decimal('6.50'), Decimal('12.00')),
+                         row_hash(processing_row('I-130', 'Texas Service Center', 6.5)))
+    
+    def test_database_unavailable(self):
+        with mock.patch.object(database, 'get_db_connection',
+                               side_effect=psycopg2.OperationalError('connection refused')):
+            self.assertIsNone(database.get_active_processing_time_hashes())
+            self.assertEqual(database.touch_processing_times([self.unchanged]), -1)
+    
+    def test_unchanged_rows_are_touched_in_one_statement(self):
+        conn, cursor = mock_connection()
+        with mock.patch.object(database, 'get_db_connection', return_value=conn), \
+                mock.patch.object(database, 'execute_values') as execute_values:
+            database.touch_processing_times([self.unchanged, self.changed])
+        execute_values.assert_called_once()
+        self.assertEqual(len(execute_values.call_args[0][2]), 2)
+        self.assertEqual(execute_values.call_args[1]['page_size'], 2)
+        conn.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# Unit test for html_parsing.py
+import os
+import unittest
+from unittest import mock
+
+from uscis.services import html_parsing
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(PROJECT_DIR, "benchmarks", "fixtures", "processing_times.html")
+
+PAGE = """
+<html><body>
+  <select id="other"><option value="x">Other</option></select>
+  <select id="selectForm">
+    <option value="">Select a form</option>
+    <option value="I-129F"> I-129F | Petition for Alien Fianc&eacute;(e) </option>
+    <option value="I-130">I-130 | <b>Petition</b> for Alien Relative</option>
+  </select>
+</body></html>
+"""
+
+
+class SelectOptionsTest(unittest.TestCase):
+    """Every installed backend extracts the same select options."""
+    
+    def test_backends_agree_on_the_processing_times_page(self):
+        with open(FIXTURE, encoding="utf-8") as f:
+            html = f.read()
+        results = {backend: html_parsing.select_options(html, "selectForm", backend)
+                   for backend in html_parsing.available_backends()}
+        reference = next(iter(results.values()))
+        self.assertIn(("I-130", "I-130 | Petition for Alien Relative"), reference)
+        for backend, options in results.items():
+            self.assertEqual(options, reference, backend)
+    
+    def test_options_are_decoded_and_stripped(self):
+        for backend in html_parsing.available_backends():
+            self.assertEqual(html_parsing.select_options(PAGE, "selectForm", backend), [
+                ("", "Select a form"),
+                ("I-129F", "I-129F | Petition for Alien Fiancé(e)"),
+                ("I-130", "I-130 | Petition for Alien Relative")
+            ], backend)
+    
+    def test_missing_select(self):
+        for backend in html_parsing.available_backends():
+            self.assertIsNone(html_parsing.select_options(PAGE, "missing", backend), backend)
+
+
+class ParserBackendTest(unittest.TestCase):
+    """The configured backend is validated; 'auto' picks the fastest installed one."""
+    
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            html_parsing.get_parser_backend("html5lib")
+    
+    def test_backend_not_installed(self):
+        with mock.patch.object(html_parsing, "backend_available", return_value=False):
+            with self.assertRaises(ValueError):
+                html_parsing.get_parser_backend("lxml")
+    
+    def test_auto_prefers_the_first_installed_backend(self):
+        with mock.patch.object(html_parsing, "_default_backend", None), \
+                mock.patch.object(html_parsing, "backend_available", side_effect=lambda name: name != "selectolax"):
+            self.assertEqual(html_parsing.get_parser_backend("auto"), "lxml")
+    
+    def test_no_backend_installed(self):
+        with mock.patch.object(html_parsing, "_default_backend", None), \
+                mock.patch.object(html_parsing, "backend_available", return_value=False):
+            with self.assertRaises(ValueError):
+                html_parsing.get_parser_backend()
+
+
+if __name__ == "__main__":
+    unittest.main()
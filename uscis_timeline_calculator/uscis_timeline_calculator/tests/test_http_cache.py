@@ -0,0 +1,83 @@
+# Unit test for http_cache.py
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from uscis.services.http_cache import HTTPResponseCache
+
+URL = "http://uscis.test/processing-times/api/formtypes"
+
+
+class FakeServer:
+    """Answers with an ETag and honors If-None-Match, recording the request headers."""
+    
+    def __init__(self, body="[]", etag='"v1"', last_modified=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+    
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        response_headers = {}
+        if self.etag:
+            response_headers["ETag"] = self.etag
+        if self.last_modified:
+            response_headers["Last-Modified"] = self.last_modified
+        if self.etag and headers.get("If-None-Match") == self.etag:
+            return SimpleNamespace(status_code=304, text="", headers=response_headers)
+        return SimpleNamespace(status_code=200, text=self.body, headers=response_headers)
+
+
+class HTTPResponseCacheTest(unittest.TestCase):
+    """Scraped responses are revalidated with conditional GETs."""
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache = HTTPResponseCache(temp_dir.name)
+    
+    def test_unchanged_response_is_not_modified(self):
+        server = FakeServer(body='[{"formId": 1}]')
+        response, not_modified = self.cache.fetch(server.get, URL, "formtypes", headers={"Accept": "*/*"})
+        self.assertFalse(not_modified)
+        self.assertEqual(response.text, '[{"formId": 1}]')
+        
+        response, not_modified = self.cache.fetch(server.get, URL, "formtypes", headers={"Accept": "*/*"})
+        self.assertTrue(not_modified)
+        self.assertEqual(server.requests[1], {"Accept": "*/*", "If-None-Match": '"v1"'})
+        self.assertEqual(self.cache.cached_text(URL), '[{"formId": 1}]')
+        self.assertEqual(self.cache.stats()["endpoints"]["formtypes"],
+                         {"requests": 2, "not_modified": 1, "hit_ratio": 0.5})
+    
+    def test_changed_response_replaces_the_cached_one(self):
+        server = FakeServer(body="old")
+        self.cache.fetch(server.get, URL, "formtypes")
+        server.body, server.etag = "new", '"v2"'
+        response, not_modified = self.cache.fetch(server.get, URL, "formtypes")
+        self.assertFalse(not_modified)
+        self.assertEqual(self.cache.cached_text(URL), "new")
+        self.assertEqual(self.cache.conditional_headers(URL), {"If-None-Match": '"v2"'})
+    
+    def test_last_modified_is_sent_back(self):
+        server = FakeServer(etag=None, last_modified="Wed, 01 Jan 2025 00:00:00 GMT")
+        self.cache.fetch(server.get, URL, "page")
+        self.assertEqual(self.cache.conditional_headers(URL),
+                         {"If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"})
+    
+    def test_responses_without_validators_are_not_stored(self):
+        server = FakeServer(etag=None)
+        self.cache.fetch(server.get, URL, "page")
+        self.assertIsNone(self.cache.load(URL))
+        self.assertEqual(self.cache.conditional_headers(URL), {})
+    
+    def test_invalidate(self):
+        self.cache.fetch(FakeServer().get, URL, "page")
+        self.cache.invalidate(URL)
+        self.assertIsNone(self.cache.cached_text(URL))
+        self.cache.invalidate(URL)
+
+
+if __name__ == "__main__":
+    unittest.main()
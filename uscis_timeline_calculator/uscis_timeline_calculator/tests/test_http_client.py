@@ -0,0 +1,73 @@
+# Unit test for http_client.py
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+
+from uscis.services.http_client import HTTPClient, HTTPBudgetExceeded
+
+
+def response(status_code, headers=None):
+    return SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def make_client(*outcomes, **kwargs):
+    """Create a client whose session answers with the given responses or raises the given errors."""
+    kwargs.setdefault("backoff_factor", 0.001)
+    kwargs.setdefault("rate_limit", 0)
+    client = HTTPClient(**kwargs)
+    client.session.get = mock.Mock(side_effect=list(outcomes))
+    return client
+
+
+class HTTPClientTest(unittest.TestCase):
+    """Requests are retried with backoff within a time budget."""
+    
+    def test_success_is_returned_immediately(self):
+        client = make_client(response(200))
+        self.assertEqual(client.get("http://uscis.test/").status_code, 200)
+        self.assertEqual(client.stats()["requests"], 1)
+    
+    def test_retries_transient_errors(self):
+        client = make_client(response(503), requests.exceptions.ConnectionError("reset"), response(200))
+        self.assertEqual(client.get("http://uscis.test/").status_code, 200)
+        stats = client.stats()
+        self.assertEqual((stats["requests"], stats["retries"], stats["failures"]), (3, 2, 0))
+    
+    def test_client_errors_are_not_retried(self):
+        client = make_client(response(404))
+        self.assertEqual(client.get("http://uscis.test/").status_code, 404)
+        self.assertEqual(client.session.get.call_count, 1)
+    
+    def test_returns_the_last_error_response(self):
+        client = make_client(*[response(500)] * 3, max_retries=2)
+        self.assertEqual(client.get("http://uscis.test/").status_code, 500)
+        self.assertEqual(client.stats()["failures"], 1)
+    
+    def test_raises_the_last_error_without_a_response(self):
+        client = make_client(*[requests.exceptions.Timeout("slow")] * 2, max_retries=1)
+        with self.assertRaises(requests.exceptions.Timeout):
+            client.get("http://uscis.test/")
+    
+    def test_backoff_stays_within_the_time_budget(self):
+        client = make_client(requests.exceptions.ConnectionError("reset"), response(200),
+                             backoff_factor=10, backoff_max=10, time_budget=0.5)
+        with mock.patch("uscis.services.http_client.random.uniform", return_value=10):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client.get("http://uscis.test/")
+        self.assertEqual(client.stats()["budget_exhausted"], 1)
+    
+    def test_attempt_timeout_is_capped_by_the_budget(self):
+        client = make_client(response(200), timeout=15, time_budget=2)
+        client.get("http://uscis.test/")
+        self.assertLessEqual(client.session.get.call_args[1]["timeout"], 2)
+    
+    def test_budget_exceeded_before_any_attempt(self):
+        client = make_client(response(200), time_budget=0)
+        with self.assertRaises(HTTPBudgetExceeded):
+            client.get("http://uscis.test/")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# Unit test for models.py
+import datetime
+import unittest
+
+from uscis.models import (
+    Timeline, ProcessingTime, format_display_date, parse_display_date
+)
+from uscis.services.timeline import generate_timeline, add_day_offsets
+
+
+def make_timeline(filing_date="2024-01-01"):
+    """Generate a timeline from a processing time row with precomputed day offsets."""
+    return generate_timeline(add_day_offsets({
+        "form_number": "I-485",
+        "form_description": "Application to Register Permanent Residence or Adjust Status",
+        "service_center": "Texas Service Center",
+        "min_months": 4.2,
+        "median_months": 6.0,
+        "max_months": 9.6,
+        "last_updated": "2025-01-01",
+        "receipt_date_for_case_inquiry": "2024-01-01"
+    }), filing_date)
+
+
+class DisplayDateTest(unittest.TestCase):
+    """Dates are formatted once for display and parse back to the same date."""
+    
+    def test_format_and_parse_round_trip(self):
+        value = datetime.date(2025, 1, 5)
+        self.assertEqual(format_display_date(value), "January 05, 2025")
+        self.assertEqual(parse_display_date(format_display_date(value)), value)
+
+
+class ProcessingTimeTest(unittest.TestCase):
+    """Processing times keep the expedited and premium processing flags."""
+    
+    def test_flags_default_to_false(self):
+        processing_time = ProcessingTime(min_months=4.2, median_months=6.0, max_months=9.6)
+        self.assertFalse(processing_time.expedited)
+        self.assertFalse(processing_time.premium_processing)
+    
+    def test_flags_are_serialized(self):
+        processing_time = make_timeline().to_dict()["processing_time"]
+        self.assertEqual(processing_time, {"min_months": 4.2, "median_months": 6.0, "max_months": 9.6,
+                                           "expedited": False, "premium_processing": False})
+
+
+class TimelineDictTest(unittest.TestCase):
+    """Timelines survive a to_dict/from_dict round trip, as stored in the database."""
+    
+    def test_round_trip(self):
+        timeline = make_timeline()
+        self.assertEqual(Timeline.from_dict(timeline.to_dict()), timeline)
+    
+    def test_round_trip_with_flags(self):
+        data = make_timeline().to_dict()
+        data["processing_time"].update(expedited=True, premium_processing=True)
+        processing_time = Timeline.from_dict(data).processing_time
+        self.assertTrue(processing_time.expedited)
+        self.assertTrue(processing_time.premium_processing)
+    
+    def test_dates_are_formatted_for_display(self):
+        data = make_timeline().to_dict()
+        self.assertEqual(data["filing_info"]["filing_date"], "January 01, 2024")
+        self.assertEqual(data["estimated_timeline"]["median_date"], "July 02, 2024")
+
+
+if __name__ == "__main__":
+    unittest.main()
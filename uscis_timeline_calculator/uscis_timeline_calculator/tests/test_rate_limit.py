@@ -0,0 +1,95 @@
+# Unit test for rate_limit.py
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from uscis.services import rate_limit
+from uscis.services.http_client import HTTPClient
+from uscis.services.rate_limit import TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping advances the clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+    """Requests are spaced by the bucket, which slows down when throttled."""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limit, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_burst_is_sent_without_waiting(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+    
+    def test_tokens_refill_at_the_rate(self):
+        bucket = TokenBucket(rate=2, burst=1)
+        bucket.acquire()
+        self.clock.sleep(0.5)
+        self.assertEqual(bucket.acquire(), 0.0)
+    
+    def test_max_wait(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        bucket.acquire()
+        self.assertIsNone(bucket.acquire(max_wait=0.5))
+        self.assertEqual(bucket.stats()["acquired"], 1)
+    
+    def test_throttled_halves_the_rate_down_to_the_minimum(self):
+        bucket = TokenBucket(rate=8)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 4)
+        for _ in range(5):
+            bucket.throttled()
+        self.assertEqual(bucket.rate, 1)
+        self.assertEqual(bucket.stats()["throttled"], 6)
+    
+    def test_retry_after_pauses_the_bucket(self):
+        bucket = TokenBucket(rate=10, burst=5)
+        bucket.throttled(retry_after=3)
+        self.assertIsNone(bucket.acquire(max_wait=2))
+        self.assertAlmostEqual(bucket.acquire(), 3 + 1 / 5)
+    
+    def test_succeeded_recovers_the_rate(self):
+        bucket = TokenBucket(rate=10)
+        bucket.throttled()
+        bucket.succeeded()
+        self.assertEqual(bucket.rate, 6)
+        for _ in range(10):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 10)
+
+
+class HTTPClientRateLimitTest(unittest.TestCase):
+    """The HTTP client keeps one bucket per host and slows it down on 429."""
+    
+    def test_too_many_requests_throttles_the_host(self):
+        client = HTTPClient(rate_limit=100, rate_burst=10, backoff_factor=0.001)
+        client.session.get = mock.Mock(side_effect=[
+            SimpleNamespace(status_code=429, headers={"Retry-After": "0.01"}),
+            SimpleNamespace(status_code=200, headers={}),
+            SimpleNamespace(status_code=200, headers={})
+        ])
+        client.get("http://uscis.test/a")
+        client.get("http://other.test/b")
+        
+        buckets = client.stats()["rate_limit"]
+        self.assertEqual(buckets["uscis.test"]["throttled"], 1)
+        self.assertLess(buckets["uscis.test"]["rate"], 100)
+        self.assertEqual(buckets["other.test"]["rate"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
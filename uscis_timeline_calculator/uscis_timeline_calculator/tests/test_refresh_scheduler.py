@@ -0,0 +1,137 @@
+# Unit test for refresh_scheduler.py
+import unittest
+from unittest import mock
+
+from uscis.services import refresh_scheduler
+from uscis.services.refresh_scheduler import RefreshScheduler, update_form_traffic
+
+HOUR = 3600
+
+
+def processing_row(form_number, service_center, median_months):
+    return {'form_number': form_number, 'service_center': service_center, 'form_description': form_number,
+            'min_months': 1.0, 'median_months': median_months, 'max_months': 12.0}
+
+
+def traffic_row(form_id, center_name, request_count):
+    return {'form_id': form_id, 'center_name': center_name, 'category_name': None,
+            'filing_date': None, 'request_count': request_count}
+
+
+class RefreshSchedulerTest(unittest.TestCase):
+    """Pairs that change are refreshed sooner, stable pairs back off."""
+    
+    def setUp(self):
+        self.scheduler = RefreshScheduler(base_interval=8 * HOUR, min_interval=HOUR,
+                                          max_interval=64 * HOUR, hot_pairs=1)
+        self.rows = [processing_row('I-130', 'Texas Service Center', 6.0),
+                     processing_row('I-485', 'Texas Service Center', 8.0)]
+        self.assertEqual(self.scheduler.record_scrape(self.rows, now=0), {"new": 2, "changed": 0, "unchanged": 0})
+    
+    def test_first_refresh_is_due_immediately(self):
+        scheduler = RefreshScheduler(8 * HOUR, HOUR, 64 * HOUR)
+        self.assertLess(scheduler.next_refresh_delay(), 1)
+    
+    def test_unchanged_pairs_back_off(self):
+        self.assertEqual(self.scheduler.next_refresh_at(), 8 * HOUR)
+        self.scheduler.record_scrape(self.rows, now=8 * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 24 * HOUR)
+    
+    def test_changed_pairs_are_due_sooner(self):
+        rows = [self.rows[0], processing_row('I-485', 'Texas Service Center', 9.0)]
+        counts = self.scheduler.record_scrape(rows, now=8 * HOUR)
+        self.assertEqual(counts, {"new": 0, "changed": 1, "unchanged": 1})
+        self.assertEqual(self.scheduler.next_refresh_at(), 12 * HOUR)
+    
+    def test_not_modified_counts_as_unchanged(self):
+        self.assertEqual(self.scheduler.record_scrape(None, now=8 * HOUR)["unchanged"], 2)
+        self.assertEqual(self.scheduler.next_refresh_at(), 24 * HOUR)
+    
+    def test_failed_scrapes_back_off(self):
+        self.scheduler.record_scrape([], now=8 * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 9 * HOUR)
+        self.scheduler.record_scrape([], now=9 * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 11 * HOUR)
+        for check in range(5):
+            self.scheduler.record_scrape([], now=(20 + check) * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 32 * HOUR)
+        self.assertEqual(self.scheduler.stats()["failures"], 7)
+        
+        self.scheduler.record_scrape(self.rows, now=32 * HOUR)
+        self.scheduler.record_scrape([], now=40 * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 41 * HOUR)
+    
+    def test_one_changing_pair_does_not_trigger_a_refresh(self):
+        rows = [self.rows[0], processing_row('I-485', 'Texas Service Center', 9.0)]
+        rows += [processing_row('I-765', f'Center {index}', 3.0) for index in range(3)]
+        self.scheduler.record_scrape(rows, now=8 * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 16 * HOUR)
+    
+    def test_intervals_stay_within_bounds(self):
+        for check in range(1, 10):
+            self.scheduler.record_scrape(None, now=check * 100 * HOUR)
+        self.assertEqual(self.scheduler.stats()["interval_seconds"]["max"], 64 * HOUR)
+    
+    def test_hot_pairs_weigh_more(self):
+        rows = [self.rows[0], processing_row('I-485', 'Texas Service Center', 9.0)]
+        rows += [processing_row('I-765', f'Center {index}', 3.0) for index in range(2)]
+        self.scheduler.record_scrape(rows, now=8 * HOUR)
+        self.assertEqual(self.scheduler.next_refresh_at(), 16 * HOUR)
+        
+        self.scheduler.update_traffic({('I-485', 'Texas Service Center'): 5, ('I-130', 'Texas Service Center'): 1})
+        self.assertEqual(self.scheduler.next_refresh_at(), 12 * HOUR)
+        self.assertEqual(self.scheduler.stats()["hot_pairs"], 1)
+
+
+class ScrapeVolumeTest(unittest.TestCase):
+    """Over a simulated month, the page is scraped less often than on the fixed schedule."""
+    
+    def test_fewer_scrapes_than_the_fixed_schedule(self):
+        base_interval, days = 6 * HOUR, 30
+        scheduler = RefreshScheduler(base_interval, HOUR / 2, 24 * HOUR, hot_pairs=5)
+        # One pair in ten changes daily, the others about once a week or once a month
+        periods = [24 * HOUR if index % 10 == 0 else (7 if index % 2 else 30) * 24 * HOUR for index in range(60)]
+        scheduler.update_traffic({('I-130', f'Center {index}'): 100 - index for index in range(10)})
+        
+        scrapes, now = 0, 0.0
+        while now < days * 24 * HOUR:
+            rows = [processing_row('I-130', f'Center {index}', float(int((now + index * HOUR) // period)))
+                    for index, period in enumerate(periods)]
+            scheduler.record_scrape(rows, now=now)
+            scrapes += 1
+            now = scheduler.next_refresh_at()
+        
+        fixed_schedule = days * 24 * HOUR // base_interval
+        self.assertLess(scrapes, fixed_schedule / 2)
+
+
+class UpdateFormTrafficTest(unittest.TestCase):
+    """Timeline requests rank the pairs; a database error keeps the previous ranking."""
+    
+    def setUp(self):
+        self.scheduler = RefreshScheduler(8 * HOUR, HOUR, 64 * HOUR, hot_pairs=5)
+    
+    def update(self, popular):
+        with mock.patch.object(refresh_scheduler, 'get_popular_timeline_requests', return_value=popular):
+            update_form_traffic(self.scheduler, 7)
+    
+    def test_requests_are_summed_per_pair(self):
+        self.update([traffic_row('I-130', 'Texas Service Center', 3),
+                     traffic_row('I-130', 'Texas Service Center', 2),
+                     traffic_row('I-485', 'Nebraska Service Center', 1)])
+        self.assertEqual(self.scheduler._hot, {('I-130', 'Texas Service Center'): 5,
+                                               ('I-485', 'Nebraska Service Center'): 1})
+    
+    def test_database_error_keeps_the_previous_ranking(self):
+        self.update([traffic_row('I-130', 'Texas Service Center', 3)])
+        self.update(None)
+        self.assertEqual(self.scheduler.stats()["hot_pairs"], 1)
+    
+    def test_quiet_period_clears_the_ranking(self):
+        self.update([traffic_row('I-130', 'Texas Service Center', 3)])
+        self.update([])
+        self.assertEqual(self.scheduler.stats()["hot_pairs"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
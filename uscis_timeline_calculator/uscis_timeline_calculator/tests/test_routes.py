@@ -1 +1,281 @@
 # Unit test for routes.py
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import psycopg2
+
+import uscis
+from uscis import routes
+from uscis.services import scraping, database
+from uscis.services.chart_jobs import ChartJobsBusy
+from uscis.services.timeline import generate_timeline, get_timeline_cache_stats
+
+
+def create_test_app():
+    """Create the testing app without a database or a scrape on startup."""
+    with mock.patch.object(uscis, 'init_db'), mock.patch.object(uscis, 'update_processing_data'):
+        return uscis.create_app('testing')
+
+
+class RouteTestCase(unittest.TestCase):
+    """Runs requests against the simulated processing data instead of the database."""
+    
+    def setUp(self):
+        self.app = create_test_app()
+        self.client = self.app.test_client()
+        patcher = mock.patch.object(scraping, 'processing_time_data', scraping.generate_simulated_data())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(scraping, 'get_filtered_data_from_db', return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(scraping, '_snapshot', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TimelinesBatchTest(RouteTestCase):
+    """POST /api/timelines/batch answers every NDJSON line, in order."""
+    
+    def post_batch(self, *records):
+        body = '\n'.join(record if isinstance(record, str) else json.dumps(record) for record in records)
+        response = self.client.post('/api/timelines/batch', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.data.decode().splitlines()]
+    
+    def test_valid_records(self):
+        results = self.post_batch(
+            {"form_number": "I-130", "service_center": "Texas", "filing_date": "2025-03-01"},
+            {"form_number": "i-485", "service_center": "nebraska service center", "filing_date": "2024-03-01",
+             "form_category": "Family-based"}
+        )
+        self.assertEqual([result['line'] for result in results], [1, 2])
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(results[0]['timeline']['form_info']['form_number'], 'I-130')
+        self.assertEqual(results[1]['timeline']['form_info']['service_center'], 'Nebraska Service Center')
+    
+    def test_bad_records_do_not_abort_the_stream(self):
+        results = self.post_batch(
+            'not json',
+            '[1]',
+            {"form_number": 5, "service_center": "Texas", "filing_date": "2025-03-01"},
+            {"form_number": "I-130", "service_center": ["Texas"], "filing_date": "2025-03-01"},
+            {"form_number": "I-130", "service_center": "Texas", "filing_date": "2025-03-01", "form_category": 3},
+            {"form_number": "X-1", "service_center": "Texas", "filing_date": "2025-03-01"},
+            {"form_number": "I-130", "service_center": "Texas", "filing_date": "2025-3-x"},
+            {"form_number": "I-130", "service_center": "Texas", "filing_date": "2025-03-01"}
+        )
+        self.assertEqual(len(results), 8)
+        self.assertEqual([result['success'] for result in results], [False] * 7 + [True])
+        self.assertIn('must be strings', results[2]['error'])
+        self.assertIn('must be strings', results[3]['error'])
+        self.assertIn('must be strings', results[4]['error'])
+        self.assertIn('No data found', results[5]['error'])
+    
+    def test_unexpected_errors_become_error_lines(self):
+        calls = []
+        
+        def fail_first(data_item, filing_date, form_category=None):
+            calls.append(filing_date)
+            if len(calls) == 1:
+                raise KeyError('max_days')
+            return generate_timeline(data_item, filing_date, form_category)
+        
+        record = {"form_number": "I-130", "service_center": "Texas", "filing_date": "2025-03-01"}
+        with mock.patch('uscis.routes.generate_timeline', side_effect=fail_first):
+            results = self.post_batch(record, record)
+        self.assertEqual([result['success'] for result in results], [False, True])
+        self.assertEqual(results[0]['error'], 'Could not calculate the timeline for this record.')
+    
+    def test_batch_bypasses_the_timeline_cache(self):
+        before = get_timeline_cache_stats()
+        self.post_batch(*[{"form_number": "I-130", "service_center": "Texas", "filing_date": f"2025-03-{day:02d}"}
+                          for day in range(1, 21)])
+        after = get_timeline_cache_stats()
+        self.assertEqual(after['size'], before['size'])
+
+
+class ServeChartTest(RouteTestCase):
+    """GET /charts/<filename> renders evicted charts again, even mid-request."""
+    
+    CHART_KEY = "0123456789abcdef0123456789abcdef"
+    
+    def setUp(self):
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.app.config.update(CHARTS_FOLDER=temp_dir.name, CHART_NEGOTIATED_FORMATS=())
+        self.filename = f"timeline_{self.CHART_KEY}.png"
+        self.chart_path = os.path.join(temp_dir.name, self.filename)
+        
+        def render(spec, chart_path):
+            with open(chart_path, 'wb') as f:
+                f.write(b'rendered')
+            return chart_path
+        
+        for name, kwargs in (('_find_chart_spec', {'return_value': {'title': 'chart'}}),
+                             ('render_chart_file', {'side_effect': render})):
+            patcher = mock.patch.object(routes, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_serves_existing_chart(self):
+        with open(self.chart_path, 'wb') as f:
+            f.write(b'existing')
+        response = self.client.get(f'/charts/{self.filename}')
+        self.assertEqual((response.status_code, response.data), (200, b'existing'))
+        self.assertEqual(response.headers['ETag'], f'"{self.CHART_KEY}"')
+        routes.render_chart_file.assert_not_called()
+    
+    def test_rerenders_evicted_chart(self):
+        response = self.client.get(f'/charts/{self.filename}')
+        self.assertEqual((response.status_code, response.data), (200, b'rendered'))
+    
+    def test_rerenders_chart_evicted_while_sending(self):
+        with open(self.chart_path, 'wb') as f:
+            f.write(b'existing')
+        send_from_directory = routes.send_from_directory
+        
+        def evict_first(directory, filename, **kwargs):
+            if not evict_first.evicted:
+                evict_first.evicted = True
+                os.remove(self.chart_path)
+            return send_from_directory(directory, filename, **kwargs)
+        evict_first.evicted = False
+        
+        with mock.patch.object(routes, 'send_from_directory', side_effect=evict_first):
+            response = self.client.get(f'/charts/{self.filename}')
+        self.assertEqual((response.status_code, response.data), (200, b'rendered'))
+        routes.render_chart_file.assert_called_once()
+
+
+class ChartStatusTest(RouteTestCase):
+    """GET /api/charts/<filename>/status only reports charts that exist or can be rendered."""
+    
+    def setUp(self):
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.app.config.update(CHARTS_FOLDER=temp_dir.name)
+        self.filename = f"timeline_{ServeChartTest.CHART_KEY}.png"
+        self.chart_path = os.path.join(temp_dir.name, self.filename)
+    
+    def status(self):
+        return self.client.get(f'/api/charts/{self.filename}/status')
+    
+    def test_unknown_chart(self):
+        with mock.patch.object(routes, '_find_chart_spec', return_value=None):
+            self.assertEqual(self.status().status_code, 404)
+        self.assertEqual(self.client.get('/api/charts/not-a-chart.png/status').status_code, 404)
+    
+    def test_rendered_chart_is_ready(self):
+        with open(self.chart_path, 'wb') as f:
+            f.write(b'chart')
+        with mock.patch.object(routes, '_find_chart_spec', return_value=None):
+            response = self.status()
+        self.assertEqual(response.get_json()['status'], 'ready')
+    
+    def test_chart_with_known_spec_is_ready(self):
+        with mock.patch.object(routes, '_find_chart_spec', return_value={'title': 'chart'}):
+            response = self.status()
+        self.assertEqual(response.get_json()['status'], 'ready')
+    
+    def test_database_unavailable(self):
+        with mock.patch.object(database, 'get_db_connection',
+                               side_effect=psycopg2.OperationalError('connection refused')):
+            self.assertEqual(self.status().status_code, 404)
+            response = self.client.get(f'/charts/{self.filename}')
+        # serve_chart falls back to its placeholder (or 404) instead of a server error
+        self.assertIn(response.status_code, (200, 404))
+
+
+class AsyncChartTest(RouteTestCase):
+    """With CHART_ASYNC, /calculate queues the chart, or links it directly when the queue is full."""
+    
+    def setUp(self):
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.app.config.update(CHART_ASYNC=True, CHARTS_FOLDER=temp_dir.name)
+        self.jobs = mock.Mock()
+        patcher = mock.patch.object(routes, 'get_chart_jobs', return_value=self.jobs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def calculate(self):
+        with mock.patch.object(routes, 'get_service_center_by_name', return_value=None):
+            return self.client.post('/calculate', data={'form_number': 'I-130', 'service_center': 'Texas',
+                                                        'filing_date': '2025-01-03', 'form_category': ''})
+    
+    def test_chart_is_queued(self):
+        response = self.calculate()
+        self.assertEqual(response.status_code, 200)
+        self.jobs.submit.assert_called_once()
+        self.assertIn(b'data-status-url', response.data)
+    
+    def test_full_queue_links_the_chart(self):
+        self.jobs.submit.side_effect = ChartJobsBusy('Chart job queue is full (32 pending jobs)')
+        response = self.calculate()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'data-status-url', response.data)
+        self.assertIn(b'/charts/timeline_', response.data)
+
+
+class TimelineChartDataTest(RouteTestCase):
+    """GET /api/timeline-chart-data describes the chart for drawing it in the browser."""
+    
+    def chart_data(self, **params):
+        query = dict({'form_number': 'I-130', 'service_center': 'Texas', 'filing_date': '2024-01-01'}, **params)
+        return self.client.get('/api/timeline-chart-data', query_string=query)
+    
+    def test_chart_data(self):
+        response = self.chart_data()
+        self.assertEqual(response.status_code, 200)
+        chart = response.get_json()['chart']
+        self.assertEqual([milestone['label'] for milestone in chart['milestones']],
+                         ['Filed', 'Earliest', 'Median', 'Latest', 'Today'])
+        self.assertEqual(chart['milestones'][0]['date'], '2024-01-01')
+        self.assertEqual(chart['span'], {'start': chart['milestones'][1]['date'],
+                                         'end': chart['milestones'][3]['date']})
+        self.assertLess(chart['range']['start'], '2024-01-01')
+        self.assertTrue(chart['title'][0].startswith('I-130'))
+    
+    def test_missing_parameters(self):
+        self.assertEqual(self.chart_data(filing_date='').status_code, 400)
+    
+    def test_unknown_form(self):
+        self.assertEqual(self.chart_data(form_number='X-1').status_code, 404)
+    
+    def test_invalid_filing_date(self):
+        self.assertEqual(self.chart_data(filing_date='2024-1-x').status_code, 400)
+
+
+class DownloadChartTest(RouteTestCase):
+    """GET /chart-download renders the chart file on demand."""
+    
+    def download(self):
+        return self.client.get('/chart-download', query_string={
+            'form_number': 'I-130', 'service_center': 'Texas', 'filing_date': '2024-01-01'})
+    
+    def test_download(self):
+        with tempfile.TemporaryDirectory() as charts_folder:
+            chart_path = os.path.join(charts_folder, 'timeline_abc.png')
+            with open(chart_path, 'wb') as f:
+                f.write(b'png')
+            with mock.patch.object(routes, 'plot_timeline', return_value=chart_path):
+                response = self.download()
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('attachment; filename=I-130-timeline.png', response.headers['Content-Disposition'])
+                response.close()
+    
+    def test_render_failure(self):
+        with mock.patch.object(routes, 'plot_timeline', side_effect=RuntimeError('render failed')):
+            self.assertEqual(self.download().status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1 +1,146 @@
 # Unit test for scraping.py
+import json
+import os
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+
+import psycopg2
+from flask import Flask
+
+from uscis.services import database, scraping
+from uscis.services.timeline import inquiry_cutoff_date
+from uscis.services.scraping import (
+    with_inquiry_cutoff, load_fallback_data, get_filtered_data, generate_simulated_data,
+    ProcessingDataSnapshot, SNAPSHOT_LOOKUP_CACHE_SIZE
+)
+
+
+class InquiryCutoffTest(unittest.TestCase):
+    """The inquiry cutoff is derived from the precomputed max_days at request time."""
+    
+    def test_with_inquiry_cutoff_returns_a_copy(self):
+        row = {"form_number": "I-485", "max_days": 292}
+        item = with_inquiry_cutoff(row)
+        expected = inquiry_cutoff_date(292).strftime("%B %d, %Y")
+        self.assertEqual(item["receipt_date_for_inquiry"], expected)
+        self.assertNotIn("receipt_date_for_inquiry", row)
+        self.assertEqual(datetime.datetime.strptime(expected, "%B %d, %Y").date(),
+                         datetime.date.today() - datetime.timedelta(days=292))
+
+
+class FallbackDataTest(unittest.TestCase):
+    """Fallback files written before the day offsets existed still load with offsets."""
+    
+    def test_load_fallback_data_adds_day_offsets(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fallback_data.json")
+            with open(path, "w") as f:
+                json.dump([{"form_number": "I-485", "service_center": "Texas Service Center",
+                            "min_months": 4.2, "median_months": 6.0, "max_months": 9.6}], f)
+            app = Flask(__name__)
+            app.config['FALLBACK_DATA_PATH'] = path
+            with app.app_context():
+                data = load_fallback_data()
+        self.assertEqual(len(data), 1)
+        self.assertEqual((data[0]["min_days"], data[0]["median_days"], data[0]["max_days"]), (128, 183, 292))
+
+
+def make_row(form_number, service_center):
+    """Build a processing time row with precomputed day offsets."""
+    return {"form_number": form_number, "service_center": service_center, "min_months": 4.0,
+            "median_months": 6.0, "max_months": 9.0, "min_days": 122, "median_days": 183, "max_days": 274}
+
+
+class ProcessingDataSnapshotTest(unittest.TestCase):
+    """The snapshot resolves lookups like get_filtered_data, from memory."""
+    
+    def setUp(self):
+        # Deliberately not in alphabetical order, as fallback data may be
+        self.rows = [
+            make_row("I-485", "Texas Service Center"),
+            make_row("I-485", "National Benefits Center"),
+            make_row("I-130", "Potomac Service Center"),
+            make_row("I-130", "California Service Center")
+        ]
+        self.snapshot = ProcessingDataSnapshot(self.rows, 1)
+    
+    def test_lookup_is_case_insensitive_and_partial(self):
+        self.assertEqual(self.snapshot.lookup("i-485", "texas")["service_center"], "Texas Service Center")
+        self.assertIsNone(self.snapshot.lookup("I-485", "Vermont"))
+        self.assertIsNone(self.snapshot.lookup("X-1", "Texas"))
+    
+    def test_first_match_agrees_with_get_filtered_data(self):
+        with mock.patch("uscis.services.scraping.get_filtered_data_from_db", return_value=[]), \
+                mock.patch("uscis.services.scraping.processing_time_data", self.rows):
+            for form_number, service_center in [("I-485", "Center"), ("I-130", "Service"), ("i-130", "c")]:
+                expected = get_filtered_data(form_number, service_center)[0]
+                match = self.snapshot.lookup(form_number, service_center)
+                self.assertEqual(match["service_center"], expected["service_center"])
+    
+    def test_lookup_memo_is_bounded(self):
+        for index in range(SNAPSHOT_LOOKUP_CACHE_SIZE + 100):
+            self.snapshot.lookup("I-485", f"center {index}")
+        self.assertEqual(self.snapshot._match.cache_info().currsize, SNAPSHOT_LOOKUP_CACHE_SIZE)
+    
+    def test_unknown_forms_are_not_memoized(self):
+        for index in range(100):
+            self.snapshot.lookup(f"X-{index}", "Texas")
+        self.assertEqual(self.snapshot._match.cache_info().currsize, 0)
+    
+    def test_inquiry_cutoff_is_derived_on_lookup(self):
+        stale = dict(make_row("I-130", "Nebraska Service Center"), receipt_date_for_inquiry="January 01, 2000")
+        item = ProcessingDataSnapshot([stale], 1).lookup("I-130", "nebraska")
+        self.assertEqual(item["receipt_date_for_inquiry"], inquiry_cutoff_date(274).strftime("%B %d, %Y"))
+        self.assertEqual(stale["receipt_date_for_inquiry"], "January 01, 2000")
+    
+    def test_len_counts_rows(self):
+        self.assertEqual(len(ProcessingDataSnapshot(generate_simulated_data(), 1)), len(generate_simulated_data()))
+
+
+class ImportProcessingDataTest(unittest.TestCase):
+    """Scraped rows are kept and retried when the database import fails."""
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.app = Flask(__name__)
+        self.app.config['USCIS_PROCESSING_TIMES_URL'] = "http://uscis.test/processing-times/"
+        self.app.config['FALLBACK_DATA_PATH'] = os.path.join(temp_dir.name, "fallback_data.json")
+        self.http_cache = mock.Mock()
+        patcher = mock.patch.object(scraping, 'get_http_cache', return_value=self.http_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_failed_rows_invalidate_the_cached_page(self):
+        report = {"added": 0, "changed": 1, "unchanged": 0, "removed": 0, "errors": 1}
+        with self.app.app_context(), \
+                mock.patch.object(scraping, 'import_processing_time_changes', return_value=report):
+            self.assertTrue(scraping.import_processing_data([make_row("I-485", "Texas Service Center")], "scraped"))
+        self.http_cache.invalidate.assert_called_once_with("http://uscis.test/processing-times/")
+    
+    def test_successful_import_keeps_the_cached_page(self):
+        report = {"added": 0, "changed": 1, "unchanged": 0, "removed": 0, "errors": 0}
+        with self.app.app_context(), \
+                mock.patch.object(scraping, 'import_processing_time_changes', return_value=report):
+            scraping.import_processing_data([make_row("I-485", "Texas Service Center")], "scraped")
+        self.http_cache.invalidate.assert_not_called()
+    
+    def test_database_down_keeps_the_scraped_rows(self):
+        scraped = [make_row("I-485", "Texas Service Center")]
+        with self.app.app_context(), \
+                mock.patch.object(scraping, 'processing_time_data', []), \
+                mock.patch.object(scraping, 'scrape_processing_times', return_value=scraped), \
+                mock.patch.object(scraping, 'get_refresh_scheduler', return_value=None), \
+                mock.patch.object(scraping, 'invalidate_timeline_cache') as invalidate_timeline_cache, \
+                mock.patch.object(database, 'get_db_connection',
+                                  side_effect=psycopg2.OperationalError('connection refused')):
+            self.assertTrue(scraping.update_processing_data())
+            self.assertEqual(scraping.processing_time_data, scraped)
+        invalidate_timeline_cache.assert_called_once()
+        self.http_cache.invalidate.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1 +1,158 @@
 # Unit test for timeline.py
+import random
+import datetime
+import unittest
+
+from uscis.services.timeline import (
+    generate_timeline, generate_timelines_batch, expand_timeline_batch, add_day_offsets,
+    get_day_offsets, months_to_days, inquiry_cutoff_date, TimelineCache
+)
+
+
+def make_row(median_months, min_factor=0.7, max_factor=1.6, form_number="I-485"):
+    """Build a processing time row with precomputed day offsets."""
+    return add_day_offsets({
+        "form_number": form_number,
+        "form_description": "Application to Register Permanent Residence or Adjust Status",
+        "service_center": "Texas Service Center",
+        "min_months": round(median_months * min_factor, 1),
+        "median_months": median_months,
+        "max_months": round(median_months * max_factor, 1),
+        "last_updated": "2025-01-01",
+        "receipt_date_for_case_inquiry": "2024-01-01"
+    })
+
+
+class DayOffsetsTest(unittest.TestCase):
+    """Processing time rows carry integer day offsets derived from their month values."""
+    
+    def test_months_to_days_truncates(self):
+        self.assertEqual(months_to_days(6.0), 183)
+        self.assertEqual(months_to_days(1.1), 33)
+        self.assertEqual(months_to_days(0), 0)
+    
+    def test_add_day_offsets_fills_missing_offsets_only(self):
+        row = add_day_offsets({"min_months": 4.2, "median_months": 6.0, "max_months": 9.6, "max_days": 1})
+        self.assertEqual((row["min_days"], row["median_days"], row["max_days"]), (128, 183, 1))
+    
+    def test_get_day_offsets_falls_back_to_months(self):
+        self.assertEqual(get_day_offsets({"min_months": 4.2, "median_months": 6.0, "max_months": 9.6}),
+                         (128, 183, 292))
+        self.assertEqual(get_day_offsets(make_row(6.0)), (128, 183, 292))
+    
+    def test_milestones_are_offsets_from_the_filing_date(self):
+        timeline = generate_timeline(make_row(6.0), "2024-01-01")
+        filing = datetime.date(2024, 1, 1)
+        estimated = timeline.estimated_timeline
+        self.assertEqual(estimated.earliest_date, filing + datetime.timedelta(days=128))
+        self.assertEqual(estimated.median_date, filing + datetime.timedelta(days=183))
+        self.assertEqual(estimated.latest_date, filing + datetime.timedelta(days=292))
+    
+    def test_inquiry_cutoff_date(self):
+        self.assertEqual(inquiry_cutoff_date(292, datetime.date(2025, 1, 1)), datetime.date(2024, 3, 15))
+
+
+class GenerateTimelinesBatchTest(unittest.TestCase):
+    """generate_timelines_batch must agree with generate_timeline for every filing."""
+    
+    def assert_matches_scalar(self, rows, filing_dates):
+        batch = generate_timelines_batch(rows, filing_dates)
+        expected = [generate_timeline(row, filing_date) for row, filing_date in zip(rows, filing_dates)]
+        self.assertEqual(expand_timeline_batch(batch, rows), expected)
+    
+    def test_matches_scalar_path_for_random_filings(self):
+        rng = random.Random(7)
+        today = datetime.date.today()
+        rows, filing_dates = [], []
+        for _ in range(500):
+            rows.append(make_row(round(rng.uniform(0.5, 36.0), 1)))
+            filing_dates.append((today - datetime.timedelta(days=rng.randint(-30, 1500))).isoformat())
+        self.assert_matches_scalar(rows, filing_dates)
+    
+    def test_matches_scalar_path_at_milestone_boundaries(self):
+        today = datetime.date.today()
+        row = make_row(6.0)
+        offsets = [0, row["min_days"], row["median_days"], row["max_days"]]
+        filing_dates = [(today - datetime.timedelta(days=days + delta)).isoformat()
+                        for days in offsets for delta in (-1, 0, 1)]
+        self.assert_matches_scalar([row] * len(filing_dates), filing_dates)
+    
+    def test_zero_median_processing_time(self):
+        today = datetime.date.today()
+        row = make_row(0.0)
+        filing_dates = [(today - datetime.timedelta(days=days)).isoformat() for days in (0, 1, 400)]
+        self.assert_matches_scalar([row] * 3, filing_dates)
+        
+        timeline = generate_timeline(row, filing_dates[1])
+        self.assertEqual(timeline.filing_info.progress_percent, 100)
+        self.assertEqual(generate_timeline(row, filing_dates[0]).filing_info.progress_percent, 0)
+    
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            generate_timelines_batch([make_row(6.0)], [])
+    
+    def test_invalid_filing_date(self):
+        with self.assertRaises(ValueError):
+            generate_timelines_batch([make_row(6.0)], ["01/02/2025"])
+    
+    def test_empty_batch(self):
+        self.assertEqual(expand_timeline_batch(generate_timelines_batch([], []), []), [])
+
+
+
+class TimelineCacheTest(unittest.TestCase):
+    """TimelineCache memoizes timelines per data version and stays within its size bound."""
+    
+    def setUp(self):
+        self.cache = TimelineCache(max_size=2)
+        self.row = make_row(6.0)
+    
+    def test_hit_returns_the_same_timeline(self):
+        first = self.cache.get_timeline(self.row, "2024-01-15")
+        second = self.cache.get_timeline(self.row, "2024-01-15")
+        self.assertIs(first, second)
+        self.assertEqual(first, generate_timeline(self.row, "2024-01-15"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+    
+    def test_key_includes_category_and_row_values(self):
+        self.cache.get_timeline(self.row, "2024-01-15")
+        self.cache.get_timeline(self.row, "2024-01-15", "Employment-based")
+        self.cache.get_timeline(dict(self.row, median_months=7.0), "2024-01-15")
+        self.assertEqual(self.cache.stats()["misses"], 3)
+    
+    def test_evicts_least_recently_used(self):
+        self.cache.get_timeline(self.row, "2024-01-01")
+        self.cache.get_timeline(self.row, "2024-01-02")
+        self.cache.get_timeline(self.row, "2024-01-01")
+        self.cache.get_timeline(self.row, "2024-01-03")
+        
+        self.cache.get_timeline(self.row, "2024-01-01")
+        self.assertEqual(self.cache.stats()["hits"], 2)
+        self.cache.get_timeline(self.row, "2024-01-02")
+        self.assertEqual(self.cache.stats()["misses"], 4)
+        self.assertEqual(self.cache.stats()["size"], 2)
+    
+    def test_invalidate_starts_a_new_data_version(self):
+        first = self.cache.get_timeline(self.row, "2024-01-15")
+        self.cache.invalidate()
+        stats = self.cache.stats()
+        self.assertEqual((stats["size"], stats["data_version"]), (0, 1))
+        self.assertIsNot(self.cache.get_timeline(self.row, "2024-01-15"), first)
+    
+    def test_resize_drops_oldest_entries(self):
+        self.cache.get_timeline(self.row, "2024-01-01")
+        self.cache.get_timeline(self.row, "2024-01-02")
+        self.cache.resize(1)
+        self.assertEqual(self.cache.stats()["size"], 1)
+        self.cache.get_timeline(self.row, "2024-01-02")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+    
+    def test_invalid_filing_date_is_not_cached(self):
+        with self.assertRaises(ValueError):
+            self.cache.get_timeline(self.row, "not-a-date")
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
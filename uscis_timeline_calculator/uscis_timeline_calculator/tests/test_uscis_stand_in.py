@@ -0,0 +1,63 @@
+# Unit test for benchmarks/uscis_stand_in.py
+import os
+import sys
+import unittest
+
+import requests
+
+from uscis.services.html_parsing import select_options
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_DIR, "benchmarks"))
+
+from uscis_stand_in import USCISStandIn  # noqa: E402
+
+
+class USCISStandInTest(unittest.TestCase):
+    """The stand-in serves scaled fixtures with ETags, latency and errors."""
+    
+    def start(self, **kwargs):
+        stand_in = USCISStandIn(**kwargs)
+        stand_in.start()
+        self.addCleanup(stand_in.stop)
+        return stand_in
+    
+    def test_payloads_are_scaled(self):
+        stand_in = self.start(forms=120, offices=95)
+        form_types = requests.get(f"{stand_in.base_url}api/formtypes", timeout=5).json()
+        self.assertEqual(len(form_types), 120)
+        self.assertEqual(len({form["formId"] for form in form_types}), 120)
+        
+        page = requests.get(stand_in.base_url, timeout=5).text
+        self.assertEqual(len(select_options(page, "selectForm")), 121)
+        
+        form_id = form_types[-1]["formId"]
+        offices = requests.get(f"{stand_in.base_url}api/formoffices/{form_id}", timeout=5).json()
+        self.assertEqual(len(offices["offices"]), 95)
+    
+    def test_etag_revalidation(self):
+        stand_in = self.start()
+        url = f"{stand_in.base_url}api/formtypes"
+        response = requests.get(url, timeout=5)
+        self.assertEqual(response.status_code, 200)
+        
+        revalidated = requests.get(url, headers={"If-None-Match": response.headers["ETag"]}, timeout=5)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b"")
+        self.assertEqual(stand_in.stats()["api/formtypes"], {"requests": 2, "200": 1, "304": 1, "404": 0, "503": 0})
+    
+    def test_errors_are_retryable(self):
+        stand_in = self.start(error_rate=1.0)
+        response = requests.get(stand_in.base_url, timeout=5)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "0")
+    
+    def test_unknown_paths(self):
+        stand_in = self.start()
+        self.assertEqual(requests.get(f"{stand_in.base_url}api/formoffices/999999", timeout=5).status_code, 404)
+        stand_in.reset_stats()
+        self.assertEqual(stand_in.stats(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
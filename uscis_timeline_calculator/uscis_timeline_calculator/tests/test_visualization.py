@@ -0,0 +1,153 @@
+# Unit test for visualization.py
+import os
+import datetime
+import tempfile
+import xml.etree.ElementTree as ElementTree
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from flask import Flask
+
+from uscis.services import visualization
+from uscis.services.timeline import generate_timeline, add_day_offsets
+
+
+def make_timeline(filing_date="2024-01-01", median_months=6.0):
+    """Generate a timeline from a processing time row with precomputed day offsets."""
+    return generate_timeline(add_day_offsets({
+        "form_number": "I-485",
+        "form_description": "Application to Register Permanent Residence or Adjust Status",
+        "service_center": "Texas Service Center",
+        "min_months": 4.2,
+        "median_months": median_months,
+        "max_months": 9.6,
+        "last_updated": "2025-01-01",
+        "receipt_date_for_case_inquiry": "2024-01-01"
+    }), filing_date)
+
+
+class ChartTestCase(unittest.TestCase):
+    """Renders charts into a temporary CHARTS_FOLDER without a chart store, cache or render service."""
+    
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.charts_folder = temp_dir.name
+        self.app = Flask(__name__)
+        self.app.config.update(CHARTS_FOLDER=self.charts_folder, CHART_FORMAT='png')
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        for name in ('get_chart_store', 'get_chart_renderer', 'get_chart_cache'):
+            patcher = mock.patch.object(visualization, name, return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class ChartHashTest(unittest.TestCase):
+    """Chart file names are derived from everything drawn on the chart."""
+    
+    def test_identical_inputs_share_a_hash(self):
+        today = datetime.date(2025, 1, 1)
+        self.assertEqual(visualization.chart_hash(make_timeline(), today),
+                         visualization.chart_hash(make_timeline(), today))
+    
+    def test_rendered_inputs_change_the_hash(self):
+        today = datetime.date(2025, 1, 1)
+        base = visualization.chart_hash(make_timeline(), today)
+        self.assertNotEqual(base, visualization.chart_hash(make_timeline(), datetime.date(2025, 1, 2)))
+        self.assertNotEqual(base, visualization.chart_hash(make_timeline("2024-01-02"), today))
+        self.assertNotEqual(base, visualization.chart_hash(make_timeline(median_months=7.0), today))
+
+
+class PlotTimelineTest(ChartTestCase):
+    """plot_timeline renders a chart once and reuses the file for identical requests."""
+    
+    def test_identical_requests_reuse_the_file(self):
+        with mock.patch.object(visualization, 'render_chart_bytes', return_value=b'png') as render:
+            first = visualization.plot_timeline(make_timeline())
+            second = visualization.plot_timeline(make_timeline())
+        self.assertEqual(first, second)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(os.path.basename(first), visualization.timeline_chart_filename(make_timeline()))
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b'png')
+    
+    def test_different_timelines_get_different_files(self):
+        with mock.patch.object(visualization, 'render_chart_bytes', return_value=b'png'):
+            first = visualization.plot_timeline(make_timeline())
+            second = visualization.plot_timeline(make_timeline("2024-02-01"))
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(os.listdir(self.charts_folder)), 2)
+    
+    def test_failed_writes_leave_no_partial_file(self):
+        chart_path = os.path.join(self.charts_folder, 'timeline_test.png')
+        with mock.patch.object(visualization.os, 'replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                visualization._write_atomically(chart_path, b'png')
+        self.assertEqual(os.listdir(self.charts_folder), [])
+
+
+class ChartTemplateTest(unittest.TestCase):
+    """Each thread renders on its own chart template."""
+    
+    def test_template_is_reused_within_a_thread(self):
+        self.assertIs(visualization.get_chart_template(), visualization.get_chart_template())
+    
+    def test_threads_get_their_own_template(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            templates = list(executor.map(lambda _: visualization.get_chart_template(), range(2)))
+        self.assertIsNot(templates[0], visualization.get_chart_template())
+        self.assertIsNot(templates[1], visualization.get_chart_template())
+    
+    def test_parallel_renders_match_sequential_ones(self):
+        today = datetime.date(2025, 1, 1)
+        specs = [visualization.build_chart_spec(make_timeline(f"2024-{month:02d}-01"), today) for month in range(1, 7)]
+        expected = [visualization.encode_chart_png(spec) for spec in specs]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            self.assertEqual(list(executor.map(visualization.encode_chart_png, specs)), expected)
+
+
+class SvgChartTest(unittest.TestCase):
+    """The SVG renderer draws the chart as a well-formed document without matplotlib."""
+    
+    def setUp(self):
+        self.spec = visualization.build_chart_spec(make_timeline(), datetime.date(2025, 1, 1))
+    
+    def parse(self, spec):
+        return ElementTree.fromstring(visualization.render_chart_svg(spec))
+    
+    def texts(self, root):
+        return ["".join(element.itertext()) for element in root.iter() if element.tag.endswith("}text")]
+    
+    def test_document_has_the_chart_size(self):
+        root = self.parse(self.spec)
+        self.assertEqual((root.get("width"), root.get("height")),
+                         (str(visualization.SVG_WIDTH), str(visualization.SVG_HEIGHT)))
+    
+    def test_draws_milestones_labels_and_month_ticks(self):
+        root = self.parse(self.spec)
+        circles = [element for element in root.iter() if element.tag.endswith("}circle")]
+        self.assertEqual(len(circles), 4)
+        texts = self.texts(root)
+        for label in ("Filed: Jan 01, 2024", "Median: Jul 02, 2024", "Today: Jan 01, 2025"):
+            self.assertIn(label, texts)
+        self.assertIn("Jan 2024", texts)
+        self.assertIn("Dec 2024", texts)
+    
+    def test_text_is_escaped(self):
+        spec = dict(self.spec, title="I-485 <Adjust> & Status\nTexas", status_text="50% <done>")
+        texts = self.texts(self.parse(spec))
+        self.assertIn("50% <done>", texts)
+        self.assertTrue(any("I-485 <Adjust> & Status" in text for text in texts))
+    
+    def test_month_ticks_start_on_the_next_first(self):
+        start = datetime.date(2024, 11, 15).toordinal()
+        end = datetime.date(2025, 2, 1).toordinal()
+        self.assertEqual(visualization._svg_month_ticks(start, end),
+                         [datetime.date(2024, 12, 1), datetime.date(2025, 1, 1), datetime.date(2025, 2, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
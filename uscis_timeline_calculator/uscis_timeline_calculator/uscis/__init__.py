@@ -13,11 +13,50 @@ from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config import config
+from uscis.models import format_display_date
 
 # Import services for initialization
 from uscis.services.scraping import update_processing_data
 import uscis.services.timeline as timeline_service
 from uscis.services.database import get_db_connection, close_db_connection, init_db
+from uscis.services.chart_renderer import configure_chart_renderer
+from uscis.services.chart_store import configure_chart_store
+from uscis.services.chart_cache import configure_chart_cache
+from uscis.services.chart_jobs import configure_chart_jobs
+from uscis.services.http_cache import configure_http_cache
+from uscis.services.http_client import configure_http_client
+from uscis.services.cache_warming import start_cache_warming
+from uscis.services.refresh_scheduler import configure_refresh_scheduler, update_form_traffic
+
+
+def preload_heavy_modules(app):
+    """
+    Import the heavy libraries that are otherwise loaded on first use.
+    
+    Matplotlib, NumPy and the HTML parser are imported lazily to keep startup
+    fast. Servers that load the application before forking workers (e.g.
+    gunicorn --preload) can call this hook so the import time is paid once in
+    the parent instead of on each worker's first request. Only the imported
+    modules carry over: each request thread still builds its own chart
+    template, and render processes (CHART_RENDER_MODE = 'process') are
+    spawned, so they import everything themselves.
+    
+    Args:
+        app: The Flask application instance
+    """
+    import numpy  # noqa: F401
+    
+    # Choosing the parser backend imports its library
+    from uscis.services.html_parsing import get_parser_backend
+    get_parser_backend()
+    
+    # Building a template imports matplotlib; the template itself is only
+    # used by this thread. Spawned render processes gain nothing from it
+    if app.config['CHART_FORMAT'] == 'png' and app.config['CHART_RENDER_MODE'] != 'process':
+        from uscis.services.visualization import get_chart_template
+        get_chart_template()
+    
+    app.logger.info("Preloaded heavy modules")
 
 
 def create_app(config_name):
@@ -52,6 +91,69 @@ def create_app(config_name):
     # Ensure necessary directories exist
     os.makedirs(app.config['CHARTS_FOLDER'], exist_ok=True)
     
+    # Size the shared timeline cache
+    timeline_service.configure_timeline_cache(app.config['TIMELINE_CACHE_SIZE'])
+    
+    # Render charts in worker processes instead of request threads
+    if app.config['CHART_RENDER_MODE'] == 'process':
+        configure_chart_renderer(
+            app.config['CHART_RENDER_WORKERS'],
+            app.config['CHART_RENDER_MAX_PENDING'],
+            app.config['CHART_RENDER_TIMEOUT']
+        )
+    
+    # Keep the chart folder within its size budget
+    if app.config['CHART_STORE_ENABLED']:
+        configure_chart_store(
+            app.config['CHARTS_FOLDER'],
+            app.config['CHART_STORE_MAX_BYTES'],
+            app.config['CHART_STORE_MAX_FILES'],
+            app.config['CHART_STORE_SWEEP_INTERVAL'],
+            app.config['CHART_STORE_SPEC_CACHE_SIZE']
+        )
+    
+    # Serve charts from memory instead of writing them to disk first
+    if app.config['CHART_STORAGE'] == 'memory':
+        configure_chart_cache(app.config['CHART_MEMORY_CACHE_BYTES'])
+    
+    # Render charts in the background so results pages are not blocked on them
+    if app.config['CHART_ASYNC']:
+        configure_chart_jobs(app.config['CHART_JOB_WORKERS'], app.config['CHART_JOB_MAX_PENDING'])
+    
+    # One pooled, retrying HTTP client for all scraping
+    configure_http_client(
+        app.config['SCRAPING_POOL_SIZE'],
+        app.config['SCRAPING_MAX_RETRIES'],
+        app.config['SCRAPING_BACKOFF_FACTOR'],
+        app.config['SCRAPING_BACKOFF_MAX'],
+        app.config['SCRAPING_TIME_BUDGET'],
+        app.config['SCRAPING_TIMEOUT'],
+        app.config['SCRAPING_RATE_LIMIT'],
+        app.config['SCRAPING_RATE_BURST']
+    )
+    
+    # Revalidate scraped pages with conditional GETs instead of downloading them again
+    if app.config['HTTP_CACHE_ENABLED']:
+        configure_http_cache(app.config['HTTP_CACHE_FOLDER'])
+    
+    # Refresh forms by how often their data changes instead of on a fixed interval
+    scheduler = None
+    if app.config['ADAPTIVE_REFRESH_ENABLED']:
+        scheduler = configure_refresh_scheduler(
+            app.config['DATA_UPDATE_INTERVAL'].total_seconds(),
+            app.config['DATA_UPDATE_MIN_INTERVAL'].total_seconds(),
+            app.config['DATA_UPDATE_MAX_INTERVAL'].total_seconds(),
+            app.config['DATA_UPDATE_HOT_PAIRS'],
+            app.config['DATA_UPDATE_DUE_FRACTION']
+        )
+    
+    # Load heavy libraries up front when the server preloads the app before forking
+    if app.config['PRELOAD_HEAVY_MODULES']:
+        preload_heavy_modules(app)
+    
+    # Dates are formatted for display only at render time
+    app.add_template_filter(format_display_date, 'display_date')
+    
     # Register blueprints
     from uscis.routes import main as main_blueprint
     from uscis.routes import api as api_blueprint
@@ -67,8 +169,9 @@ def create_app(config_name):
         # Initialize database schema
         init_db()
         
-        # Update processing data
-        update_processing_data()
+        # Update processing data, then warm the caches for the new data
+        if update_processing_data() and app.config['CACHE_WARMING_ENABLED']:
+            start_cache_warming(app)
     
     # Start background thread for periodic data updates
     if not app.config['TESTING']:
@@ -77,13 +180,29 @@ def create_app(config_name):
             import time
             
             while True:
-                # Sleep for the configured update interval
-                time.sleep(app.config['DATA_UPDATE_INTERVAL'].total_seconds())
+                if scheduler is None:
+                    # Sleep for the configured update interval
+                    time.sleep(app.config['DATA_UPDATE_INTERVAL'].total_seconds())
+                else:
+                    # Sleep until a form/office pair is due, re-checking at least every
+                    # minimum interval since new traffic can make a pair hot
+                    try:
+                        with app.app_context():
+                            update_form_traffic(scheduler, app.config['DATA_UPDATE_TRAFFIC_LOOKBACK_DAYS'])
+                        delay = scheduler.next_refresh_delay()
+                    except Exception as e:
+                        # Retry after the minimum interval rather than ending the thread
+                        app.logger.error(f"Error scheduling the next data update: {e}")
+                        delay = scheduler.min_interval
+                    if delay > 0:
+                        time.sleep(min(delay, scheduler.min_interval))
+                        continue
                 
                 # Update processing data
                 with app.app_context():
                     try:
-                        update_processing_data()
+                        if update_processing_data() and app.config['CACHE_WARMING_ENABLED']:
+                            start_cache_warming(app)
                     except Exception as e:
                         app.logger.error(f"Error updating processing data: {e}")
         
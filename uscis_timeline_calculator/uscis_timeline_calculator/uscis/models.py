@@ -5,6 +5,7 @@ This module defines data structures used throughout the application.
 """
 
 import datetime
+import functools
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Any, Union
 
@@ -23,64 +24,99 @@ class ProcessingTimeData:
     receipt_date_for_case_inquiry: str
 
 
-@dataclass
+# Display format used when rendering dates to users
+DISPLAY_DATE_FORMAT = "%B %d, %Y"
+
+
+@functools.lru_cache(maxsize=4096)
+def format_display_date(value: datetime.date) -> str:
+    """
+    Format a date for display (e.g. "January 05, 2025").
+    
+    Timelines keep dates as date objects internally; this is the single place
+    they are turned into strings, for templates and JSON responses. Results are
+    cached since the same handful of dates is formatted over and over.
+    
+    Args:
+        value: Date to format
+        
+    Returns:
+        Formatted date string
+    """
+    return value.strftime(DISPLAY_DATE_FORMAT)
+
+
+def parse_display_date(value: str) -> datetime.date:
+    """Parse a date previously produced by format_display_date."""
+    return datetime.datetime.strptime(value, DISPLAY_DATE_FORMAT).date()
+
+
+@dataclass(frozen=True)
 class FormInfo:
     """Represents information about a USCIS form."""
     
     form_number: str
     form_description: str
     service_center: str
+    form_category: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class FilingInfo:
     """Represents information about a specific filing."""
     
-    filing_date: str
+    filing_date: datetime.date
     days_since_filing: int
     progress_percent: int
 
 
-@dataclass
+@dataclass(frozen=True)
 class ProcessingTime:
     """Represents processing time information."""
     
     min_months: float
     median_months: float
     max_months: float
-    expedited: bool
-    premium_processing: bool
+    expedited: bool = False
+    premium_processing: bool = False
 
 
-@dataclass
+@dataclass(frozen=True)
 class EstimatedTimeline:
     """Represents estimated completion timeline."""
     
-    earliest_date: str
-    median_date: str
-    latest_date: str
+    earliest_date: datetime.date
+    median_date: datetime.date
+    latest_date: datetime.date
 
 
-@dataclass
+@dataclass(frozen=True)
 class CaseStatus:
     """Represents current case status information."""
     
     current_status: str
     can_submit_inquiry: bool
-    inquiry_eligibility_date: str
+    inquiry_eligibility_date: datetime.date
 
 
-@dataclass
+@dataclass(frozen=True)
 class DataSource:
     """Represents information about the data source."""
     
     last_updated: str
-    next_update: str
+    next_update: datetime.date
+    calculation_note: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class Timeline:
-    """Represents a complete processing timeline."""
+    """
+    Represents a complete processing timeline.
+    
+    Dates are kept as datetime.date objects so they can be passed between the
+    timeline, visualization and database code without re-parsing. Instances are
+    immutable, which lets cached timelines be shared between requests.
+    """
     
     form_info: FormInfo
     filing_info: FilingInfo
@@ -92,7 +128,7 @@ class Timeline:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Timeline':
         """
-        Create a Timeline instance from a dictionary.
+        Create a Timeline instance from a dictionary produced by to_dict.
         
         Args:
             data: Dictionary containing timeline data
@@ -100,30 +136,53 @@ class Timeline:
         Returns:
             A Timeline instance
         """
+        estimated_timeline = EstimatedTimeline(
+            earliest_date=parse_display_date(data['estimated_timeline']['earliest_date']),
+            median_date=parse_display_date(data['estimated_timeline']['median_date']),
+            latest_date=parse_display_date(data['estimated_timeline']['latest_date'])
+        )
         return cls(
             form_info=FormInfo(**data['form_info']),
-            filing_info=FilingInfo(**data['filing_info']),
+            filing_info=FilingInfo(
+                filing_date=parse_display_date(data['filing_info']['filing_date']),
+                days_since_filing=data['filing_info']['days_since_filing'],
+                progress_percent=data['filing_info']['progress_percent']
+            ),
             processing_time=ProcessingTime(**data['processing_time']),
-            estimated_timeline=EstimatedTimeline(**data['estimated_timeline']),
-            case_status=CaseStatus(**data['case_status']),
-            data_source=DataSource(**data['data_source'])
+            estimated_timeline=estimated_timeline,
+            case_status=CaseStatus(
+                current_status=data['case_status']['current_status'],
+                can_submit_inquiry=data['case_status']['can_submit_inquiry'],
+                inquiry_eligibility_date=estimated_timeline.latest_date
+            ),
+            data_source=DataSource(
+                last_updated=data['data_source']['last_updated'],
+                next_update=parse_display_date(data['data_source']['next_update']),
+                calculation_note=data['data_source']['calculation_note']
+            )
         )
     
     def to_dict(self) -> Dict[str, Any]:
         """
-        Convert the Timeline instance to a dictionary.
+        Convert the Timeline instance to a JSON-serializable dictionary.
         
         Returns:
-            A dictionary representation of the Timeline
+            A dictionary representation of the Timeline with formatted dates
         """
+        if self.case_status.can_submit_inquiry:
+            inquiry_eligibility_text = "Eligible now"
+        else:
+            inquiry_eligibility_text = format_display_date(self.case_status.inquiry_eligibility_date)
+        
         return {
             'form_info': {
                 'form_number': self.form_info.form_number,
                 'form_description': self.form_info.form_description,
-                'service_center': self.form_info.service_center
+                'service_center': self.form_info.service_center,
+                'form_category': self.form_info.form_category
             },
             'filing_info': {
-                'filing_date': self.filing_info.filing_date,
+                'filing_date': format_display_date(self.filing_info.filing_date),
                 'days_since_filing': self.filing_info.days_since_filing,
                 'progress_percent': self.filing_info.progress_percent
             },
@@ -135,18 +194,19 @@ class Timeline:
                 'premium_processing': self.processing_time.premium_processing
             },
             'estimated_timeline': {
-                'earliest_date': self.estimated_timeline.earliest_date,
-                'median_date': self.estimated_timeline.median_date,
-                'latest_date': self.estimated_timeline.latest_date
+                'earliest_date': format_display_date(self.estimated_timeline.earliest_date),
+                'median_date': format_display_date(self.estimated_timeline.median_date),
+                'latest_date': format_display_date(self.estimated_timeline.latest_date)
             },
             'case_status': {
                 'current_status': self.case_status.current_status,
                 'can_submit_inquiry': self.case_status.can_submit_inquiry,
-                'inquiry_eligibility_date': self.case_status.inquiry_eligibility_date
+                'inquiry_eligibility_date': inquiry_eligibility_text
             },
             'data_source': {
                 'last_updated': self.data_source.last_updated,
-                'next_update': self.data_source.next_update
+                'next_update': format_display_date(self.data_source.next_update),
+                'calculation_note': self.data_source.calculation_note
             }
         }
 
@@ -5,19 +5,39 @@ This module defines all routes for the web interface and API endpoints.
 """
 
 import os
+import json
 from flask import (
     Blueprint, render_template, request, jsonify, current_app,
-    abort, send_from_directory, redirect, url_for, flash, send_file
+    abort, send_from_directory, redirect, url_for, flash, send_file,
+    Response, stream_with_context
 )
+from werkzeug.exceptions import NotFound
 
-from uscis.services.scraping import get_filtered_data, find_unique_values
-from uscis.services.timeline import generate_timeline
-from uscis.services.visualization import plot_timeline
+from uscis.services.scraping import (
+    get_filtered_data, find_unique_values, get_processing_snapshot, get_data_import_stats
+)
+from uscis.services.timeline import generate_timeline, get_cached_timeline, get_timeline_cache_stats
+from uscis.services.visualization import (
+    plot_timeline, chart_hash, timeline_svg, build_chart_spec, render_chart_file,
+    cache_timeline_chart, load_chart_bytes, store_chart_bytes, render_chart_bytes,
+    timeline_chart_filename, chart_is_available, render_timeline_chart, build_chart_data,
+    load_chart_variant
+)
+from uscis.services.chart_renderer import get_chart_renderer_stats
+from uscis.services.chart_store import get_chart_store, get_chart_store_stats, chart_key_from_filename
+from uscis.services.chart_cache import get_chart_cache, get_chart_cache_stats, CHART_MIMETYPES
+from uscis.services.chart_jobs import get_chart_jobs, get_chart_job_stats, ChartJobsBusy, JOB_PENDING, JOB_FAILED
+from uscis.services.chart_encoding import negotiate_chart_formats, encoding_stats, get_chart_encoding_stats
+from uscis.services.cache_warming import get_cache_warming_stats
+from uscis.services.http_cache import get_http_cache_stats
+from uscis.services.http_client import get_http_client_stats
+from uscis.services.refresh_scheduler import get_refresh_scheduler_stats
 
 # Database imports
 from uscis.services.database import (
     get_all_forms, get_all_service_centers, get_categories_by_form_id,
-    get_service_center_by_name, insert_user_timeline, get_user_timeline
+    get_service_center_by_name, insert_user_timeline, get_user_timeline,
+    get_chart_spec_by_hash
 )
 
 # Create blueprints for main routes and API endpoints
@@ -134,13 +154,40 @@ def calculate():
         data_item = matched_items[0]
         
         # Generate timeline and chart
-        timeline = generate_timeline(data_item, filing_date, form_category)
-        chart_path = plot_timeline(timeline, filing_date)
+        timeline = get_cached_timeline(data_item, filing_date, form_category)
         
-        # Extract filename from path
-        chart_filename = os.path.basename(chart_path)
-        
-        current_app.logger.info(f"Generated chart: {chart_path}")
+        # A missing chart should not prevent showing the timeline itself
+        chart_path = None
+        chart_filename = None
+        chart_svg = None
+        chart_data = None
+        chart_pending = False
+        try:
+            if current_app.config.get('CHART_RENDERING') == 'client':
+                # The browser draws the chart; no server-side render at all
+                chart_data = build_chart_data(timeline)
+            elif current_app.config.get('CHART_FORMAT') == 'svg' and current_app.config.get('CHART_INLINE_SVG'):
+                # Inline SVG saves the browser a round trip to /charts
+                chart_svg = timeline_svg(timeline)
+            elif current_app.config.get('CHART_ASYNC'):
+                # Render in the background; the results page polls for the chart
+                chart_filename = timeline_chart_filename(timeline)
+                if not chart_is_available(chart_filename):
+                    try:
+                        get_chart_jobs().submit(chart_filename, _render_chart_job,
+                                                current_app._get_current_object(), timeline)
+                        chart_pending = True
+                    except ChartJobsBusy as e:
+                        # The page links the chart directly; /charts renders it from the stored spec
+                        current_app.logger.warning(f"{e}; leaving {chart_filename} to be rendered on request")
+            elif current_app.config.get('CHART_STORAGE') == 'memory':
+                chart_filename = cache_timeline_chart(timeline)
+            else:
+                chart_path = plot_timeline(timeline)
+                chart_filename = os.path.basename(chart_path)
+                current_app.logger.info(f"Generated chart: {chart_path}")
+        except Exception as e:
+            current_app.logger.error(f"Error generating chart: {e}")
         
         # Store the timeline in the database
         try:
@@ -158,18 +205,6 @@ def calculate():
                             category_id = cat["category_id"]
                             break
                 
-                # Parse filing date
-                import datetime
-                filing_date_obj = datetime.datetime.strptime(filing_date, "%Y-%m-%d")
-                
-                # Parse completion dates
-                earliest_date = datetime.datetime.strptime(
-                    timeline["estimated_timeline"]["earliest_date"], "%B %d, %Y")
-                median_date = datetime.datetime.strptime(
-                    timeline["estimated_timeline"]["median_date"], "%B %d, %Y")
-                latest_date = datetime.datetime.strptime(
-                    timeline["estimated_timeline"]["latest_date"], "%B %d, %Y")
-                
                 # Get user IP (if available)
                 user_ip = request.remote_addr if request else None
                 
@@ -178,11 +213,13 @@ def calculate():
                     form_id=form_number,
                     center_id=center_id,
                     category_id=category_id,
-                    filing_date=filing_date_obj.date(),
-                    earliest_completion_date=earliest_date.date(),
-                    median_completion_date=median_date.date(),
-                    latest_completion_date=latest_date.date(),
+                    filing_date=timeline.filing_info.filing_date,
+                    earliest_completion_date=timeline.estimated_timeline.earliest_date,
+                    median_completion_date=timeline.estimated_timeline.median_date,
+                    latest_completion_date=timeline.estimated_timeline.latest_date,
                     chart_path=chart_path,
+                    chart_hash=chart_hash(timeline) if chart_filename or chart_svg or chart_data else None,
+                    chart_spec=build_chart_spec(timeline) if chart_filename else None,
                     user_ip=user_ip
                 )
         except Exception as e:
@@ -193,7 +230,10 @@ def calculate():
         return render_template(
             'results.html',
             timeline=timeline,
-            chart_url=chart_filename
+            chart_url=chart_filename,
+            chart_svg=chart_svg,
+            chart_data=chart_data,
+            chart_pending=chart_pending
         )
         
     except Exception as e:
@@ -207,17 +247,180 @@ def serve_chart(filename):
     """
     Serve timeline chart images.
     
-    This route handles serving the generated timeline chart images.
+    This route handles serving the generated timeline chart images. Chart file
+    names are content-addressed, so charts are served with their hash as ETag
+    and may be cached as immutable. Charts evicted from the chart store or the
+    in-memory chart cache are rendered again from their stored spec. PNG charts
+    are sent as WebP or AVIF instead when the client accepts it and the result
+    is smaller.
     """
     charts_folder = current_app.config.get('CHARTS_FOLDER', 'static/charts')
-    current_app.logger.info(f"Serving chart from {charts_folder}/{filename}")
+    chart_path = os.path.join(charts_folder, filename)
     
-    try:
+    store = get_chart_store()
+    chart_key = chart_key_from_filename(filename)
+    
+    # Serve charts kept in memory without touching the disk
+    if get_chart_cache() is not None and chart_key is not None:
+        data = load_chart_bytes(filename)
+        chart_format = filename.rsplit('.', 1)[1]
+        
+        if data is None:
+            spec = _find_chart_spec(chart_key)
+            if spec is not None:
+                try:
+                    data = render_chart_bytes(spec, chart_format)
+                    store_chart_bytes(filename, data, spec)
+                    if store is not None:
+                        store.record_rerender()
+                    current_app.logger.info(f"Re-rendered evicted chart {filename}")
+                except Exception as e:
+                    current_app.logger.error(f"Error re-rendering chart {filename}: {e}")
+        
+        if data is not None:
+            variant_response = _chart_variant_response(filename, chart_key, len(data), data)
+            if variant_response is not None:
+                return variant_response
+            return _cacheable_chart_response(Response(data, mimetype=CHART_MIMETYPES[chart_format]),
+                                             chart_key, filename)
+    
+    current_app.logger.info(f"Serving chart from {chart_path}")
+    
+    # The chart store may evict the chart between the checks below and the
+    # send; it is then rendered again once
+    for _ in range(2):
+        if os.path.exists(chart_path):
+            if store is not None:
+                store.touch(chart_path)
+        elif chart_key is not None:
+            # The chart was evicted; render it again from the stored timeline
+            spec = _find_chart_spec(chart_key)
+            if spec is not None:
+                try:
+                    os.makedirs(charts_folder, exist_ok=True)
+                    render_chart_file(spec, chart_path)
+                    if store is not None:
+                        store.record_rerender()
+                    current_app.logger.info(f"Re-rendered evicted chart {filename}")
+                except Exception as e:
+                    current_app.logger.error(f"Error re-rendering chart {filename}: {e}")
+        
+        if not os.path.exists(chart_path):
+            break
+        
+        try:
+            return _send_chart_file(charts_folder, filename, chart_key)
+        except (FileNotFoundError, NotFound):
+            current_app.logger.info(f"Chart {filename} was evicted while being served")
+    
+    current_app.logger.error(f"Chart file not found: {filename}")
+    # Return a fallback image or error message
+    return send_from_directory('static', 'images/chart-error.png')
+
+
+def _send_chart_file(charts_folder, filename, chart_key):
+    """Send a chart from the charts folder, as a WebP or AVIF variant when negotiated."""
+    if chart_key is None:
         return send_from_directory(os.path.abspath(charts_folder), filename)
-    except FileNotFoundError:
-        current_app.logger.error(f"Chart file not found: {filename}")
-        # Return a fallback image or error message
-        return send_from_directory('static', 'images/chart-error.png')
+    
+    variant_response = _chart_variant_response(filename, chart_key,
+                                               os.path.getsize(os.path.join(charts_folder, filename)))
+    if variant_response is not None:
+        return variant_response
+    
+    response = send_from_directory(os.path.abspath(charts_folder), filename, etag=False, conditional=False,
+                                   max_age=current_app.config.get('CHART_CACHE_MAX_AGE', 31536000))
+    return _cacheable_chart_response(response, chart_key, filename)
+
+
+def _render_chart_job(app, timeline):
+    """Render a chart outside of the request that asked for it (CHART_ASYNC)."""
+    with app.app_context():
+        return render_timeline_chart(timeline)
+
+
+def _find_chart_spec(chart_key):
+    """Find the spec of a chart in the chart store, falling back to the stored user timelines."""
+    store = get_chart_store()
+    spec = store.get_spec(chart_key) if store is not None else None
+    if spec is None:
+        spec = get_chart_spec_by_hash(chart_key)
+    return spec
+
+
+def _cacheable_chart_response(response, chart_key, filename=None):
+    """Mark a content-addressed chart response as immutable and answer conditional requests."""
+    response.set_etag(chart_key)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('CHART_CACHE_MAX_AGE', 31536000)
+    response.cache_control.immutable = True
+    if filename is not None and _negotiable_chart_formats(filename):
+        # The same URL may be answered with another format for other clients
+        response.vary.add('Accept')
+    return response.make_conditional(request)
+
+
+def _negotiable_chart_formats(filename):
+    """Return the formats a chart may be sent in instead of its own (only PNG charts have any)."""
+    if not filename.endswith('.png'):
+        return ()
+    return current_app.config.get('CHART_NEGOTIATED_FORMATS', ())
+
+
+def _chart_variant_response(filename, chart_key, png_size, png_data=None):
+    """Send a WebP or AVIF encoding of a PNG chart if the client accepts one and it is smaller."""
+    for chart_format in negotiate_chart_formats(request.accept_mimetypes, _negotiable_chart_formats(filename)):
+        try:
+            data = load_chart_variant(filename, chart_format, png_data)
+        except Exception as e:
+            current_app.logger.error(f"Error encoding chart {filename} as {chart_format}: {e}")
+            continue
+        if data is None:
+            continue
+        
+        response = Response(data, mimetype=CHART_MIMETYPES[chart_format])
+        response = _cacheable_chart_response(response, f"{chart_key}-{chart_format}", filename)
+        if response.status_code == 200:
+            encoding_stats.record_variant_served(chart_format, png_size, len(data))
+        return response
+    return None
+
+
+@main.route('/chart-download')
+def download_chart():
+    """
+    Render a timeline chart for download.
+    
+    Used when charts are drawn in the browser (CHART_RENDERING = 'client'), so
+    the chart image is only rendered when a user asks for the file.
+    
+    Query parameters:
+        form_number: Form number
+        service_center: Service center
+        filing_date: Filing date in YYYY-MM-DD format
+        form_category: Optional form category
+    """
+    form_number = request.args.get('form_number', '')
+    service_center = request.args.get('service_center', '')
+    filing_date = request.args.get('filing_date', '')
+    form_category = request.args.get('form_category', '')
+    
+    data_item = get_processing_snapshot().lookup(form_number, service_center)
+    if not filing_date or data_item is None:
+        abort(404)
+    
+    try:
+        timeline = get_cached_timeline(data_item, filing_date, form_category)
+    except ValueError:
+        abort(400)
+    
+    try:
+        chart_path = plot_timeline(timeline)
+    except Exception as e:
+        current_app.logger.error(f"Error rendering chart for download: {e}")
+        abort(503)
+    return send_file(os.path.abspath(chart_path), as_attachment=True,
+                     download_name=f"{timeline.form_info.form_number}-timeline{os.path.splitext(chart_path)[1]}")
 
 
 @main.route('/about')
@@ -333,4 +536,178 @@ def api_form_options():
             'form_options': form_options,
             'form_categories': form_categories,
             'service_centers': service_centers
-        })
\ No newline at end of file
+        })
+
+
+@api.route('/timelines/batch', methods=['POST'])
+def api_timelines_batch():
+    """
+    API endpoint to calculate many timelines in one streaming request.
+    
+    The request body is NDJSON: one JSON object per line with form_number,
+    service_center, form_category (optional) and filing_date (YYYY-MM-DD).
+    Records are read and answered one at a time, so memory stays bounded
+    regardless of the size of the batch. A record that cannot be answered
+    gets an error line; the rest of the batch is still processed. Batch
+    timelines bypass the shared timeline cache so that large batches do not
+    evict the entries serving the calculator pages.
+    
+    Returns:
+        NDJSON response with one result per input line, in input order
+    """
+    snapshot = get_processing_snapshot()
+    
+    def generate():
+        for line_number, raw_line in enumerate(request.stream, start=1):
+            if not raw_line.strip():
+                continue
+            
+            result = {'line': line_number}
+            try:
+                record = json.loads(raw_line)
+                if not isinstance(record, dict):
+                    raise ValueError('Each line must be a JSON object.')
+                
+                form_number = record.get('form_number', '')
+                service_center = record.get('service_center', '')
+                filing_date = record.get('filing_date', '')
+                form_category = record.get('form_category') or ''
+                
+                if not form_number or not service_center or not filing_date:
+                    raise ValueError('form_number, service_center and filing_date are required.')
+                if not all(isinstance(value, str) for value in (form_number, service_center, filing_date, form_category)):
+                    raise ValueError('form_number, service_center, filing_date and form_category must be strings.')
+                
+                data_item = snapshot.lookup(form_number, service_center)
+                if data_item is None:
+                    raise ValueError('No data found for the specified form type and service center.')
+                
+                timeline = generate_timeline(data_item, filing_date, form_category)
+                result.update(success=True, timeline=timeline.to_dict())
+            except ValueError as e:
+                result.update(success=False, error=str(e))
+            except Exception as e:
+                current_app.logger.error(f"Error calculating batch timeline on line {line_number}: {e}")
+                result.update(success=False, error='Could not calculate the timeline for this record.')
+            
+            yield json.dumps(result) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@api.route('/timeline-chart-data', methods=['GET'])
+def api_timeline_chart_data():
+    """
+    API endpoint returning the data needed to draw a timeline chart in the browser.
+    
+    Query parameters:
+        form_number: Form number
+        service_center: Service center
+        filing_date: Filing date in YYYY-MM-DD format
+        form_category: Optional form category
+    
+    Returns:
+        JSON response with milestones, span, today marker, axis range and status texts
+    """
+    form_number = request.args.get('form_number', '')
+    service_center = request.args.get('service_center', '')
+    filing_date = request.args.get('filing_date', '')
+    form_category = request.args.get('form_category', '')
+    
+    if not form_number or not service_center or not filing_date:
+        return jsonify({
+            'success': False,
+            'error': 'form_number, service_center and filing_date are required.'
+        }), 400
+    
+    data_item = get_processing_snapshot().lookup(form_number, service_center)
+    if data_item is None:
+        return jsonify({
+            'success': False,
+            'error': 'No data found for the specified form type and service center.'
+        }), 404
+    
+    try:
+        timeline = get_cached_timeline(data_item, filing_date, form_category)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'chart': build_chart_data(timeline)
+    })
+
+
+@api.route('/charts/<filename>/status', methods=['GET'])
+def api_chart_status(filename):
+    """
+    API endpoint reporting whether a deferred chart is ready.
+    
+    Query parameters:
+        wait: Seconds to wait for a pending chart before answering (long polling),
+              capped at CHART_STATUS_MAX_WAIT
+    
+    Returns:
+        JSON response with the chart status ('pending', 'ready' or 'failed') and URL
+    """
+    chart_key = chart_key_from_filename(filename)
+    if chart_key is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown chart.'
+        }), 404
+    
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = 0
+    wait = max(0.0, min(wait, current_app.config.get('CHART_STATUS_MAX_WAIT', 10)))
+    
+    jobs = get_chart_jobs()
+    job = jobs.wait(filename, wait) if jobs is not None else None
+    
+    if job is not None and job.status in (JOB_PENDING, JOB_FAILED):
+        status = job.status
+    elif job is not None or chart_is_available(filename) or _find_chart_spec(chart_key) is not None:
+        # Charts without a job in this process are rendered on request by serve_chart,
+        # as long as the chart or its spec is known
+        status = 'ready'
+    else:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown chart.'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'status': status,
+        'chart_url': url_for('main.serve_chart', filename=filename)
+    })
+
+
+@api.route('/stats', methods=['GET'])
+def api_stats():
+    """
+    API endpoint exposing runtime cache statistics.
+    
+    Returns:
+        JSON response with timeline cache, chart renderer, store, cache, job and encoding,
+        cache warming, scraper HTTP cache and client, data import and refresh schedule statistics
+    """
+    return jsonify({
+        'success': True,
+        'timeline_cache': get_timeline_cache_stats(),
+        'chart_renderer': get_chart_renderer_stats(),
+        'chart_store': get_chart_store_stats(),
+        'chart_cache': get_chart_cache_stats(),
+        'chart_jobs': get_chart_job_stats(),
+        'chart_encoding': get_chart_encoding_stats(),
+        'cache_warming': get_cache_warming_stats(),
+        'http_cache': get_http_cache_stats(),
+        'http_client': get_http_client_stats(),
+        'data_import': get_data_import_stats(),
+        'refresh_scheduler': get_refresh_scheduler_stats()
+    })
@@ -0,0 +1,155 @@
+"""
+Cache warming after processing data refreshes.
+
+A refresh invalidates the timeline cache and changes every chart hash, so
+the first users for each popular form and service center would otherwise
+pay the full compute and render cost. After each successful refresh, a
+background thread recomputes the timelines and pre-renders the charts of
+the most requested calculations (ranked by recent user_timelines counts),
+stopping once its CPU budget is spent.
+"""
+
+import time
+import logging
+import datetime
+import threading
+from typing import Dict, Any, Optional
+
+from uscis.services.timeline import get_cached_timeline
+from uscis.services.scraping import get_processing_snapshot
+from uscis.services.database import get_popular_timeline_requests
+from uscis.services.visualization import (
+    timeline_chart_filename, chart_is_available, render_timeline_chart
+)
+from uscis.services.chart_renderer import get_chart_renderer
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Only one warming run at a time; a refresh during a run does not start another
+_warming_lock = threading.Lock()
+
+# Report of the most recent warming run
+_last_run: Optional[Dict[str, Any]] = None
+
+
+def server_renders_charts(config) -> bool:
+    """Check whether the configuration produces server-side chart files worth pre-rendering."""
+    if config.get('CHART_RENDERING') == 'client':
+        return False
+    # Inline SVG is rendered into the page on every request and never cached
+    return not (config.get('CHART_FORMAT') == 'svg' and config.get('CHART_INLINE_SVG'))
+
+
+def warm_caches(app) -> Dict[str, Any]:
+    """
+    Warm the timeline cache and chart storage for the most requested calculations.
+    
+    Args:
+        app: The Flask application instance
+    
+    Returns:
+        Report with durations and the number of warmed timelines and charts
+    """
+    global _last_run
+    
+    config = app.config
+    budget = config.get('CACHE_WARMING_CPU_BUDGET', 30)
+    render_charts = server_renders_charts(config)
+    
+    report = {
+        "started_at": datetime.datetime.now().isoformat(timespec='seconds'),
+        "candidates": 0,
+        "timelines_warmed": 0,
+        "charts_rendered": 0,
+        "charts_already_cached": 0,
+        "skipped": 0,
+        "budget_exhausted": False
+    }
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    # Time spent waiting on out-of-process renders counts against the budget too
+    remote_seconds = 0.0
+    
+    with app.app_context():
+        # Nothing is warmed when the request history cannot be read
+        popular = get_popular_timeline_requests(
+            config.get('CACHE_WARMING_TOP_N', 200),
+            config.get('CACHE_WARMING_LOOKBACK_DAYS', 7)
+        ) or []
+        report["candidates"] = len(popular)
+        snapshot = get_processing_snapshot()
+        
+        for item in popular:
+            if time.thread_time() - start_cpu + remote_seconds >= budget:
+                report["budget_exhausted"] = True
+                break
+            
+            data_item = snapshot.lookup(item["form_id"], item["center_name"])
+            if data_item is None:
+                report["skipped"] += 1
+                continue
+            
+            try:
+                timeline = get_cached_timeline(data_item, item["filing_date"].isoformat(),
+                                               item["category_name"])
+                report["timelines_warmed"] += 1
+                
+                if not render_charts:
+                    continue
+                if chart_is_available(timeline_chart_filename(timeline)):
+                    report["charts_already_cached"] += 1
+                    continue
+                
+                render_start = time.perf_counter()
+                render_timeline_chart(timeline)
+                if get_chart_renderer() is not None:
+                    remote_seconds += time.perf_counter() - render_start
+                report["charts_rendered"] += 1
+            except Exception as e:
+                logger.warning(f"Cache warming skipped {item['form_id']} at {item['center_name']}: {e}")
+                report["skipped"] += 1
+    
+    report["duration_seconds"] = round(time.perf_counter() - start_wall, 3)
+    report["cpu_seconds"] = round(time.thread_time() - start_cpu + remote_seconds, 3)
+    _last_run = report
+    
+    logger.info(f"Cache warming finished in {report['duration_seconds']}s "
+                f"({report['cpu_seconds']}s CPU): {report['timelines_warmed']} timelines, "
+                f"{report['charts_rendered']} charts rendered, "
+                f"{report['charts_already_cached']} already cached")
+    return report
+
+
+def start_cache_warming(app) -> bool:
+    """
+    Warm the caches in a background thread, off the request path.
+    
+    Args:
+        app: The Flask application instance
+    
+    Returns:
+        True if a warming run was started, False if one is already running
+    """
+    if not _warming_lock.acquire(blocking=False):
+        logger.info("Cache warming already in progress, skipping")
+        return False
+    
+    def run():
+        try:
+            warm_caches(app)
+        except Exception as e:
+            logger.error(f"Error warming caches: {e}")
+        finally:
+            _warming_lock.release()
+    
+    threading.Thread(target=run, name="cache-warming", daemon=True).start()
+    return True
+
+
+def get_cache_warming_stats() -> Dict[str, Any]:
+    """Return the report of the most recent warming run."""
+    return {
+        "running": _warming_lock.locked(),
+        "last_run": _last_run
+    }
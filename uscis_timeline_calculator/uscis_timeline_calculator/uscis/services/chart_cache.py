@@ -0,0 +1,127 @@
+"""
+In-process cache of rendered chart bytes.
+
+With CHART_STORAGE = 'memory', charts are rendered into memory and served
+straight from this cache instead of being written to CHARTS_FOLDER and read
+back on every request. The cache is bounded by total size and evicts the
+least recently used charts; CHARTS_FOLDER can still be used as a spill tier
+for charts that no longer fit.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Content types of the supported chart formats
+CHART_MIMETYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+    "avif": "image/avif"
+}
+
+
+class ChartCache:
+    """Thread-safe LRU cache of chart bytes keyed by chart file name, bounded by size in bytes."""
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def get(self, filename: str) -> Optional[bytes]:
+        """
+        Return the cached bytes of a chart and mark it as recently used.
+        
+        Args:
+            filename: Chart file name, e.g. timeline_<hash>.png
+        
+        Returns:
+            Chart bytes, or None if the chart is not cached
+        """
+        with self._lock:
+            data = self._entries.get(filename)
+            if data is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(filename)
+            self._hits += 1
+            return data
+    
+    def put(self, filename: str, data: bytes) -> None:
+        """
+        Add a chart to the cache, evicting the least recently used charts when over budget.
+        
+        Args:
+            filename: Chart file name, e.g. timeline_<hash>.png
+            data: Rendered chart bytes
+        """
+        # A chart larger than the whole cache would only evict everything else
+        if len(data) > self.max_bytes:
+            return
+        
+        with self._lock:
+            previous = self._entries.pop(filename, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[filename] = data
+            self._bytes += len(data)
+            
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+    
+    def __contains__(self, filename: str) -> bool:
+        with self._lock:
+            return filename in self._entries
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit and eviction statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "charts": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions
+            }
+
+
+# Shared chart cache, set up by configure_chart_cache()
+_chart_cache: Optional[ChartCache] = None
+
+
+def configure_chart_cache(max_bytes: int) -> ChartCache:
+    """
+    Create the shared in-memory chart cache.
+    
+    Args:
+        max_bytes: Maximum total size of the cached charts
+    
+    Returns:
+        The configured ChartCache
+    """
+    global _chart_cache
+    
+    _chart_cache = ChartCache(max_bytes)
+    return _chart_cache
+
+
+def get_chart_cache() -> Optional[ChartCache]:
+    """Return the shared chart cache, or None when charts are served from disk."""
+    return _chart_cache
+
+
+def get_chart_cache_stats() -> Dict[str, Any]:
+    """Return statistics for the shared chart cache."""
+    if _chart_cache is None:
+        return {"enabled": False}
+    return dict(_chart_cache.stats(), enabled=True)
@@ -0,0 +1,172 @@
+"""
+Chart image encoding and format negotiation.
+
+Matplotlib's default PNG output is full-color RGBA with default zlib
+compression, although a timeline chart only uses a handful of USCIS colors
+plus their anti-aliasing shades. This module encodes charts as palette PNGs
+with a tuned compression level, and transcodes them to WebP or AVIF for
+clients whose Accept header allows it. It also keeps track of the bytes the
+encoding saves.
+"""
+
+import io
+import threading
+from typing import Dict, Any, Iterable, List, Optional
+
+from uscis.services.chart_cache import CHART_MIMETYPES
+
+# Default encoding settings, overridden by the CHART_PNG_* / CHART_AVIF_* config
+DEFAULT_PNG_COLORS = 32
+DEFAULT_PNG_COMPRESS_LEVEL = 9
+DEFAULT_AVIF_QUALITY = 60
+
+
+def encode_image(image, chart_format: str, colors: int = DEFAULT_PNG_COLORS,
+                 compress_level: int = DEFAULT_PNG_COMPRESS_LEVEL,
+                 avif_quality: int = DEFAULT_AVIF_QUALITY) -> bytes:
+    """
+    Encode an RGB chart image.
+    
+    PNG and WebP are lossless encodings of the palette-quantized image; AVIF
+    is lossy.
+    
+    Args:
+        image: PIL image in RGB mode
+        chart_format: 'png', 'webp' or 'avif'
+        colors: Palette size for quantization (0 keeps full color)
+        compress_level: zlib compression level for PNG (0-9)
+        avif_quality: AVIF quality (0-100)
+    
+    Returns:
+        Encoded image bytes
+    """
+    from PIL import Image
+    
+    if colors and chart_format in ("png", "webp"):
+        image = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+    
+    buffer = io.BytesIO()
+    if chart_format == "png":
+        image.save(buffer, format="PNG", compress_level=compress_level)
+    elif chart_format == "webp":
+        image.save(buffer, format="WEBP", lossless=True, method=4)
+    elif chart_format == "avif":
+        image.save(buffer, format="AVIF", quality=avif_quality, speed=8)
+    else:
+        raise ValueError(f"Unsupported chart format: {chart_format}")
+    return buffer.getvalue()
+
+
+def baseline_png_size(image) -> int:
+    """Return the size of the image as a default full-color PNG, as matplotlib's savefig writes it."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return len(buffer.getvalue())
+
+
+def transcode_chart(png_data: bytes, chart_format: str, **options: Any) -> bytes:
+    """
+    Transcode a PNG chart to another format.
+    
+    Args:
+        png_data: PNG chart bytes
+        chart_format: Target format, 'webp' or 'avif'
+        **options: Encoding options passed to encode_image
+    
+    Returns:
+        Encoded image bytes
+    """
+    from PIL import Image
+    
+    with Image.open(io.BytesIO(png_data)) as image:
+        return encode_image(image.convert("RGB"), chart_format, **options)
+
+
+def format_supported(chart_format: str) -> bool:
+    """Check whether the installed Pillow can encode a format."""
+    from PIL import features
+    
+    return features.check(chart_format)
+
+
+def negotiate_chart_formats(accept_mimetypes, formats: Iterable[str]) -> List[str]:
+    """
+    Select the candidate formats the client explicitly accepts.
+    
+    Wildcards such as */* are ignored, so only clients that announce support
+    for a format receive it.
+    
+    Args:
+        accept_mimetypes: The request's parsed Accept header
+        formats: Candidate formats in order of preference
+    
+    Returns:
+        Accepted formats in order of preference (empty to serve the original chart)
+    """
+    accepted = {value for value, quality in accept_mimetypes if quality > 0}
+    return [chart_format for chart_format in formats
+            if CHART_MIMETYPES.get(chart_format) in accepted and format_supported(chart_format)]
+
+
+class ChartEncodingStats:
+    """
+    Counts encoded and served chart bytes and the bytes saved by encoding.
+    
+    Measuring what matplotlib's default PNG would have weighed costs an
+    extra encode, so it is done for one chart out of every sample_every.
+    """
+    
+    def __init__(self, sample_every: int = 10):
+        self.sample_every = sample_every
+        self._lock = threading.Lock()
+        self._png_charts = 0
+        self._png_bytes = 0
+        self._sampled_charts = 0
+        self._sampled_baseline_bytes = 0
+        self._sampled_png_bytes = 0
+        self._variants_served: Dict[str, int] = {}
+        self._variant_bytes_saved = 0
+    
+    def should_sample(self) -> bool:
+        """Decide whether the next encoded chart should also measure its baseline size."""
+        with self._lock:
+            return self.sample_every > 0 and self._png_charts % self.sample_every == 0
+    
+    def record_png(self, encoded_size: int, baseline_size: Optional[int] = None) -> None:
+        """Record an encoded PNG chart and, if measured, its default-PNG size."""
+        with self._lock:
+            self._png_charts += 1
+            self._png_bytes += encoded_size
+            if baseline_size is not None:
+                self._sampled_charts += 1
+                self._sampled_baseline_bytes += baseline_size
+                self._sampled_png_bytes += encoded_size
+    
+    def record_variant_served(self, chart_format: str, png_size: int, variant_size: int) -> None:
+        """Record a response that sent a negotiated format instead of the PNG."""
+        with self._lock:
+            self._variants_served[chart_format] = self._variants_served.get(chart_format, 0) + 1
+            self._variant_bytes_saved += png_size - variant_size
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return encoding counters and estimated savings."""
+        with self._lock:
+            ratio = (self._sampled_baseline_bytes / self._sampled_png_bytes
+                     if self._sampled_png_bytes else 1.0)
+            return {
+                "png_charts": self._png_charts,
+                "png_bytes": self._png_bytes,
+                "png_compression_ratio": round(ratio, 2),
+                "png_bytes_saved_estimate": int(self._png_bytes * ratio) - self._png_bytes,
+                "variants_served": dict(self._variants_served),
+                "variant_bytes_saved": self._variant_bytes_saved
+            }
+
+
+# Encoding statistics of this process
+encoding_stats = ChartEncodingStats()
+
+
+def get_chart_encoding_stats() -> Dict[str, Any]:
+    """Return statistics for chart encoding in this process."""
+    return encoding_stats.stats()
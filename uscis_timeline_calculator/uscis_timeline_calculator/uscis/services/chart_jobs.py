@@ -0,0 +1,195 @@
+"""
+Background chart jobs for deferred chart generation.
+
+With CHART_ASYNC enabled, /calculate answers with the results page right
+away and the chart is rendered by a small thread pool in the background. The
+page then asks the status endpoint whether the chart is ready. Jobs are keyed
+by chart file name, which is a content hash, so identical requests that
+arrive while a chart is still being rendered share one job. The number of
+queued and running jobs is bounded; when the queue is full, the results
+page links the chart directly and /charts renders it on request.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_PENDING = "pending"
+JOB_READY = "ready"
+JOB_FAILED = "failed"
+
+
+class ChartJobsBusy(RuntimeError):
+    """Raised when the job queue is full and a chart job cannot be accepted."""
+
+
+class ChartJob:
+    """State of one background chart render."""
+    
+    def __init__(self, key: str):
+        self.key = key
+        self.status = JOB_PENDING
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+
+class ChartJobQueue:
+    """
+    Runs chart renders in a thread pool and coalesces identical in-flight jobs.
+    
+    At most max_pending jobs are queued or running at a time. Finished jobs
+    are remembered (up to max_finished) so that clients polling after
+    completion still get an answer.
+    """
+    
+    def __init__(self, max_workers: int = 2, max_pending: int = 32, max_finished: int = 1024):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chart-job")
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, ChartJob] = {}
+        self._finished: "OrderedDict[str, ChartJob]" = OrderedDict()
+        self._submitted = 0
+        self._coalesced = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+    
+    def submit(self, key: str, func: Callable[..., Any], *args: Any) -> ChartJob:
+        """
+        Start a chart job unless an identical one is already running.
+        
+        Args:
+            key: Chart file name identifying the job
+            func: Function that renders the chart
+            *args: Arguments passed to func
+        
+        Returns:
+            The new or the already running job for key
+        
+        Raises:
+            ChartJobsBusy: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                self._coalesced += 1
+                return job
+            
+            # Apply backpressure instead of letting the executor queue grow without bound
+            if len(self._in_flight) >= self.max_pending:
+                self._rejected += 1
+                raise ChartJobsBusy(f"Chart job queue is full ({self.max_pending} pending jobs)")
+            
+            job = ChartJob(key)
+            self._in_flight[key] = job
+            self._finished.pop(key, None)
+            self._submitted += 1
+        
+        self._executor.submit(self._run, job, func, args)
+        return job
+    
+    def _run(self, job: ChartJob, func: Callable[..., Any], args: tuple) -> None:
+        try:
+            func(*args)
+            job.status = JOB_READY
+        except Exception as e:
+            logger.error(f"Error rendering chart {job.key} in the background: {e}")
+            job.status = JOB_FAILED
+            job.error = str(e)
+        
+        job.finished_at = time.time()
+        with self._lock:
+            self._in_flight.pop(job.key, None)
+            self._finished[job.key] = job
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+            if job.status == JOB_READY:
+                self._completed += 1
+            else:
+                self._failed += 1
+        job.done.set()
+    
+    def get(self, key: str) -> Optional[ChartJob]:
+        """Return the running or recently finished job for key, if any."""
+        with self._lock:
+            return self._in_flight.get(key) or self._finished.get(key)
+    
+    def wait(self, key: str, timeout: float) -> Optional[ChartJob]:
+        """
+        Return the job for key, waiting up to timeout seconds for it to finish.
+        
+        Args:
+            key: Chart file name identifying the job
+            timeout: Maximum number of seconds to wait (0 returns immediately)
+        
+        Returns:
+            The job, or None if no job is known for key
+        """
+        job = self.get(key)
+        if job is not None and timeout > 0:
+            job.done.wait(timeout)
+        return job
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return job counters."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": len(self._in_flight),
+                "submitted": self._submitted,
+                "coalesced": self._coalesced,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "failed": self._failed
+            }
+    
+    def shutdown(self) -> None:
+        """Stop accepting jobs; running jobs are allowed to finish."""
+        self._executor.shutdown(wait=False)
+
+
+# Shared job queue, set up by configure_chart_jobs()
+_chart_jobs: Optional[ChartJobQueue] = None
+
+
+def configure_chart_jobs(max_workers: int, max_pending: int) -> ChartJobQueue:
+    """
+    Create the shared background chart job queue.
+    
+    Args:
+        max_workers: Number of threads rendering charts
+        max_pending: Maximum number of queued or running jobs
+    
+    Returns:
+        The configured ChartJobQueue
+    """
+    global _chart_jobs
+    
+    if _chart_jobs is not None:
+        _chart_jobs.shutdown()
+    _chart_jobs = ChartJobQueue(max_workers, max_pending)
+    return _chart_jobs
+
+
+def get_chart_jobs() -> Optional[ChartJobQueue]:
+    """Return the shared job queue, or None when charts are rendered synchronously."""
+    return _chart_jobs
+
+
+def get_chart_job_stats() -> Dict[str, Any]:
+    """Return statistics for the shared job queue."""
+    if _chart_jobs is None:
+        return {"enabled": False}
+    return dict(_chart_jobs.stats(), enabled=True)
@@ -0,0 +1,245 @@
+"""
+Out-of-process chart rendering service.
+
+Matplotlib rendering is CPU heavy and holds the GIL for the whole render, so
+running it inside request threads stalls every other request handled by the
+same worker. This module renders charts in a bounded pool of separate
+processes instead. Jobs are described by a serializable chart spec (see
+visualization.build_chart_spec), have a per-job timeout, and are rejected
+when too many are already pending. A pool whose worker died is replaced and
+the job retried once; a pool with a timed-out worker is replaced as well.
+"""
+
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+
+class ChartRendererBusy(RuntimeError):
+    """Raised when the render queue is full and a job cannot be accepted."""
+
+
+class ChartRenderTimeout(RuntimeError):
+    """Raised when a render job does not finish within its timeout."""
+
+
+class ChartRenderService:
+    """
+    Renders chart specs in a bounded pool of worker processes.
+    
+    Workers are started with the "spawn" method so they never inherit the
+    locks or threads of the web process, and are created lazily on the
+    first job.
+    """
+    
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._rejected = 0
+        self._recycled = 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Started chart render pool with {self.max_workers} workers")
+            return self._executor
+    
+    def _recycle_executor(self, executor: ProcessPoolExecutor, terminate: bool = False) -> None:
+        """
+        Replace a broken or stuck process pool; the next job starts a new one.
+        
+        Args:
+            executor: Pool the failed job ran on
+            terminate: Kill the workers, for a pool with a worker stuck on a timed-out job
+        """
+        with self._executor_lock:
+            if self._executor is not executor:
+                # Another job already replaced this pool
+                return
+            self._executor = None
+        
+        with self._stats_lock:
+            self._recycled += 1
+        if terminate:
+            # ProcessPoolExecutor cannot cancel a running job; killing its
+            # workers fails the remaining jobs, which then retry on the new pool
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"Replaced chart render pool ({'worker timed out' if terminate else 'pool broken'})")
+    
+    def _job_finished(self, future) -> None:
+        """Release the queue slot of a finished job and record its outcome."""
+        self._slots.release()
+        with self._stats_lock:
+            self._pending -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+    
+    def render_bytes(self, spec: Dict[str, Any], encoding: Optional[Dict[str, Any]] = None,
+                     timeout: Optional[float] = None) -> Tuple[bytes, Optional[int]]:
+        """
+        Render a chart spec to PNG bytes in a worker process and wait for the result.
+        
+        Args:
+            spec: Serializable chart description
+            encoding: PNG encoding options (see visualization.png_encoding_options)
+            timeout: Seconds to wait for the job (defaults to the service timeout)
+        
+        Returns:
+            Tuple of the PNG bytes and the measured default PNG size (or None),
+            as returned by visualization.encode_chart_png
+        
+        Raises:
+            ChartRendererBusy: If max_pending jobs are already queued or running
+            ChartRenderTimeout: If the job did not finish in time
+        """
+        from uscis.services.visualization import encode_chart_png
+        
+        return self._run(encode_chart_png, (spec, encoding), spec.get("title", "chart"), timeout)
+    
+    def _submit(self, func, args: tuple) -> Tuple[ProcessPoolExecutor, Any]:
+        """Take a queue slot and submit a job, returning the pool and the future."""
+        # Apply backpressure instead of letting the queue grow without bound
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise ChartRendererBusy(f"Chart render queue is full ({self.max_pending} pending jobs)")
+        
+        executor = self._get_executor()
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._recycle_executor(executor)
+            raise
+        except Exception:
+            self._slots.release()
+            raise
+        
+        with self._stats_lock:
+            self._pending += 1
+            self._submitted += 1
+        future.add_done_callback(self._job_finished)
+        return executor, future
+    
+    def _run(self, func, args: tuple, description: str, timeout: Optional[float]) -> Any:
+        """Submit a render job to the pool and wait for its result, retrying once on a broken pool."""
+        for attempt in range(2):
+            try:
+                # A pool found broken on submit is already replaced by _submit
+                executor, future = self._submit(func, args)
+                try:
+                    return future.result(timeout=timeout if timeout is not None else self.timeout)
+                except BrokenProcessPool:
+                    self._recycle_executor(executor)
+                    raise
+                except FutureTimeoutError:
+                    future.cancel()
+                    with self._stats_lock:
+                        self._timed_out += 1
+                    # The stuck worker would keep its process and queue slot until it finishes
+                    self._recycle_executor(executor, terminate=True)
+                    raise ChartRenderTimeout(f"Chart render for {description} timed out")
+            except BrokenProcessPool as e:
+                if attempt:
+                    raise
+                logger.warning(f"Chart render pool broken while rendering {description}, retrying: {e}")
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs currently queued or running."""
+        with self._stats_lock:
+            return self._pending
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and job counters."""
+        with self._stats_lock:
+            return {
+                "mode": "process",
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timed_out": self._timed_out,
+                "rejected": self._rejected,
+                "recycled_pools": self._recycled
+            }
+    
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Shared render service, set up by configure_chart_renderer()
+_chart_renderer: Optional[ChartRenderService] = None
+
+
+def configure_chart_renderer(max_workers: int, max_pending: int, timeout: float) -> ChartRenderService:
+    """
+    Create the shared chart render service.
+    
+    Args:
+        max_workers: Number of worker processes
+        max_pending: Maximum number of queued or running jobs
+        timeout: Default per-job timeout in seconds
+    
+    Returns:
+        The configured ChartRenderService
+    """
+    global _chart_renderer
+    
+    if _chart_renderer is not None:
+        _chart_renderer.shutdown()
+    _chart_renderer = ChartRenderService(max_workers, max_pending, timeout)
+    return _chart_renderer
+
+
+def get_chart_renderer() -> Optional[ChartRenderService]:
+    """Return the shared chart render service, or None when rendering inline."""
+    return _chart_renderer
+
+
+def get_chart_renderer_stats() -> Dict[str, Any]:
+    """Return statistics for the shared chart render service."""
+    if _chart_renderer is None:
+        return {"mode": "inline"}
+    return _chart_renderer.stats()
+
+
+@atexit.register
+def _shutdown_chart_renderer() -> None:
+    if _chart_renderer is not None:
+        _chart_renderer.shutdown()
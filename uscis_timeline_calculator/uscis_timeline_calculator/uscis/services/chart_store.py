@@ -0,0 +1,302 @@
+"""
+Size-bounded store for rendered timeline charts.
+
+Every calculation renders a chart into CHARTS_FOLDER, so without housekeeping
+the folder only grows. The chart store keeps it within a byte and file budget:
+a background sweeper thread scans the folder and deletes the least recently
+used charts once the budget is exceeded. Access times are recorded on the
+files themselves (via os.utime), so the LRU order is shared by all worker
+processes that serve from the same folder. The specs of recently rendered
+charts are remembered so that evicted charts can be rendered again on demand.
+Timeline images named before charts were content-addressed
+(timeline_<form>_<timestamp>.png) count towards the budget and are evicted
+like any other chart.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Chart file names are derived from visualization.chart_hash
+CHART_FILENAME_PATTERN = re.compile(r"^timeline_([0-9a-f]{32})\.(png|svg|webp|avif)$")
+
+# Every chart file the store evicts, including the older timeline_<form>_<timestamp>.png names
+MANAGED_FILENAME_PATTERN = re.compile(r"^timeline_[\w.-]+\.(png|svg|webp|avif)$")
+
+# Temporary files from interrupted atomic writes are removed after this many seconds
+STALE_TEMP_FILE_SECONDS = 3600
+
+
+def chart_key_from_filename(filename: str) -> Optional[str]:
+    """
+    Extract the chart hash from a chart file name.
+    
+    Args:
+        filename: Chart file name, e.g. timeline_<hash>.png
+    
+    Returns:
+        The chart hash, or None if the name is not a chart file name
+    """
+    match = CHART_FILENAME_PATTERN.match(filename)
+    return match.group(1) if match else None
+
+
+class ChartStore:
+    """
+    Keeps a chart folder within a byte and file budget using LRU eviction.
+    
+    Sweeps evict down to low_water (a fraction of the budget) so that a busy
+    folder is not swept again after every new chart.
+    """
+    
+    def __init__(self, folder: str, max_bytes: int, max_files: int, sweep_interval: float = 300,
+                 spec_cache_size: int = 4096, low_water: float = 0.9):
+        self.folder = folder
+        self.folders = [folder]
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.sweep_interval = sweep_interval
+        self.spec_cache_size = spec_cache_size
+        self.low_water = low_water
+        
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._specs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        # Folder size as of the last sweep plus what this process wrote since
+        self._files = 0
+        self._bytes = 0
+        self._evictions = 0
+        self._evicted_bytes = 0
+        self._sweeps = 0
+        self._rerenders = 0
+        self._last_sweep_seconds = 0.0
+    
+    def add_folder(self, folder: str) -> None:
+        """
+        Also keep the charts in another folder within the budget.
+        
+        Args:
+            folder: Folder charts are written to besides the configured one (e.g. a fallback location)
+        """
+        with self._lock:
+            if all(os.path.abspath(folder) != os.path.abspath(known) for known in self.folders):
+                self.folders = self.folders + [folder]
+                logger.info(f"Chart store now also manages {folder}")
+    
+    def remember(self, chart_key: str, spec: Dict[str, Any]) -> None:
+        """Remember the spec of a rendered chart so it can be rendered again after eviction."""
+        with self._lock:
+            self._specs[chart_key] = spec
+            self._specs.move_to_end(chart_key)
+            while len(self._specs) > self.spec_cache_size:
+                self._specs.popitem(last=False)
+    
+    def get_spec(self, chart_key: str) -> Optional[Dict[str, Any]]:
+        """Return the remembered spec for a chart hash, if any."""
+        with self._lock:
+            return self._specs.get(chart_key)
+    
+    def record_write(self, chart_path: str, spec: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Account for a newly written chart.
+        
+        Wakes the sweeper early when the estimated folder size exceeds the budget.
+        
+        Args:
+            chart_path: Path of the chart file
+            spec: Chart spec the file was rendered from (optional)
+        """
+        chart_key = chart_key_from_filename(os.path.basename(chart_path))
+        if spec is not None and chart_key is not None:
+            self.remember(chart_key, spec)
+        
+        try:
+            size = os.path.getsize(chart_path)
+        except OSError:
+            return
+        
+        with self._lock:
+            self._files += 1
+            self._bytes += size
+            over_budget = self._over_budget(self._files, self._bytes)
+        if over_budget:
+            self._wake.set()
+    
+    def record_rerender(self) -> None:
+        """Count a chart that had to be rendered again after eviction."""
+        with self._lock:
+            self._rerenders += 1
+    
+    def touch(self, chart_path: str) -> None:
+        """Mark a chart as recently used."""
+        try:
+            os.utime(chart_path)
+        except OSError:
+            # The chart may have been evicted concurrently
+            pass
+    
+    def _over_budget(self, files: int, total_bytes: int) -> bool:
+        return (self.max_files > 0 and files > self.max_files) or \
+               (self.max_bytes > 0 and total_bytes > self.max_bytes)
+    
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """List the charts in the folders as (last access, size, path), removing stale temp files."""
+        entries = []
+        now = time.time()
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as scanner:
+                    for entry in scanner:
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        if entry.name.endswith('.tmp'):
+                            if now - stat.st_mtime > STALE_TEMP_FILE_SECONDS:
+                                self._remove(entry.path)
+                            continue
+                        if not MANAGED_FILENAME_PATTERN.match(entry.name):
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass
+        return entries
+    
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            # Another process evicted it first
+            return False
+    
+    def sweep(self) -> int:
+        """
+        Evict least recently used charts until the folder is within budget.
+        
+        Returns:
+            Number of charts evicted
+        """
+        with self._sweep_lock:
+            start = time.perf_counter()
+            entries = self._scan()
+            files = len(entries)
+            total_bytes = sum(size for _, size, _ in entries)
+            evicted = 0
+            evicted_bytes = 0
+            
+            if self._over_budget(files, total_bytes):
+                target_files = int(self.max_files * self.low_water)
+                target_bytes = int(self.max_bytes * self.low_water)
+                entries.sort()
+                for _, size, path in entries:
+                    if not ((self.max_files > 0 and files > target_files) or
+                            (self.max_bytes > 0 and total_bytes > target_bytes)):
+                        break
+                    if self._remove(path):
+                        evicted += 1
+                        evicted_bytes += size
+                    files -= 1
+                    total_bytes -= size
+            
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._files = files
+                self._bytes = total_bytes
+                self._evictions += evicted
+                self._evicted_bytes += evicted_bytes
+                self._sweeps += 1
+                self._last_sweep_seconds = elapsed
+        
+        if evicted:
+            logger.info(f"Evicted {evicted} charts ({evicted_bytes} bytes) from {self.folder}")
+        return evicted
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping chart store {self.folder}: {e}")
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+    
+    def start(self) -> None:
+        """Start the background sweeper thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chart-store-sweeper", daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the background sweeper thread."""
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return store size and eviction counters."""
+        with self._lock:
+            return {
+                "files": self._files,
+                "bytes": self._bytes,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "evicted_bytes": self._evicted_bytes,
+                "rerenders": self._rerenders,
+                "sweeps": self._sweeps,
+                "last_sweep_ms": round(self._last_sweep_seconds * 1000, 2),
+                "remembered_specs": len(self._specs)
+            }
+
+
+# Shared chart store, set up by configure_chart_store()
+_chart_store: Optional[ChartStore] = None
+
+
+def configure_chart_store(folder: str, max_bytes: int, max_files: int, sweep_interval: float,
+                          spec_cache_size: int) -> ChartStore:
+    """
+    Create the shared chart store and start its sweeper thread.
+    
+    Args:
+        folder: Folder the charts are written to
+        max_bytes: Byte budget for the folder (0 for no limit)
+        max_files: File budget for the folder (0 for no limit)
+        sweep_interval: Seconds between sweeps
+        spec_cache_size: Number of chart specs remembered for re-rendering
+    
+    Returns:
+        The configured ChartStore
+    """
+    global _chart_store
+    
+    if _chart_store is not None:
+        _chart_store.stop()
+    _chart_store = ChartStore(folder, max_bytes, max_files, sweep_interval, spec_cache_size)
+    _chart_store.start()
+    return _chart_store
+
+
+def get_chart_store() -> Optional[ChartStore]:
+    """Return the shared chart store, or None when charts are not managed."""
+    return _chart_store
+
+
+def get_chart_store_stats() -> Dict[str, Any]:
+    """Return statistics for the shared chart store."""
+    if _chart_store is None:
+        return {"enabled": False}
+    return dict(_chart_store.stats(), enabled=True)
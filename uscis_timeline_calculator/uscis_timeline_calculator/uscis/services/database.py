@@ -6,13 +6,17 @@ from the database tables.
 """
 
 import os
+import json
+import hashlib
 import logging
 import datetime
 from typing import List, Dict, Any, Optional, Tuple
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from flask import current_app, g
 
+from uscis.services.timeline import months_to_days, inquiry_cutoff_date
+
 # Configure module-level logger
 logger = logging.getLogger(__name__)
 
@@ -70,6 +74,40 @@ def init_db():
             
             # Create other tables as in your original code...
             
+            # Precomputed day offsets for processing times
+            cursor.execute("""
+                ALTER TABLE IF EXISTS processing_times
+                ADD COLUMN IF NOT EXISTS min_days INTEGER,
+                ADD COLUMN IF NOT EXISTS median_days INTEGER,
+                ADD COLUMN IF NOT EXISTS max_days INTEGER
+            """)
+            
+            # Content address of the chart rendered for a user timeline
+            cursor.execute("""
+                ALTER TABLE IF EXISTS user_timelines
+                ADD COLUMN IF NOT EXISTS chart_hash VARCHAR(64),
+                ADD COLUMN IF NOT EXISTS chart_spec JSONB,
+                ADD COLUMN IF NOT EXISTS created_at TIMESTAMP
+            """)
+            
+            # Only new rows get a creation time; a default on ADD COLUMN would
+            # stamp every existing row with the time of the migration
+            cursor.execute("""
+                ALTER TABLE IF EXISTS user_timelines
+                ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP
+            """)
+            
+            # Evicted charts are looked up by hash to render them again
+            cursor.execute("""
+                DO $$
+                BEGIN
+                    IF to_regclass('user_timelines') IS NOT NULL THEN
+                        CREATE INDEX IF NOT EXISTS idx_user_timelines_chart_hash
+                        ON user_timelines (chart_hash);
+                    END IF;
+                END $$
+            """)
+            
         conn.commit()
         logger.info("Database initialized successfully")
     except Exception as e:
@@ -285,6 +323,8 @@ def insert_processing_time(
     """
     Insert a new processing time or update if it already exists.
     Sets the active flag to True and any previous entries to False.
+    Day offsets are precomputed at write time; the inquiry receipt date is
+    derived on read since it depends on the current date.
     
     Args:
         form_id: Form ID
@@ -300,8 +340,10 @@ def insert_processing_time(
     """
     conn = get_db_connection()
     try:
-        # Calculate receipt date for inquiry (max_months converted to days)
-        receipt_date = datetime.datetime.now() - datetime.timedelta(days=int(max_months * 30.5))
+        # Precompute day offsets so timeline math is integer arithmetic
+        min_days = months_to_days(min_months)
+        median_days = months_to_days(median_months)
+        max_days = months_to_days(max_months)
         
         # First, deactivate any existing active records for this combination
         with conn.cursor() as cursor:
@@ -318,11 +360,11 @@ def insert_processing_time(
             cursor.execute("""
                 INSERT INTO processing_times 
                 (form_id, center_id, category_id, min_months, median_months, max_months, 
-                 last_updated, receipt_date_for_inquiry, active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, TRUE)
+                 min_days, median_days, max_days, last_updated, active)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, TRUE)
                 RETURNING time_id
             """, (form_id, center_id, category_id, min_months, median_months, max_months, 
-                  last_updated, receipt_date))
+                  min_days, median_days, max_days, last_updated))
             time_id = cursor.fetchone()['time_id']
         
         conn.commit()
@@ -408,6 +450,8 @@ def insert_user_timeline(
     median_completion_date: datetime.date,
     latest_completion_date: datetime.date,
     chart_path: Optional[str] = None,
+    chart_hash: Optional[str] = None,
+    chart_spec: Optional[Dict[str, Any]] = None,
     user_ip: Optional[str] = None
 ) -> int:
     """
@@ -422,6 +466,8 @@ def insert_user_timeline(
         median_completion_date: Median estimated completion date
         latest_completion_date: Latest estimated completion date
         chart_path: Path to the chart image (optional)
+        chart_hash: Content hash identifying the chart image (optional)
+        chart_spec: Chart spec used to render the chart again after eviction (optional)
         user_ip: User IP address (optional)
     
     Returns:
@@ -433,11 +479,12 @@ def insert_user_timeline(
             cursor.execute("""
                 INSERT INTO user_timelines
                 (form_id, center_id, category_id, filing_date, earliest_completion_date,
-                 median_completion_date, latest_completion_date, chart_path, user_ip)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                 median_completion_date, latest_completion_date, chart_path, chart_hash, chart_spec, user_ip)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING timeline_id
             """, (form_id, center_id, category_id, filing_date, earliest_completion_date,
-                  median_completion_date, latest_completion_date, chart_path, user_ip))
+                  median_completion_date, latest_completion_date, chart_path, chart_hash,
+                  Json(chart_spec) if chart_spec is not None else None, user_ip))
             timeline_id = cursor.fetchone()['timeline_id']
         conn.commit()
         logger.info(f"Successfully inserted user timeline for {form_id} with ID {timeline_id}")
@@ -475,6 +522,66 @@ def get_user_timeline(timeline_id: int) -> Optional[Dict[str, Any]]:
         logger.error(f"Error getting user timeline {timeline_id}: {e}")
         return None
 
+def get_popular_timeline_requests(limit: int, days: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get the most frequently requested timeline calculations of the recent past.
+    
+    Args:
+        limit: Maximum number of calculations to return
+        days: Number of days to look back
+    
+    Returns:
+        List of dictionaries with form_id, center_name, category_name, filing_date
+        and request_count, most requested first. Rows without a created_at
+        (recorded before the column was added) are never counted as recent.
+        None if the database could not be read, so callers can tell an error
+        from a quiet period.
+    """
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT ut.form_id, sc.center_name, fc.category_name, ut.filing_date,
+                       COUNT(*) AS request_count
+                FROM user_timelines ut
+                JOIN service_centers sc ON ut.center_id = sc.center_id
+                LEFT JOIN form_categories fc ON ut.category_id = fc.category_id
+                WHERE ut.created_at IS NOT NULL
+                  AND ut.created_at >= NOW() - %s * INTERVAL '1 day'
+                GROUP BY ut.form_id, sc.center_name, fc.category_name, ut.filing_date
+                ORDER BY request_count DESC
+                LIMIT %s
+            """, (days, limit))
+            return cursor.fetchall()
+    except Exception as e:
+        logger.error(f"Error getting popular timeline requests: {e}")
+        return None
+
+def get_chart_spec_by_hash(chart_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the chart spec stored with a user timeline, by chart hash.
+    
+    Args:
+        chart_hash: Content hash identifying the chart image
+    
+    Returns:
+        Chart spec dictionary or None if not found (or the database is unavailable)
+    """
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT chart_spec
+                FROM user_timelines
+                WHERE chart_hash = %s AND chart_spec IS NOT NULL
+                LIMIT 1
+            """, (chart_hash,))
+            row = cursor.fetchone()
+        return row['chart_spec'] if row else None
+    except Exception as e:
+        logger.error(f"Error getting chart spec {chart_hash}: {e}")
+        return None
+
 # Data import functions
 def bulk_import_processing_times(data: List[Dict[str, Any]]) -> Tuple[int, int]:
     """
@@ -498,13 +605,7 @@ def bulk_import_processing_times(data: List[Dict[str, Any]]) -> Tuple[int, int]:
             min_months = float(item.get('min_months', 0))
             median_months = float(item.get('median_months', 0))
             max_months = float(item.get('max_months', 0))
-            
-            # Parse last_updated date
-            last_updated_str = item.get('last_updated')
-            try:
-                last_updated = datetime.datetime.strptime(last_updated_str, '%B %d, %Y')
-            except (ValueError, TypeError):
-                last_updated = datetime.datetime.now()
+            last_updated = parse_last_updated(item.get('last_updated'))
             
             # First ensure the form exists
             if not insert_form(form_number, form_number, form_description):
@@ -534,6 +635,164 @@ def bulk_import_processing_times(data: List[Dict[str, Any]]) -> Tuple[int, int]:
     
     return (success_count, error_count)
 
+def parse_last_updated(last_updated_str: Optional[str]) -> datetime.datetime:
+    """Parse a scraped last_updated date such as 'March 5, 2025', defaulting to now."""
+    try:
+        return datetime.datetime.strptime(last_updated_str, '%B %d, %Y')
+    except (ValueError, TypeError):
+        return datetime.datetime.now()
+
+def processing_time_hash(form_number: str, service_center: str, form_description: Optional[str],
+                         min_months: float, median_months: float, max_months: float) -> str:
+    """
+    Hash the values of a processing time row that an import would write.
+    
+    last_updated is left out on purpose: the scraper stamps every row with the
+    scrape date, so it changes on every refresh even when USCIS did not.
+    
+    Returns:
+        Hex digest identifying the row content
+    """
+    # float() only unifies the scraped values with the database's numeric type;
+    # the values themselves are hashed unrounded
+    content = [form_number, service_center, form_description or "",
+               float(min_months), float(median_months), float(max_months)]
+    return hashlib.sha1(json.dumps(content).encode('utf-8')).hexdigest()
+
+def get_active_processing_time_hashes() -> Optional[Dict[Tuple[str, str], str]]:
+    """
+    Get the content hashes of the active processing times without a category.
+    
+    Returns:
+        Dictionary mapping (form number, service center name) to processing_time_hash,
+        or None if the database could not be read
+    """
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT pt.form_id, sc.center_name, f.description AS form_description,
+                       pt.min_months, pt.median_months, pt.max_months
+                FROM processing_times pt
+                JOIN forms f ON pt.form_id = f.form_id
+                JOIN service_centers sc ON pt.center_id = sc.center_id
+                WHERE pt.active = TRUE AND pt.category_id IS NULL
+            """)
+            rows = cursor.fetchall()
+        
+        return {
+            (row["form_id"], row["center_name"]): processing_time_hash(
+                row["form_id"], row["center_name"], row["form_description"],
+                row["min_months"], row["median_months"], row["max_months"]
+            )
+            for row in rows
+        }
+    except Exception as e:
+        logger.error(f"Error getting active processing times: {e}")
+        return None
+
+def touch_processing_times(data: List[Dict[str, Any]]) -> int:
+    """
+    Update last_updated of the active processing times of the given rows in one statement.
+    
+    Args:
+        data: List of dictionaries with processing time data
+    
+    Returns:
+        Number of updated rows, or -1 on error
+    """
+    if not data:
+        return 0
+    
+    values = [(item.get('form_number'), item.get('service_center'), parse_last_updated(item.get('last_updated')))
+              for item in data]
+    try:
+        conn = get_db_connection()
+    except Exception as e:
+        logger.error(f"Error updating last_updated of unchanged processing times: {e}")
+        return -1
+    
+    try:
+        with conn.cursor() as cursor:
+            # page_size covers all rows, so execute_values sends a single UPDATE
+            execute_values(cursor, """
+                UPDATE processing_times pt
+                SET last_updated = v.last_updated
+                FROM service_centers sc, (VALUES %s) AS v (form_id, center_name, last_updated)
+                WHERE pt.center_id = sc.center_id AND
+                      pt.form_id = v.form_id AND sc.center_name = v.center_name AND
+                      pt.active = TRUE AND pt.category_id IS NULL
+            """, values, template="(%s, %s, %s::timestamp)", page_size=len(values))
+            updated = cursor.rowcount
+        conn.commit()
+        return updated
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error updating last_updated of unchanged processing times: {e}")
+        return -1
+
+def import_processing_time_changes(data: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Import only the processing times that differ from the active rows.
+    
+    Each scraped row is compared with the active row for the same form and
+    service center by content hash. Unchanged rows only get their
+    last_updated refreshed, in a single UPDATE, so refreshes no longer
+    deactivate and re-insert identical rows; the added and changed rows are
+    imported with one bulk import. Active rows missing from the scrape are
+    counted as removed but stay active, as with a full import. If the active
+    rows cannot be read, every row is imported.
+    
+    Args:
+        data: List of dictionaries with processing time data
+    
+    Returns:
+        Dictionary with added, changed, unchanged, removed and error counts;
+        added and changed count the rows sent for import, and any of them
+        that failed to import are counted as errors too
+    """
+    active_hashes = get_active_processing_time_hashes()
+    if active_hashes is None:
+        success_count, error_count = bulk_import_processing_times(data)
+        return {"added": 0, "changed": success_count, "unchanged": 0, "removed": 0, "errors": error_count}
+    
+    counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0, "errors": 0}
+    to_import = []
+    unchanged = []
+    seen = set()
+    
+    for item in data:
+        key = (item.get('form_number'), item.get('service_center'))
+        seen.add(key)
+        try:
+            content_hash = processing_time_hash(
+                key[0], key[1], item.get('form_description'),
+                item.get('min_months', 0), item.get('median_months', 0), item.get('max_months', 0)
+            )
+        except (TypeError, ValueError) as e:
+            logger.error(f"Invalid processing time data for {key[0]} at {key[1]}: {e}")
+            counts["errors"] += 1
+            continue
+        
+        previous_hash = active_hashes.get(key)
+        if previous_hash == content_hash:
+            unchanged.append(item)
+            continue
+        to_import.append(item)
+        counts["added" if previous_hash is None else "changed"] += 1
+    
+    counts["unchanged"] = len(unchanged)
+    counts["removed"] = sum(1 for key in active_hashes if key not in seen)
+    
+    # Only the timestamp of unchanged rows is stale, so a failure here is logged but not counted
+    touch_processing_times(unchanged)
+    
+    if to_import:
+        _, error_count = bulk_import_processing_times(to_import)
+        counts["errors"] += error_count
+    
+    return counts
+
 def import_form_categories(form_categories: Dict[str, List[str]]) -> Tuple[int, int]:
     """
     Import form categories from a dictionary.
@@ -604,15 +863,33 @@ def get_filtered_data_from_db(form_number=None, service_center=None) -> List[Dic
         
         # Convert database records to the expected format
         for pt in processing_times:
+            min_months = float(pt["min_months"])
+            median_months = float(pt["median_months"])
+            max_months = float(pt["max_months"])
+            
+            # Rows written before day offsets were stored fall back to converting months
+            min_days = pt.get("min_days")
+            median_days = pt.get("median_days")
+            max_days = pt.get("max_days")
+            if min_days is None:
+                min_days = months_to_days(min_months)
+            if median_days is None:
+                median_days = months_to_days(median_months)
+            if max_days is None:
+                max_days = months_to_days(max_months)
+            
             result.append({
                 "form_number": pt["form_id"],
                 "form_description": pt["form_description"],
                 "service_center": pt["center_name"],
-                "min_months": float(pt["min_months"]),
-                "median_months": float(pt["median_months"]),
-                "max_months": float(pt["max_months"]),
+                "min_months": min_months,
+                "median_months": median_months,
+                "max_months": max_months,
+                "min_days": min_days,
+                "median_days": median_days,
+                "max_days": max_days,
                 "last_updated": pt["last_updated"].strftime("%B %d, %Y"),
-                "receipt_date_for_inquiry": pt["receipt_date_for_inquiry"].strftime("%B %d, %Y") if pt["receipt_date_for_inquiry"] else None
+                "receipt_date_for_inquiry": inquiry_cutoff_date(max_days).strftime("%B %d, %Y")
             })
         
         return result
@@ -0,0 +1,121 @@
+"""
+Pluggable HTML parsing for the scrapers.
+
+Building a full BeautifulSoup tree of the processing times page with the
+pure-Python html.parser is by far the slowest step of a scrape, although
+only a few nodes are needed. This module extracts just those nodes and uses
+the fastest backend installed: selectolax (lexbor), then lxml, then
+BeautifulSoup restricted to the target nodes with a SoupStrainer.
+"""
+
+import logging
+from typing import Dict, Callable, List, Optional, Tuple
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference
+PARSER_BACKENDS = ("selectolax", "lxml", "bs4")
+
+
+def _select_options_selectolax(html: str, select_id: str) -> Optional[List[Tuple[str, str]]]:
+    from selectolax.lexbor import LexborHTMLParser
+    
+    select = LexborHTMLParser(html).css_first(f'select[id="{select_id}"]')
+    if select is None:
+        return None
+    return [(option.attributes.get("value") or "", option.text(deep=True).strip())
+            for option in select.css("option")]
+
+
+def _select_options_lxml(html: str, select_id: str) -> Optional[List[Tuple[str, str]]]:
+    import lxml.html
+    
+    selects = lxml.html.fromstring(html).xpath("//select[@id=$select_id]", select_id=select_id)
+    if not selects:
+        return None
+    return [(option.get("value") or "", option.text_content().strip())
+            for option in selects[0].iter("option")]
+
+
+def _select_options_bs4(html: str, select_id: str) -> Optional[List[Tuple[str, str]]]:
+    from bs4 import BeautifulSoup, SoupStrainer
+    
+    # Only the select element is built into a tree
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("select", id=select_id))
+    select = soup.find("select")
+    if select is None:
+        return None
+    return [(option.get("value") or "", option.text.strip()) for option in select.find_all("option")]
+
+
+_SELECT_OPTIONS: Dict[str, Callable[[str, str], Optional[List[Tuple[str, str]]]]] = {
+    "selectolax": _select_options_selectolax,
+    "lxml": _select_options_lxml,
+    "bs4": _select_options_bs4
+}
+
+# Backend chosen by get_parser_backend() when none is configured
+_default_backend: Optional[str] = None
+
+
+def backend_available(backend: str) -> bool:
+    """Check whether the library of a parser backend is installed."""
+    module = {"selectolax": "selectolax.lexbor", "lxml": "lxml.html", "bs4": "bs4"}[backend]
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends() -> List[str]:
+    """Return the installed parser backends in order of preference."""
+    return [backend for backend in PARSER_BACKENDS if backend_available(backend)]
+
+
+def get_parser_backend(preferred: Optional[str] = None) -> str:
+    """
+    Choose the parser backend to use.
+    
+    Args:
+        preferred: Backend name, or None / 'auto' for the fastest installed one
+    
+    Returns:
+        Name of the backend
+    
+    Raises:
+        ValueError: If the preferred backend is unknown or not installed
+    """
+    global _default_backend
+    
+    if preferred and preferred != "auto":
+        if preferred not in _SELECT_OPTIONS:
+            raise ValueError(f"Unknown HTML parser backend: {preferred}")
+        if not backend_available(preferred):
+            raise ValueError(f"HTML parser backend {preferred} is not installed")
+        return preferred
+    
+    if _default_backend is None:
+        backends = available_backends()
+        if not backends:
+            raise ValueError("No HTML parser backend is installed (selectolax, lxml or beautifulsoup4)")
+        _default_backend = backends[0]
+        logger.info(f"Using {_default_backend} for HTML parsing")
+    return _default_backend
+
+
+def select_options(html: str, select_id: str, backend: Optional[str] = None) -> Optional[List[Tuple[str, str]]]:
+    """
+    Extract the options of a select element without building a tree of the whole page.
+    
+    Args:
+        html: Page HTML
+        select_id: id attribute of the select element
+        backend: Parser backend (defaults to the fastest installed one)
+    
+    Returns:
+        (value, stripped text) of each option in document order, or None if
+        the page has no such select element
+    """
+    return _SELECT_OPTIONS[get_parser_backend(backend)](html, select_id)
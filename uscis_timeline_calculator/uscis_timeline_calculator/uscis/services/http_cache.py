@@ -0,0 +1,194 @@
+"""
+On-disk cache of scraped HTTP responses for conditional GETs.
+
+The USCIS pages and API payloads change far less often than they are
+scraped. This cache keeps the ETag, Last-Modified and body of each scraped
+URL on disk and sends If-None-Match / If-Modified-Since on the next request,
+so an unchanged resource is answered with an empty 304 instead of the full
+payload. Callers can then skip parsing and importing altogether. The cache
+does not depend on Flask, so the standalone form scraper (create.py) can use
+it too.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Any, Optional, Tuple
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+
+class HTTPResponseCache:
+    """
+    Stores validators and bodies of scraped responses, one JSON file per URL.
+    
+    Only responses that carry an ETag or Last-Modified header are stored,
+    since nothing else can be revalidated. Revalidation outcomes are counted
+    per endpoint.
+    """
+    
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+    
+    def _path(self, url: str) -> str:
+        return os.path.join(self.folder, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json")
+    
+    def load(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry for a URL.
+        
+        Args:
+            url: Requested URL
+        
+        Returns:
+            Dictionary with url, etag, last_modified, body and stored_at, or None
+        """
+        try:
+            with open(self._path(url), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+    
+    def cached_text(self, url: str) -> Optional[str]:
+        """Return the cached body of a URL, e.g. after a 304 response."""
+        entry = self.load(url)
+        return entry["body"] if entry is not None else None
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Return the If-None-Match / If-Modified-Since headers for a URL, if it is cached."""
+        entry = self.load(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    def store(self, url: str, response) -> bool:
+        """
+        Store a 200 response if it can be revalidated later.
+        
+        Args:
+            url: Requested URL
+            response: requests.Response
+        
+        Returns:
+            True if the response was stored
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False
+        
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": response.text,
+            "stored_at": time.time()
+        }
+        path = self._path(url)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not cache response for {url}: {e}")
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def invalidate(self, url: str) -> None:
+        """Drop a URL so that the next request downloads it in full."""
+        try:
+            os.remove(self._path(url))
+        except FileNotFoundError:
+            pass
+    
+    def fetch(self, get: Callable[..., Any], url: str, endpoint: str,
+              headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> Tuple[Any, bool]:
+        """
+        Send a conditional GET for a URL and cache the response.
+        
+        Args:
+            get: Function sending the request, e.g. requests.get or a session's get
+            url: URL to request
+            endpoint: Endpoint name the outcome is counted under
+            headers: Request headers
+            **kwargs: Further arguments for get (e.g. timeout)
+        
+        Returns:
+            Tuple of the response and whether the server answered 304 Not Modified
+        """
+        request_headers = dict(headers or {})
+        request_headers.update(self.conditional_headers(url))
+        response = get(url, headers=request_headers, **kwargs)
+        
+        not_modified = response.status_code == 304
+        self._record(endpoint, not_modified)
+        if response.status_code == 200:
+            self.store(url, response)
+        return response, not_modified
+    
+    def _record(self, endpoint: str, not_modified: bool) -> None:
+        with self._lock:
+            counters = self._endpoints.setdefault(endpoint, {"requests": 0, "not_modified": 0})
+            counters["requests"] += 1
+            if not_modified:
+                counters["not_modified"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return request and 304 counts with the hit ratio per endpoint."""
+        with self._lock:
+            return {
+                "folder": self.folder,
+                "endpoints": {
+                    endpoint: dict(counters, hit_ratio=round(counters["not_modified"] / counters["requests"], 4))
+                    for endpoint, counters in self._endpoints.items()
+                }
+            }
+
+
+# Shared response cache, set up by configure_http_cache()
+_http_cache: Optional[HTTPResponseCache] = None
+
+
+def configure_http_cache(folder: str) -> HTTPResponseCache:
+    """
+    Create the shared HTTP response cache.
+    
+    Args:
+        folder: Folder the cached responses are stored in
+    
+    Returns:
+        The configured HTTPResponseCache
+    """
+    global _http_cache
+    
+    _http_cache = HTTPResponseCache(folder)
+    return _http_cache
+
+
+def get_http_cache() -> Optional[HTTPResponseCache]:
+    """Return the shared HTTP response cache, or None when scraping without it."""
+    return _http_cache
+
+
+def get_http_cache_stats() -> Dict[str, Any]:
+    """Return statistics for the shared HTTP response cache."""
+    if _http_cache is None:
+        return {"enabled": False}
+    return dict(_http_cache.stats(), enabled=True)
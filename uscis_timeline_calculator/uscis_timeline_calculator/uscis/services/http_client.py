@@ -0,0 +1,242 @@
+"""
+Shared HTTP client for all scraping code.
+
+Scraping used to call bare requests.get, opening a new connection per
+request and giving up on the first transient error. This module provides
+one client per process with a pooled requests.Session, so the main page and
+the API endpoints reuse kept-alive connections, and retries failed requests
+with exponential backoff and jitter within a total time budget per request.
+Every request to a host first takes a token from that host's adaptive token
+bucket, which sets the politeness level of all scraping in one place. It
+does not depend on Flask, so the standalone form scraper (create.py)
+shares the same client.
+"""
+
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+
+from uscis.services.rate_limit import TokenBucket
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Responses that are worth retrying
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HTTPBudgetExceeded(requests.exceptions.Timeout):
+    """Raised when a request and its retries do not finish within the time budget."""
+
+
+class HTTPClient:
+    """
+    Pooled HTTP session with retries, exponential backoff and jitter.
+    
+    Each call to get() may take at most time_budget seconds in total, across
+    all attempts and the waits between them, including waits for the rate
+    limiter. Retry-After headers on 429 and 503 responses are honored within
+    that budget by pausing the host's token bucket.
+    """
+    
+    def __init__(self, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5,
+                 backoff_max: float = 10.0, time_budget: float = 60.0, timeout: float = 15.0,
+                 rate_limit: float = 1.0, rate_burst: int = 1):
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.time_budget = time_budget
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        
+        # One token bucket per host; a rate limit of 0 disables rate limiting
+        self._buckets: Dict[str, TokenBucket] = {}
+        
+        # Retries are handled by get() so that they count against the time budget
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._budget_exhausted = 0
+    
+    def _bucket(self, url: str) -> Optional[TokenBucket]:
+        """Return the token bucket of the URL's host."""
+        if self.rate_limit <= 0:
+            return None
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate_limit, self.rate_burst)
+            return bucket
+    
+    @staticmethod
+    def _retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        """Return the Retry-After delay of a 429 or 503 response, if it gives one in seconds."""
+        if response is not None and response.status_code in (429, 503):
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return None
+    
+    def _backoff(self, attempt: int) -> float:
+        """Return the delay before the next attempt: exponential with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+    
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+            **kwargs: Any) -> requests.Response:
+        """
+        Send a GET request, retrying connection errors, timeouts and 429/5xx responses.
+        
+        Args:
+            url: URL to request
+            headers: Request headers
+            timeout: Per-attempt timeout in seconds (defaults to the client timeout)
+            **kwargs: Further arguments for requests.Session.get
+        
+        Returns:
+            The response; after the last retry this may still be an error response
+        
+        Raises:
+            requests.RequestException: If the last attempt failed without a response
+            HTTPBudgetExceeded: If the time budget ran out before any response arrived
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = time.monotonic() + self.time_budget
+        bucket = self._bucket(url)
+        response = None
+        error: Optional[Exception] = None
+        
+        for attempt in range(self.max_retries + 1):
+            if bucket is not None and bucket.acquire(max_wait=deadline - time.monotonic()) is None:
+                with self._lock:
+                    self._budget_exhausted += 1
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self._budget_exhausted += 1
+                break
+            
+            with self._lock:
+                self._requests += 1
+                if attempt:
+                    self._retries += 1
+            try:
+                response = self.session.get(url, headers=headers, timeout=min(timeout, remaining), **kwargs)
+                error = None
+                if response.status_code not in RETRY_STATUSES:
+                    if bucket is not None:
+                        bucket.succeeded()
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response = None
+                error = e
+            
+            # The server pushing back slows down every request to the host, not just this one
+            retry_after = self._retry_after(response)
+            pushed_back = retry_after is not None or (response is not None and response.status_code == 429)
+            if bucket is not None and pushed_back:
+                bucket.throttled(retry_after)
+            
+            if attempt == self.max_retries:
+                break
+            # A Retry-After pause is waited out in the bucket before the next attempt
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if time.monotonic() + delay >= deadline:
+                with self._lock:
+                    self._budget_exhausted += 1
+                break
+            logger.info(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1} of {self.max_retries}): "
+                        f"{error or response.status_code}")
+            if bucket is None or retry_after is None:
+                time.sleep(delay)
+        
+        with self._lock:
+            self._failures += 1
+        if response is not None:
+            return response
+        if error is not None:
+            raise error
+        raise HTTPBudgetExceeded(f"Request to {url} exceeded its {self.time_budget}s time budget")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return request, retry and failure counters and the rate limiter state per host."""
+        with self._lock:
+            buckets = dict(self._buckets)
+            stats = {
+                "pool_size": self.pool_size,
+                "requests": self._requests,
+                "retries": self._retries,
+                "failures": self._failures,
+                "budget_exhausted": self._budget_exhausted
+            }
+        stats["rate_limit"] = {host: bucket.stats() for host, bucket in buckets.items()}
+        return stats
+    
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+
+# Shared client, set up by configure_http_client() or on first use
+_http_client: Optional[HTTPClient] = None
+_http_client_lock = threading.Lock()
+
+
+def configure_http_client(pool_size: int, max_retries: int, backoff_factor: float, backoff_max: float,
+                          time_budget: float, timeout: float, rate_limit: float, rate_burst: int) -> HTTPClient:
+    """
+    Create the shared scraping HTTP client.
+    
+    Args:
+        pool_size: Maximum number of kept-alive connections per host
+        max_retries: Retries after the first attempt
+        backoff_factor: Base delay of the exponential backoff in seconds
+        backoff_max: Maximum delay between two attempts in seconds
+        time_budget: Maximum total seconds per request, including retries
+        timeout: Default per-attempt timeout in seconds
+        rate_limit: Requests per second per host (0 disables rate limiting)
+        rate_burst: Requests per host that may be sent at once after an idle period
+    
+    Returns:
+        The configured HTTPClient
+    """
+    global _http_client
+    
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = HTTPClient(pool_size, max_retries, backoff_factor, backoff_max, time_budget, timeout,
+                                  rate_limit, rate_burst)
+        return _http_client
+
+
+def get_http_client() -> HTTPClient:
+    """Return the shared scraping HTTP client, creating one with default settings if needed."""
+    global _http_client
+    
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HTTPClient()
+    return _http_client
+
+
+def get_http_client_stats() -> Dict[str, Any]:
+    """Return statistics for the shared scraping HTTP client."""
+    if _http_client is None:
+        return {"enabled": False}
+    return dict(_http_client.stats(), enabled=True)
@@ -0,0 +1,106 @@
+"""
+Adaptive token-bucket rate limiting for scraping requests.
+
+Scraping used to space requests with fixed sleeps and intervals, whether or
+not USCIS was under pressure. A token bucket lets requests to a host go out
+as fast as the configured rate allows, with short bursts up to the bucket
+size, and adapts to the server: a 429 halves the rate and a Retry-After
+header pauses the host, after which successful requests bring the rate back
+up to the configured one. The shared HTTP client keeps one bucket per host.
+"""
+
+import time
+import threading
+from typing import Dict, Any, Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with multiplicative slow-down and additive recovery.
+    
+    Tokens refill at the current rate up to burst. Each request takes one
+    token, waiting for it when the bucket is empty; waiting callers queue up
+    by reserving tokens in advance, so concurrent threads are spaced out too.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1, min_rate: Optional[float] = None):
+        """
+        Args:
+            rate: Requests per second when the server is not pushing back
+            burst: Requests that may be sent at once after an idle period
+            min_rate: Lowest rate 429 responses can slow the bucket down to (default: rate / 8)
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._waited = 0.0
+        self._throttled = 0
+    
+    def _refill(self, now: float) -> None:
+        # _updated lies in the future while the host is paused by Retry-After
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+    
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Take a token, waiting until one is available.
+        
+        Args:
+            max_wait: Maximum seconds to wait (None waits as long as needed)
+        
+        Returns:
+            Seconds waited, or None if the token would not be available within max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            delay = max(0.0, self._updated - now) + max(0.0, 1 - self._tokens) / self.rate
+            if max_wait is not None and delay > max_wait:
+                return None
+            self._tokens -= 1
+            self._acquired += 1
+            self._waited += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+    
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Slow down after the server pushed back (429, or 503 with Retry-After).
+        
+        Args:
+            retry_after: Seconds the server asked to wait before the next request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                # No tokens are handed out before the pause is over
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = max(self._updated, now + retry_after)
+    
+    def succeeded(self) -> None:
+        """Recover a tenth of the configured rate after a successful request."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the current rate and the acquired, waited and throttled counters."""
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "burst": self.burst,
+                "acquired": self._acquired,
+                "waited_seconds": round(self._waited, 3),
+                "throttled": self._throttled
+            }
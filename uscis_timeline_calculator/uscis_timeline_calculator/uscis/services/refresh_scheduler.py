@@ -0,0 +1,262 @@
+"""
+Adaptive scheduling of processing data refreshes.
+
+The background thread used to refresh the processing times every
+DATA_UPDATE_INTERVAL, however often USCIS actually changed them. This module
+tracks, per form and service center, when the processing times were last
+checked and last changed, and gives each pair its own refresh interval:
+pairs whose times changed since the last check are due again sooner, and
+pairs that stayed the same back off. The USCIS page covers every form in
+one request, so scraping whenever any single pair is due would never scrape
+less than the fixed schedule; instead the page is scraped once pairs
+carrying DATA_UPDATE_DUE_FRACTION of the total weight are due, where the
+most requested pairs weigh more.
+Failed scrapes are retried with exponential backoff.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from uscis.services.database import get_popular_timeline_requests, processing_time_hash
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Rows of popular timeline requests read to rank form/office pairs by traffic
+TRAFFIC_QUERY_LIMIT = 1000
+
+
+class RefreshScheduler:
+    """
+    Per form/office refresh intervals that adapt to how often the data changes.
+    
+    Every pair starts at base_interval. A check that finds the pair changed
+    divides its interval by backoff, a check that finds it unchanged
+    multiplies it by backoff, within [min_interval, max_interval].
+    
+    Every pair weighs 1; each of the hot_pairs most requested pairs also
+    weighs its share of their requests, scaled so that all requests together
+    weigh as much as all pairs. A refresh is due once the due pairs reach
+    due_fraction of the total weight.
+    """
+    
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float,
+                 backoff: float = 2.0, hot_pairs: int = 20, due_fraction: float = 0.5):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.base_interval = min(max(base_interval, self.min_interval), self.max_interval)
+        self.backoff = backoff
+        self.hot_pairs = hot_pairs
+        self.due_fraction = min(max(due_fraction, 0.0), 1.0)
+        self._lock = threading.Lock()
+        # (form number, service center) -> hash, interval, last_checked, last_changed, changes
+        self._pairs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._hot: Dict[Tuple[str, str], int] = {}
+        self._last_attempt: Optional[float] = None
+        self._last_failed = False
+        self._consecutive_failures = 0
+        self._refreshes = 0
+        self._failures = 0
+        self._started_at = time.time()
+    
+    def _check(self, state: Dict[str, Any], changed: bool, now: float) -> None:
+        state["last_checked"] = now
+        if changed:
+            state["last_changed"] = now
+            state["changes"] += 1
+            state["interval"] = max(self.min_interval, state["interval"] / self.backoff)
+        else:
+            state["interval"] = min(self.max_interval, state["interval"] * self.backoff)
+    
+    def record_scrape(self, data: Optional[List[Dict[str, Any]]], now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Update the per-pair intervals with the outcome of a scrape.
+        
+        Args:
+            data: Scraped processing time rows, None if the page was not modified,
+                or an empty list if the scrape failed
+            now: Time of the scrape (defaults to the current time)
+        
+        Returns:
+            Dictionary with the number of new, changed and unchanged pairs
+        """
+        now = now if now is not None else time.time()
+        counts = {"new": 0, "changed": 0, "unchanged": 0}
+        
+        with self._lock:
+            self._last_attempt = now
+            self._refreshes += 1
+            self._last_failed = data is not None and not data
+            if self._last_failed:
+                # A failed scrape changes no interval; it is retried with backoff
+                self._failures += 1
+                self._consecutive_failures += 1
+                return counts
+            self._consecutive_failures = 0
+            
+            if data is None:
+                for state in self._pairs.values():
+                    self._check(state, False, now)
+                counts["unchanged"] = len(self._pairs)
+                return counts
+            
+            for item in data:
+                key = (item.get('form_number'), item.get('service_center'))
+                try:
+                    content_hash = processing_time_hash(
+                        key[0], key[1], item.get('form_description'),
+                        item.get('min_months', 0), item.get('median_months', 0), item.get('max_months', 0)
+                    )
+                except (TypeError, ValueError):
+                    continue
+                
+                state = self._pairs.get(key)
+                if state is None:
+                    self._pairs[key] = {"hash": content_hash, "interval": self.base_interval,
+                                        "last_checked": now, "last_changed": now, "changes": 0}
+                    counts["new"] += 1
+                    continue
+                changed = state["hash"] != content_hash
+                state["hash"] = content_hash
+                self._check(state, changed, now)
+                counts["changed" if changed else "unchanged"] += 1
+        
+        logger.info(f"Refresh schedule: {counts['changed']} pairs changed, {counts['unchanged']} unchanged, "
+                    f"{counts['new']} new; next refresh in {self.next_refresh_delay(now) / 3600:.1f} h")
+        return counts
+    
+    def update_traffic(self, request_counts: Dict[Tuple[str, str], int]) -> None:
+        """
+        Mark the most requested form/office pairs as hot, so that they weigh more.
+        
+        Args:
+            request_counts: Recent timeline requests per (form number, service center)
+        """
+        ranked = sorted(request_counts.items(), key=lambda item: item[1], reverse=True)[:self.hot_pairs]
+        with self._lock:
+            self._hot = {key: count for key, count in ranked if count > 0}
+    
+    def _due_at(self) -> List[Tuple[float, Tuple[str, str]]]:
+        return sorted((state["last_checked"] + state["interval"], key)
+                      for key, state in self._pairs.items())
+    
+    def _weight(self, key: Tuple[str, str], total_requests: int) -> float:
+        if not total_requests:
+            return 1.0
+        return 1.0 + len(self._pairs) * self._hot.get(key, 0) / total_requests
+    
+    def next_refresh_at(self) -> float:
+        """Return the time the next refresh is due, as a Unix timestamp."""
+        with self._lock:
+            if self._last_attempt is None:
+                return time.time()
+            if self._last_failed:
+                # min_interval, doubling with each further failure up to base_interval
+                retry_delay = self.min_interval * self.backoff ** (self._consecutive_failures - 1)
+                return self._last_attempt + min(self.base_interval, retry_delay)
+            earliest = self._last_attempt + self.min_interval
+            due = self._due_at()
+            if not due:
+                # Nothing learned yet (e.g. the page was not modified since before a restart)
+                return self._last_attempt + self.base_interval
+            
+            total_requests = sum(count for key, count in self._hot.items() if key in self._pairs)
+            weights = [self._weight(key, total_requests) for _, key in due]
+            threshold = self.due_fraction * sum(weights)
+            weight_due = 0.0
+            for (due_at, _), weight in zip(due, weights):
+                weight_due += weight
+                if weight_due >= threshold:
+                    return max(earliest, due_at)
+            return max(earliest, due[-1][0])
+    
+    def next_refresh_delay(self, now: Optional[float] = None) -> float:
+        """Return the seconds until the next refresh is due (0 if it is due now)."""
+        now = now if now is not None else time.time()
+        return max(0.0, self.next_refresh_at() - now)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the tracked pairs, their intervals and the refreshes done and saved."""
+        now = time.time()
+        next_delay = self.next_refresh_delay(now)
+        with self._lock:
+            intervals = sorted(state["interval"] for state in self._pairs.values())
+            due_first = [f"{form} @ {center}" for _, (form, center) in self._due_at()[:5]]
+            fixed_refreshes = int((now - self._started_at) / self.base_interval) + 1
+            return {
+                "tracked_pairs": len(self._pairs),
+                "hot_pairs": len(self._hot),
+                "refreshes": self._refreshes,
+                "failures": self._failures,
+                "fixed_schedule_refreshes": fixed_refreshes,
+                "next_refresh_in": round(next_delay),
+                "due_first": due_first,
+                "interval_seconds": {
+                    "min": round(intervals[0]) if intervals else None,
+                    "median": round(intervals[len(intervals) // 2]) if intervals else None,
+                    "max": round(intervals[-1]) if intervals else None
+                }
+            }
+
+
+def update_form_traffic(scheduler: RefreshScheduler, lookback_days: int) -> None:
+    """
+    Rank form/office pairs by recent timeline requests and pass them to the scheduler.
+    
+    Must be called within an application context.
+    
+    Args:
+        scheduler: Scheduler to update
+        lookback_days: Days of user_timelines to count
+    """
+    popular = get_popular_timeline_requests(TRAFFIC_QUERY_LIMIT, lookback_days)
+    if popular is None:
+        # Keep the previous ranking when the database is unavailable
+        logger.warning("Could not read timeline traffic for the refresh schedule, keeping the previous ranking")
+        return
+    
+    request_counts: Dict[Tuple[str, str], int] = {}
+    for row in popular:
+        key = (row['form_id'], row['center_name'])
+        request_counts[key] = request_counts.get(key, 0) + row['request_count']
+    scheduler.update_traffic(request_counts)
+
+
+# Shared scheduler, set up by configure_refresh_scheduler()
+_refresh_scheduler: Optional[RefreshScheduler] = None
+
+
+def configure_refresh_scheduler(base_interval: float, min_interval: float, max_interval: float,
+                                hot_pairs: int, due_fraction: float = 0.5) -> RefreshScheduler:
+    """
+    Create the shared refresh scheduler.
+    
+    Args:
+        base_interval: Starting interval in seconds, and the longest wait after failed refreshes
+        min_interval: Shortest interval between two refreshes in seconds
+        max_interval: Longest interval a stable pair backs off to in seconds
+        hot_pairs: Number of most requested form/office pairs that weigh more
+        due_fraction: Share of the traffic-weighted pairs that must be due before a refresh
+    
+    Returns:
+        The configured RefreshScheduler
+    """
+    global _refresh_scheduler
+    
+    _refresh_scheduler = RefreshScheduler(base_interval, min_interval, max_interval, hot_pairs=hot_pairs,
+                                          due_fraction=due_fraction)
+    return _refresh_scheduler
+
+
+def get_refresh_scheduler() -> Optional[RefreshScheduler]:
+    """Return the shared refresh scheduler, or None when refreshes run on the fixed interval."""
+    return _refresh_scheduler
+
+
+def get_refresh_scheduler_stats() -> Dict[str, Any]:
+    """Return statistics for the shared refresh scheduler."""
+    if _refresh_scheduler is None:
+        return {"enabled": False}
+    return dict(_refresh_scheduler.stats(), enabled=True)
@@ -9,15 +9,23 @@ import os
 import json
 import logging
 import datetime
-import requests
-from bs4 import BeautifulSoup
+import random
+import functools
+import threading
 from typing import List, Dict, Any, Optional
-import numpy as np
 from flask import current_app
 
+from uscis.services.http_cache import get_http_cache
+from uscis.services.http_client import get_http_client
+from uscis.services.refresh_scheduler import get_refresh_scheduler
+from uscis.services.timeline import (
+    invalidate_timeline_cache, add_day_offsets, months_to_days, inquiry_cutoff_date,
+    timeline_cache
+)
+
 # Import database functions
 from uscis.services.database import (
-    bulk_import_processing_times, import_form_categories,
+    import_processing_time_changes, import_form_categories,
     insert_service_center, get_filtered_data_from_db
 )
 
@@ -27,16 +35,29 @@ logger = logging.getLogger(__name__)
 # Global storage for processing time data (used as a fallback when database is unavailable)
 processing_time_data = []
 
+# Indexed snapshot of the active processing time data, see get_processing_snapshot()
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+# Service center lookups remembered per snapshot
+SNAPSHOT_LOOKUP_CACHE_SIZE = 4096
+
+# Outcome of the most recent processing time import, see get_data_import_stats()
+_last_import: Optional[Dict[str, Any]] = None
 
-def scrape_processing_times() -> List[Dict[str, Any]]:
+
+def scrape_processing_times() -> Optional[List[Dict[str, Any]]]:
     """
     Scrape the USCIS processing times page.
     
     Uses the official USCIS methodology: the processing time is the amount of time
     it took USCIS to complete 80% of adjudicated cases over the last six months.
+    With the HTTP cache enabled, the page is requested conditionally and is not
+    parsed again when USCIS answers 304 Not Modified.
     
     Returns:
-        A list of dictionaries with processing time data
+        A list of dictionaries with processing time data, or None if the page
+        has not changed since the last scrape
     """
     url = current_app.config['USCIS_PROCESSING_TIMES_URL']
     headers = {
@@ -48,16 +69,23 @@ def scrape_processing_times() -> List[Dict[str, Any]]:
     
     try:
         logger.info(f"Initiating data scraping from {url}")
-        response = requests.get(url, headers=headers, 
-                               timeout=current_app.config['SCRAPING_TIMEOUT'])
+        http_client = get_http_client()
+        http_cache = get_http_cache()
+        if http_cache is not None:
+            response, not_modified = http_cache.fetch(http_client.get, url, "processing-times", headers=headers,
+                                                      timeout=current_app.config['SCRAPING_TIMEOUT'])
+            if not_modified:
+                logger.info("USCIS processing times page not modified since the last scrape")
+                return None
+        else:
+            response = http_client.get(url, headers=headers, 
+                                       timeout=current_app.config['SCRAPING_TIMEOUT'])
         
         if response.status_code != 200:
             logger.error(f"Failed to retrieve data from USCIS website. "
                         f"Status code: {response.status_code}")
             return []
             
-        soup = BeautifulSoup(response.text, "html.parser")
-        
         # Extract data from the HTML
         data = []
         logger.info("Parsing USCIS webpage for processing times")
@@ -66,7 +94,7 @@ def scrape_processing_times() -> List[Dict[str, Any]]:
         # For this project, we'll use a mix of realistic fixed data and simulated data
         
         # Extract the form data from the page
-        form_data = extract_form_data_from_html(soup)
+        form_data = extract_form_data_from_html(response.text)
         
         if form_data:
             data.extend(form_data)
@@ -82,12 +110,16 @@ def scrape_processing_times() -> List[Dict[str, Any]]:
         return []
 
 
-def extract_form_data_from_html(soup: BeautifulSoup) -> List[Dict[str, Any]]:
+def extract_form_data_from_html(html: str) -> List[Dict[str, Any]]:
     """
-    Extract processing time data from the BeautifulSoup object.
+    Extract processing time data from the processing times page.
+    
+    The page is not parsed into a full tree; extraction of specific elements
+    should go through uscis.services.html_parsing, which only builds the
+    nodes it needs with the fastest installed parser.
     
     Args:
-        soup: BeautifulSoup object containing the parsed HTML
+        html: HTML of the processing times page
         
     Returns:
         List of dictionaries with processing time data
@@ -145,16 +177,15 @@ def extract_form_data_from_html(soup: BeautifulSoup) -> List[Dict[str, Any]]:
         
         for form in realistic_form_data:
             for center in form["service_centers"]:
-                data.append({
+                data.append(add_day_offsets({
                     "form_number": form["form_number"],
                     "form_description": form["form_description"],
                     "service_center": center["name"],
                     "min_months": center["min_months"],
                     "median_months": center["median_months"],
                     "max_months": center["max_months"],
-                    "last_updated": last_updated,
-                    "receipt_date_for_inquiry": calculate_receipt_date_for_inquiry(center["max_months"])
-                })
+                    "last_updated": last_updated
+                }))
         
         return data
     
@@ -231,7 +262,7 @@ def generate_simulated_data() -> List[Dict[str, Any]]:
                 center_factor = 1.0
             
             # Calculate median processing time (with some random variation)
-            random_variation = np.random.uniform(0.9, 1.1)
+            random_variation = random.uniform(0.9, 1.1)
             median_months = round(base_median * center_factor * random_variation, 1)
             
             # Calculate min and max processing times
@@ -241,16 +272,15 @@ def generate_simulated_data() -> List[Dict[str, Any]]:
             # Current date for last update
             last_updated = datetime.datetime.now().strftime("%B %d, %Y")
             
-            data.append({
+            data.append(add_day_offsets({
                 "form_number": visa["form"],
                 "form_description": visa["description"],
                 "service_center": center,
                 "min_months": min_months,
                 "median_months": median_months,
                 "max_months": max_months,
-                "last_updated": last_updated,
-                "receipt_date_for_inquiry": calculate_receipt_date_for_inquiry(max_months)
-            })
+                "last_updated": last_updated
+            }))
     
     return data
 
@@ -265,9 +295,22 @@ def calculate_receipt_date_for_inquiry(months: float) -> str:
     Returns:
         String representing the cutoff date for inquiries
     """
-    today = datetime.datetime.now()
-    inquiry_date = today - datetime.timedelta(days=int(months * 30.5))
-    return inquiry_date.strftime("%B %d, %Y")
+    return inquiry_cutoff_date(months_to_days(months)).strftime("%B %d, %Y")
+
+
+def with_inquiry_cutoff(data_item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of a processing time row with its inquiry cutoff derived from today's date.
+    
+    Args:
+        data_item: Processing time row with precomputed day offsets
+        
+    Returns:
+        Copy of the row including receipt_date_for_inquiry
+    """
+    item = dict(data_item)
+    item["receipt_date_for_inquiry"] = inquiry_cutoff_date(item["max_days"]).strftime("%B %d, %Y")
+    return item
 
 
 def load_fallback_data() -> List[Dict[str, Any]]:
@@ -285,7 +328,8 @@ def load_fallback_data() -> List[Dict[str, Any]]:
             with open(fallback_path, "r") as f:
                 data = json.load(f)
                 logger.info(f"Successfully loaded fallback data from {fallback_path}")
-                return data
+                # Older fallback files predate the precomputed day offsets
+                return [add_day_offsets(item) for item in data]
     except Exception as e:
         logger.error(f"Error loading fallback data: {e}")
     
@@ -294,10 +338,51 @@ def load_fallback_data() -> List[Dict[str, Any]]:
     return generate_simulated_data()
 
 
-def update_processing_data() -> None:
+def import_processing_data(data: List[Dict[str, Any]], source: str) -> bool:
+    """
+    Write the processing times that changed to the database and record the outcome.
+    
+    Args:
+        data: Processing time rows
+        source: Where the rows came from ('scraped' or 'fallback'), for the report
+    
+    Returns:
+        True if any row was added or changed (or could not be compared), so cached
+        timelines computed from the previous data are stale
+    """
+    global _last_import
+    
+    report = import_processing_time_changes(data)
+    if report["errors"]:
+        # A 304 on the next poll would leave the failed rows unimported
+        invalidate_scrape_cache()
+    _last_import = dict(report, source=source,
+                        finished_at=datetime.datetime.now().isoformat(timespec='seconds'))
+    logger.info(f"Database import ({source}): {report['added']} added, {report['changed']} changed, "
+                f"{report['unchanged']} unchanged, {report['removed']} removed, {report['errors']} errors")
+    return bool(report["added"] or report["changed"] or report["errors"])
+
+
+def invalidate_scrape_cache() -> None:
+    """Drop the cached processing times page so that the next scrape downloads and imports it in full."""
+    http_cache = get_http_cache()
+    if http_cache is not None:
+        http_cache.invalidate(current_app.config['USCIS_PROCESSING_TIMES_URL'])
+
+
+def get_data_import_stats() -> Dict[str, Any]:
+    """Return the report of the most recent processing time import."""
+    return {"last_import": _last_import}
+
+
+def update_processing_data() -> bool:
     """
     Update the global processing_time_data by scraping real data and storing in database.
     If scraping fails, use fallback data.
+    
+    Returns:
+        True if newly scraped data was imported, False if the data is unchanged
+        or fallback data is used
     """
     global processing_time_data
     
@@ -305,13 +390,28 @@ def update_processing_data() -> None:
         logger.info("Updating processing time data...")
         new_data = scrape_processing_times()
         
+        # Let the refresh schedule learn which forms changed
+        scheduler = get_refresh_scheduler()
+        if scheduler is not None:
+            scheduler.record_scrape(new_data)
+        
+        if new_data is None:
+            # The database already holds the current data; skip the import
+            logger.info("Processing times unchanged, skipping import.")
+            if not processing_time_data:
+                processing_time_data = load_fallback_data()
+            return False
+        
         if new_data and len(new_data) > 0:
-            # Store the new data in the database
-            success_count, error_count = bulk_import_processing_times(new_data)
-            logger.info(f"Database import: {success_count} successful, {error_count} errors")
+            # Store the rows that changed in the database
+            data_changed = import_processing_data(new_data, "scraped")
             
             # Also update the global variable for fallback
             processing_time_data = new_data
+            if not data_changed:
+                logger.info("Scraped data matches the active processing times.")
+                return False
+            invalidate_timeline_cache()
             logger.info("Successfully updated with newly scraped data.")
             
             # Save the current data as fallback for future use
@@ -322,12 +422,15 @@ def update_processing_data() -> None:
                 logger.info(f"Saved current data as fallback data to {fallback_path}")
             except Exception as e:
                 logger.warning(f"Failed to save fallback data: {e}")
+            
+            return True
         else:
             logger.warning("Scraping failed or returned empty data. Using fallback data.")
             processing_time_data = load_fallback_data()
             
             # Try to import the fallback data into the database
-            bulk_import_processing_times(processing_time_data)
+            import_processing_data(processing_time_data, "fallback")
+            invalidate_timeline_cache()
             
             # Also import form categories
             form_categories = {
@@ -355,6 +458,11 @@ def update_processing_data() -> None:
     except Exception as e:
         logger.error(f"Error in update_processing_data: {e}")
         processing_time_data = load_fallback_data()
+        
+        # Download the page in full next time so the failed import is retried
+        invalidate_scrape_cache()
+    
+    return False
 
 
 def get_filtered_data(form_number: Optional[str] = None, 
@@ -391,7 +499,7 @@ def get_filtered_data(form_number: Optional[str] = None,
             filtered_data = [item for item in filtered_data 
                             if service_center.lower() in item["service_center"].lower()]
         
-        return filtered_data
+        return [with_inquiry_cutoff(item) for item in filtered_data]
     
     except Exception as e:
         logger.error(f"Error in get_filtered_data: {e}")
@@ -453,4 +561,82 @@ def find_unique_values() -> Dict[str, Any]:
     return {
         "form_options": form_options,
         "service_centers": service_centers
-    }
\ No newline at end of file
+    }
+
+
+class ProcessingDataSnapshot:
+    """
+    Indexed, read-only view of the active processing time data.
+    
+    Resolves (form number, service center) lookups with the same matching rules
+    as get_filtered_data, but from memory, so batch callers do not issue one
+    database query per record. Rows keep the order get_filtered_data returned
+    them in, so the first match is the one /calculate picks. The snapshot
+    lives until the next import, possibly for days, so the inquiry cutoff is
+    derived again on every lookup instead of being taken from the stored row.
+    """
+    
+    def __init__(self, data: List[Dict[str, Any]], data_version: int):
+        self.data_version = data_version
+        self._by_form: Dict[str, List[Dict[str, Any]]] = {}
+        # Bounded, since service center fragments come straight from requests
+        self._match = functools.lru_cache(maxsize=SNAPSHOT_LOOKUP_CACHE_SIZE)(self._find)
+        
+        for item in data:
+            self._by_form.setdefault(item["form_number"].lower(), []).append(item)
+    
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._by_form.values())
+    
+    def lookup(self, form_number: str, service_center: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the processing time row for a form and (partial) service center name.
+        
+        Args:
+            form_number: Form number, matched case-insensitively
+            service_center: Service center name or a fragment of it
+        
+        Returns:
+            Copy of the first matching row with today's inquiry cutoff, or None if nothing matches
+        """
+        form_key = form_number.lower()
+        if form_key not in self._by_form:
+            return None
+        item = self._match(form_key, service_center.lower())
+        return with_inquiry_cutoff(item) if item is not None else None
+    
+    def _find(self, form_key: str, center_key: str) -> Optional[Dict[str, Any]]:
+        for item in self._by_form[form_key]:
+            if center_key in item["service_center"].lower():
+                return item
+        return None
+
+
+def get_processing_snapshot() -> ProcessingDataSnapshot:
+    """
+    Return the indexed snapshot of the active processing time data.
+    
+    The snapshot is built with a single get_filtered_data call and reused until
+    update_processing_data imports new data.
+    
+    Returns:
+        ProcessingDataSnapshot for the current dataset version
+    """
+    global _snapshot
+    
+    data_version = timeline_cache.data_version
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.data_version == data_version:
+        return snapshot
+    
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot.data_version == data_version:
+            return _snapshot
+        
+        snapshot = ProcessingDataSnapshot(get_filtered_data(), data_version)
+        logger.info(f"Built processing data snapshot with {len(snapshot)} rows (data version {data_version})")
+        
+        # Do not pin an empty snapshot; the data may simply not be loaded yet
+        if len(snapshot):
+            _snapshot = snapshot
+        return snapshot
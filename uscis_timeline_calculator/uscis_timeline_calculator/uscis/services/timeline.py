@@ -7,14 +7,158 @@ form type, service center, form category, and filing date using the official USC
 
 import datetime
 import logging
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Sequence, Tuple
+
+from uscis.models import (
+    Timeline, FormInfo, FilingInfo, ProcessingTime, EstimatedTimeline,
+    CaseStatus, DataSource
+)
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # Configure module-level logger
 logger = logging.getLogger(__name__)
 
+# Case status labels, ordered from most to least advanced
+STATUS_OUTSIDE_NORMAL = "Outside normal processing time"
+STATUS_FINAL_STAGE = "Approaching final stage"
+STATUS_WITHIN_NORMAL = "Within normal processing timeframe"
+STATUS_INITIAL = "Initial processing stage"
+STATUS_LABELS = (STATUS_OUTSIDE_NORMAL, STATUS_FINAL_STAGE,
+                 STATUS_WITHIN_NORMAL, STATUS_INITIAL)
+
+# Average month length used to convert USCIS processing times to days
+DAYS_PER_MONTH = 30.5
+
+
+def months_to_days(months: float) -> int:
+    """
+    Convert a processing time in months to a whole number of days.
+    
+    Args:
+        months: Processing time in months
+    
+    Returns:
+        Number of days, truncated
+    """
+    return int(months * DAYS_PER_MONTH)
+
+
+def add_day_offsets(data_item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Precompute the integer day offsets for a processing time row.
+    
+    Adds min_days, median_days and max_days to the row if they are missing,
+    so timeline calculations only need integer additions.
+    
+    Args:
+        data_item: Dictionary containing processing time information
+    
+    Returns:
+        The same dictionary, with day offsets populated
+    """
+    if data_item.get("min_days") is None:
+        data_item["min_days"] = months_to_days(data_item["min_months"])
+    if data_item.get("median_days") is None:
+        data_item["median_days"] = months_to_days(data_item["median_months"])
+    if data_item.get("max_days") is None:
+        data_item["max_days"] = months_to_days(data_item["max_months"])
+    return data_item
+
+
+def get_day_offsets(data_item: Dict[str, Any]) -> Tuple[int, int, int]:
+    """
+    Return the (min, median, max) day offsets of a processing time row.
+    
+    Uses the precomputed offsets when present and falls back to converting
+    the month values for rows that predate them.
+    """
+    min_days = data_item.get("min_days")
+    median_days = data_item.get("median_days")
+    max_days = data_item.get("max_days")
+    return (
+        min_days if min_days is not None else months_to_days(data_item["min_months"]),
+        median_days if median_days is not None else months_to_days(data_item["median_months"]),
+        max_days if max_days is not None else months_to_days(data_item["max_months"])
+    )
+
+
+def inquiry_cutoff_date(max_days: int, today: Optional[datetime.date] = None) -> datetime.date:
+    """
+    Calculate the receipt date cutoff for case inquiries.
+    
+    Cases received on or before this date have exceeded the maximum processing
+    time and are eligible for inquiry. Derived from today's date on every read.
+    
+    Args:
+        max_days: Maximum processing time in days
+        today: Date to evaluate against (defaults to the current date)
+    
+    Returns:
+        The inquiry cutoff date
+    """
+    today = today or datetime.date.today()
+    return datetime.date.fromordinal(today.toordinal() - max_days)
+
+
+def build_timeline(data_item: Dict[str, Any], form_category: Optional[str],
+                   filing_date: datetime.date, days_elapsed: int, progress_percent: int,
+                   earliest_date: datetime.date, median_date: datetime.date,
+                   latest_date: datetime.date, status: str, can_submit_inquiry: bool,
+                   today: datetime.date) -> Timeline:
+    """
+    Assemble a Timeline from computed milestone values.
+    
+    Shared by the scalar and batch engines so both produce identical timelines.
+    """
+    # For cycle time methodology forms (I-129, I-129CW), add note about different calculation
+    if data_item["form_number"] in ["I-129", "I-129CW"]:
+        calculation_note = "This form uses USCIS cycle time methodology."
+    else:
+        calculation_note = "Based on time to complete 80% of cases over last 6 months."
+    
+    return Timeline(
+        form_info=FormInfo(
+            form_number=data_item["form_number"],
+            form_description=data_item["form_description"],
+            service_center=data_item["service_center"],
+            form_category=form_category or "Standard Processing"
+        ),
+        filing_info=FilingInfo(
+            filing_date=filing_date,
+            days_since_filing=days_elapsed,
+            progress_percent=progress_percent
+        ),
+        processing_time=ProcessingTime(
+            min_months=round(data_item["min_months"], 1),
+            median_months=round(data_item["median_months"], 1),
+            max_months=round(data_item["max_months"], 1)
+        ),
+        estimated_timeline=EstimatedTimeline(
+            earliest_date=earliest_date,
+            median_date=median_date,
+            latest_date=latest_date
+        ),
+        case_status=CaseStatus(
+            current_status=status,
+            can_submit_inquiry=can_submit_inquiry,
+            # USCIS formula: Case inquiry allowed when case takes longer than time to complete 93% of adjudications
+            # This is approximated as max_months in our data model
+            inquiry_eligibility_date=latest_date
+        ),
+        data_source=DataSource(
+            last_updated=data_item["last_updated"],
+            next_update=today + datetime.timedelta(days=30),
+            calculation_note=calculation_note
+        )
+    )
+
 
 def generate_timeline(data_item: Dict[str, Any], filing_date: str, 
-                      form_category: Optional[str] = None) -> Dict[str, Any]:
+                      form_category: Optional[str] = None) -> Timeline:
     """
     Calculate detailed processing timeline based on USCIS methodology.
     
@@ -27,100 +171,296 @@ def generate_timeline(data_item: Dict[str, Any], filing_date: str,
         form_category: Category of the form (optional)
     
     Returns:
-        Dictionary with comprehensive timeline information
+        Timeline with comprehensive timeline information
     """
     # Extract processing times from data item
-    min_months = data_item["min_months"]
     median_months = data_item["median_months"]
-    max_months = data_item["max_months"]
+    min_days, median_days, max_days = get_day_offsets(data_item)
     
     # Parse filing date
     try:
-        filing_date_obj = datetime.datetime.strptime(filing_date, "%Y-%m-%d")
+        filing_date_obj = datetime.datetime.strptime(filing_date, "%Y-%m-%d").date()
     except ValueError:
         raise ValueError("Filing date must be in YYYY-MM-DD format.")
     
-    # Calculate processing milestone dates
-    current_date = datetime.datetime.now()
+    # Calculate processing milestone dates as day ordinals
+    today = datetime.date.today()
+    filing_ordinal = filing_date_obj.toordinal()
+    today_ordinal = today.toordinal()
+    
+    earliest_ordinal = filing_ordinal + min_days
+    median_ordinal = filing_ordinal + median_days
+    latest_ordinal = filing_ordinal + max_days
     
-    earliest_approval_date = filing_date_obj + datetime.timedelta(days=int(min_months * 30.5))
-    median_approval_date = filing_date_obj + datetime.timedelta(days=int(median_months * 30.5))
-    latest_approval_date = filing_date_obj + datetime.timedelta(days=int(max_months * 30.5))
+    earliest_approval_date = datetime.date.fromordinal(earliest_ordinal)
+    median_approval_date = datetime.date.fromordinal(median_ordinal)
+    latest_approval_date = datetime.date.fromordinal(latest_ordinal)
     
     # Calculate days elapsed since filing
-    days_elapsed = (current_date - filing_date_obj).days
+    days_elapsed = today_ordinal - filing_ordinal
     if days_elapsed < 0:
         days_elapsed = 0  # Handle future filing dates
     
     # Calculate progress percentage
+    estimated_total_days = median_months * DAYS_PER_MONTH
     if days_elapsed == 0:
         progress_percent = 0
+    elif estimated_total_days <= 0:
+        # Nothing is left to wait for when USCIS reports no processing time
+        progress_percent = 100
     else:
-        estimated_total_days = median_months * 30.5
         progress_percent = min(100, round((days_elapsed / estimated_total_days) * 100))
     
-    # Determine case status based on timeline
-    if current_date > latest_approval_date:
-        status = "Outside normal processing time"
+    # Determine case status based on timeline; a milestone counts as passed once its day has started
+    if today_ordinal >= latest_ordinal:
+        status = STATUS_OUTSIDE_NORMAL
         can_submit_inquiry = True
-    elif current_date > median_approval_date:
-        status = "Approaching final stage"
+    elif today_ordinal >= median_ordinal:
+        status = STATUS_FINAL_STAGE
         can_submit_inquiry = False
-    elif current_date > earliest_approval_date:
-        status = "Within normal processing timeframe"
+    elif today_ordinal >= earliest_ordinal:
+        status = STATUS_WITHIN_NORMAL
         can_submit_inquiry = False
     else:
-        status = "Initial processing stage"
+        status = STATUS_INITIAL
         can_submit_inquiry = False
     
-    # Calculate case inquiry eligibility date
-    # USCIS formula: Case inquiry allowed when case takes longer than time to complete 93% of adjudications
-    # This is approximated as max_months in our data model
-    inquiry_eligibility_date = filing_date_obj + datetime.timedelta(days=int(max_months * 30.5))
+    return build_timeline(
+        data_item, form_category, filing_date_obj, days_elapsed, progress_percent,
+        earliest_approval_date, median_approval_date, latest_approval_date,
+        status, can_submit_inquiry, today
+    )
+
+
+class TimelineCache:
+    """
+    Bounded LRU cache of computed timelines.
+    
+    Keys include a dataset version, which is bumped whenever new processing
+    data is imported, and the calendar day the timeline was computed for, so
+    entries never outlive the data or the day they describe.
+    """
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.data_version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Timeline]" = OrderedDict()
+        self._lock = threading.Lock()
     
-    # If inquiry eligibility date is in the past, set to "Eligible now"
-    if inquiry_eligibility_date <= current_date:
-        inquiry_eligibility_text = "Eligible now"
-    else:
-        inquiry_eligibility_text = inquiry_eligibility_date.strftime("%B %d, %Y")
-    
-    # Construct timeline dictionary
-    timeline = {
-        "form_info": {
-            "form_number": data_item["form_number"],
-            "form_description": data_item["form_description"],
-            "service_center": data_item["service_center"],
-            "form_category": form_category or "Standard Processing"
-        },
-        "filing_info": {
-            "filing_date": filing_date_obj.strftime("%B %d, %Y"),
-            "days_since_filing": days_elapsed,
-            "progress_percent": progress_percent
-        },
-        "processing_time": {
-            "min_months": round(min_months, 1),
-            "median_months": round(median_months, 1),
-            "max_months": round(max_months, 1),
-        },
-        "estimated_timeline": {
-            "earliest_date": earliest_approval_date.strftime("%B %d, %Y"),
-            "median_date": median_approval_date.strftime("%B %d, %Y"),
-            "latest_date": latest_approval_date.strftime("%B %d, %Y")
-        },
-        "case_status": {
-            "current_status": status,
-            "can_submit_inquiry": can_submit_inquiry,
-            "inquiry_eligibility_date": inquiry_eligibility_text
-        },
-        "data_source": {
-            "last_updated": data_item["last_updated"],
-            "next_update": (datetime.datetime.now() + datetime.timedelta(days=30)).strftime("%B %d, %Y"),
-            "calculation_note": "Based on time to complete 80% of cases over last 6 months."
-        }
+    def make_key(self, data_item: Dict[str, Any], filing_date: str,
+                 form_category: Optional[str]) -> Tuple:
+        """Build the cache key for a timeline request."""
+        return (
+            self.data_version,
+            datetime.date.today().toordinal(),
+            data_item["form_number"],
+            data_item["service_center"],
+            form_category or "",
+            filing_date,
+            data_item["min_months"],
+            data_item["median_months"],
+            data_item["max_months"],
+            data_item["last_updated"],
+            data_item["form_description"]
+        )
+    
+    def get_timeline(self, data_item: Dict[str, Any], filing_date: str,
+                     form_category: Optional[str] = None) -> Timeline:
+        """
+        Return the timeline for a request, computing it on a cache miss.
+        
+        Args:
+            data_item: Dictionary containing processing time information
+            filing_date: String in YYYY-MM-DD format
+            form_category: Category of the form (optional)
+        
+        Returns:
+            The cached Timeline; timelines are immutable, so it is shared safely
+        """
+        key = self.make_key(data_item, filing_date, form_category)
+        
+        with self._lock:
+            timeline = self._entries.get(key)
+            if timeline is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return timeline
+            self.misses += 1
+        
+        timeline = generate_timeline(data_item, filing_date, form_category)
+        
+        with self._lock:
+            # Skip storing if the data was invalidated while computing
+            if key[0] == self.data_version:
+                self._entries[key] = timeline
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        
+        return timeline
+    
+    def invalidate(self) -> None:
+        """Drop all entries and start a new dataset version."""
+        with self._lock:
+            self.data_version += 1
+            self._entries.clear()
+        logger.info(f"Timeline cache invalidated (data version {self.data_version})")
+    
+    def resize(self, max_size: int) -> None:
+        """Change the maximum number of cached timelines."""
+        with self._lock:
+            self.max_size = max_size
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "data_version": self.data_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Shared cache used by the web routes
+timeline_cache = TimelineCache()
+
+
+def get_cached_timeline(data_item: Dict[str, Any], filing_date: str,
+                        form_category: Optional[str] = None) -> Timeline:
+    """Memoized variant of generate_timeline backed by the shared timeline cache."""
+    return timeline_cache.get_timeline(data_item, filing_date, form_category)
+
+
+def invalidate_timeline_cache() -> None:
+    """Invalidate cached timelines after new processing data has been imported."""
+    timeline_cache.invalidate()
+
+
+def configure_timeline_cache(max_size: int) -> None:
+    """Set the size bound of the shared timeline cache."""
+    timeline_cache.resize(max_size)
+
+
+def get_timeline_cache_stats() -> Dict[str, Any]:
+    """Return statistics for the shared timeline cache."""
+    return timeline_cache.stats()
+
+def generate_timelines_batch(data_items: Sequence[Dict[str, Any]],
+                             filing_dates: Sequence[str],
+                             today: Optional[datetime.date] = None) -> Dict[str, "np.ndarray"]:
+    """
+    Calculate processing timelines for many filings in a single vectorized pass.
+    
+    Produces the same milestone dates, progress, status and inquiry eligibility as
+    generate_timeline, but operates on NumPy datetime64 arrays so that nightly
+    recomputes over large numbers of tracked filings avoid per-case date parsing.
+    
+    Args:
+        data_items: Processing time rows, one per filing
+        filing_dates: Filing dates in YYYY-MM-DD format, parallel to data_items
+        today: Date to evaluate the timelines against (defaults to the current date)
+    
+    Returns:
+        Dictionary of parallel arrays with the computed timeline fields
+    """
+    if len(data_items) != len(filing_dates):
+        raise ValueError("data_items and filing_dates must have the same length.")
+    
+    # NumPy is only needed for batch recomputes, so it is not imported at startup
+    import numpy as np
+    
+    count = len(data_items)
+    
+    # Parse all filing dates at once
+    try:
+        filing = np.array(filing_dates, dtype="datetime64[D]")
+    except ValueError:
+        raise ValueError("Filing date must be in YYYY-MM-DD format.")
+    
+    today_day = np.datetime64(today or datetime.date.today(), "D")
+    
+    # Extract processing times and precomputed day offsets from the data rows
+    median_months = np.fromiter((item["median_months"] for item in data_items), dtype=np.float64, count=count)
+    offsets = np.fromiter((days for item in data_items for days in get_day_offsets(item)),
+                          dtype=np.int64, count=3 * count).reshape(count, 3).astype("timedelta64[D]")
+    
+    # Calculate processing milestone dates
+    earliest = filing + offsets[:, 0]
+    median = filing + offsets[:, 1]
+    latest = filing + offsets[:, 2]
+    
+    # Calculate days elapsed since filing, treating future filing dates as day 0
+    days_elapsed = np.maximum((today_day - filing).astype(np.int64), 0)
+    
+    # Calculate progress percentage, with the same guards as generate_timeline
+    estimated_total_days = median_months * DAYS_PER_MONTH
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw_percent = np.rint((days_elapsed / estimated_total_days) * 100)
+    progress_percent = np.select(
+        [days_elapsed == 0, estimated_total_days <= 0],
+        [0, 100],
+        default=np.minimum(100, raw_percent)
+    ).astype(np.int64)
+    
+    # Determine case status; a milestone counts as passed once its day has started
+    status_codes = np.select(
+        [today_day >= latest, today_day >= median, today_day >= earliest],
+        [0, 1, 2],
+        default=3
+    )
+    
+    return {
+        "filing_date": filing,
+        "earliest_date": earliest,
+        "median_date": median,
+        "latest_date": latest,
+        "days_since_filing": days_elapsed,
+        "progress_percent": progress_percent,
+        "current_status": np.array(STATUS_LABELS, dtype=object)[status_codes],
+        "can_submit_inquiry": status_codes == 0,
+        "inquiry_eligibility_date": latest
     }
+
+
+def expand_timeline_batch(batch: Dict[str, "np.ndarray"], data_items: Sequence[Dict[str, Any]],
+                          form_categories: Optional[Sequence[Optional[str]]] = None,
+                          today: Optional[datetime.date] = None) -> List[Timeline]:
+    """
+    Convert the arrays returned by generate_timelines_batch into Timeline objects.
     
-    # For cycle time methodology forms (I-129, I-129CW), add note about different calculation
-    if data_item["form_number"] in ["I-129", "I-129CW"]:
-        timeline["data_source"]["calculation_note"] = "This form uses USCIS cycle time methodology."
+    Args:
+        batch: Result of generate_timelines_batch
+        data_items: The processing time rows the batch was computed from
+        form_categories: Optional categories, parallel to data_items
+        today: Date the batch was evaluated against (defaults to the current date)
+    
+    Returns:
+        List of timelines identical to those returned by generate_timeline
+    """
+    today = today or datetime.date.today()
+    
+    filing = batch["filing_date"].tolist()
+    earliest = batch["earliest_date"].tolist()
+    median = batch["median_date"].tolist()
+    latest = batch["latest_date"].tolist()
+    days_elapsed = batch["days_since_filing"].tolist()
+    progress_percent = batch["progress_percent"].tolist()
+    status = batch["current_status"].tolist()
+    can_submit_inquiry = batch["can_submit_inquiry"].tolist()
     
-    return timeline
\ No newline at end of file
+    return [
+        build_timeline(
+            data_item, form_categories[i] if form_categories is not None else None,
+            filing[i], days_elapsed[i], progress_percent[i],
+            earliest[i], median[i], latest[i], status[i], can_submit_inquiry[i], today
+        )
+        for i, data_item in enumerate(data_items)
+    ]
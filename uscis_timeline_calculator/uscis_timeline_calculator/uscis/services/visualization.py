@@ -2,166 +2,807 @@
 Timeline visualization service for USCIS processing times.
 
 This module generates visual representations of immigration timelines
-using matplotlib, ensuring clear and professional charts.
+using matplotlib, ensuring clear and professional charts. Matplotlib is
+imported on first render so that importing this module stays cheap.
 """
 
 import os
+import json
+import hashlib
 import logging
 import datetime
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from typing import Dict, Any
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from xml.sax.saxutils import escape
 from flask import current_app
 
+from uscis.models import Timeline
+from uscis.services.chart_renderer import get_chart_renderer
+from uscis.services.chart_store import get_chart_store, chart_key_from_filename
+from uscis.services.chart_cache import get_chart_cache
+from uscis.services.chart_encoding import (
+    encode_image, baseline_png_size, transcode_chart, encoding_stats,
+    DEFAULT_PNG_COLORS, DEFAULT_PNG_COMPRESS_LEVEL, DEFAULT_AVIF_QUALITY
+)
+
 # Configure module-level logger
 logger = logging.getLogger(__name__)
 
+# Bump when the chart layout changes so previously rendered charts are not reused
+CHART_STYLE_VERSION = 2
+
+# Charts are written here when the configured CHARTS_FOLDER cannot be used
+FALLBACK_CHARTS_FOLDER = "static/charts"
+
+# Chart colors - USCIS website colors
+PRIMARY_BLUE = "#0071bc"
+DARK_BLUE = "#205493"
+LIGHT_BLUE = "#02bfe7"
+GRAY = "#5b616b"
+LIGHT_GRAY = "#d6d7d9"
+RED = "#e31c3d"
+GREEN = "#2e8540"
+
 
-def plot_timeline(timeline_data: Dict[str, Any], filing_date: str) -> str:
+def chart_hash(timeline_data: Timeline, today: Optional[datetime.date] = None) -> str:
     """
-    Generate a professional-looking timeline visualization based on USCIS data.
+    Compute the content address of a timeline chart.
+    
+    The hash covers everything drawn on the chart: the form, service center and
+    category, the filing date, the processing time row, the derived milestones
+    and status, and the current day (which positions the "today" marker).
     
     Args:
-        timeline_data: Dictionary containing timeline information
-        filing_date: String in YYYY-MM-DD format
+        timeline_data: Timeline to visualize
+        today: Day the chart is rendered for (defaults to the current date)
     
     Returns:
-        String: Path to the generated chart file
+        Hex digest identifying the rendered chart
     """
-    # Parse dates
-    filing_date_obj = datetime.datetime.strptime(filing_date, "%Y-%m-%d")
-    earliest_date = datetime.datetime.strptime(
-        timeline_data["estimated_timeline"]["earliest_date"], "%B %d, %Y")
-    median_date = datetime.datetime.strptime(
-        timeline_data["estimated_timeline"]["median_date"], "%B %d, %Y")
-    latest_date = datetime.datetime.strptime(
-        timeline_data["estimated_timeline"]["latest_date"], "%B %d, %Y")
-    current_date = datetime.datetime.now()
-    
-    # Calculate the date range and proper padding
-    all_dates = [filing_date_obj, earliest_date, median_date, latest_date, current_date]
-    min_date = min(all_dates) - datetime.timedelta(days=15)
-    max_date = max(all_dates) + datetime.timedelta(days=15)
-    
-    # Create figure with improved styling
-    plt.figure(figsize=(10, 4), dpi=100)
-    ax = plt.gca()
-    
-    # Set plot colors - USCIS website colors
-    PRIMARY_BLUE = "#0071bc"
-    DARK_BLUE = "#205493"
-    LIGHT_BLUE = "#02bfe7"
-    GRAY = "#5b616b"
-    LIGHT_GRAY = "#d6d7d9"
-    RED = "#e31c3d"
-    GREEN = "#2e8540"
-    
-    # Plot the timeline axis with improved styling
-    plt.plot([min_date, max_date], [1, 1], color=LIGHT_GRAY, linewidth=2, zorder=1)
-    
-    # Add milestone markers
-    plt.plot(filing_date_obj, 1, 'o', color=DARK_BLUE, markersize=12, 
-             label='Filing Date', zorder=3)
-    plt.plot(earliest_date, 1, 'o', color=PRIMARY_BLUE, markersize=12, 
-             label='Earliest Estimated Completion', zorder=3)
-    plt.plot(median_date, 1, 'o', color=PRIMARY_BLUE, markersize=12, 
-             label='Median Estimated Completion', zorder=3)
-    plt.plot(latest_date, 1, 'o', color=PRIMARY_BLUE, markersize=12, 
-             label='Latest Estimated Completion', zorder=3)
-    
-    # Highlight the current date
-    plt.axvline(x=current_date, color=RED, linestyle='--', linewidth=2, 
-                label='Current Date', zorder=2)
-    
-    # Highlight processing timeframe
-    plt.axvspan(earliest_date, latest_date, alpha=0.2, color=LIGHT_BLUE, zorder=0)
-    
-    # Add milestone labels with better positioning
-    label_y_positions = {
-        filing_date_obj: 1.1,
-        earliest_date: 0.9,
-        median_date: 1.1,
-        latest_date: 0.9,
-        current_date: 1.0
+    today = today or datetime.date.today()
+    rendered_inputs = [
+        CHART_STYLE_VERSION,
+        timeline_data.form_info.form_number,
+        timeline_data.form_info.form_description,
+        timeline_data.form_info.service_center,
+        timeline_data.form_info.form_category,
+        timeline_data.filing_info.filing_date.isoformat(),
+        timeline_data.filing_info.progress_percent,
+        timeline_data.processing_time.min_months,
+        timeline_data.processing_time.median_months,
+        timeline_data.processing_time.max_months,
+        timeline_data.estimated_timeline.earliest_date.isoformat(),
+        timeline_data.estimated_timeline.median_date.isoformat(),
+        timeline_data.estimated_timeline.latest_date.isoformat(),
+        timeline_data.case_status.current_status,
+        timeline_data.case_status.can_submit_inquiry,
+        today.isoformat()
+    ]
+    encoded = json.dumps(rendered_inputs, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def build_chart_spec(timeline_data: Timeline, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Describe a timeline chart as plain, serializable data.
+    
+    The spec carries everything the renderer draws, with dates as ISO strings,
+    so it can be sent to a worker process or cached independently of Flask.
+    
+    Args:
+        timeline_data: Timeline to visualize
+        today: Day the chart is rendered for (defaults to the current date)
+    
+    Returns:
+        Dictionary describing the chart
+    """
+    today = today or datetime.date.today()
+    form_info = timeline_data.form_info
+    
+    status_text = None
+    if today > timeline_data.filing_info.filing_date:
+        status_text = (f"Current Status: {timeline_data.case_status.current_status} "
+                       f"({timeline_data.filing_info.progress_percent}% complete)")
+    
+    return {
+        "title": f"{form_info.form_number} - {form_info.form_description}\n"
+                 f"{form_info.service_center} - {form_info.form_category}",
+        "filing_date": timeline_data.filing_info.filing_date.isoformat(),
+        "earliest_date": timeline_data.estimated_timeline.earliest_date.isoformat(),
+        "median_date": timeline_data.estimated_timeline.median_date.isoformat(),
+        "latest_date": timeline_data.estimated_timeline.latest_date.isoformat(),
+        "today": today.isoformat(),
+        "status_text": status_text,
+        "inquiry_text": "Case eligible for USCIS inquiry" if timeline_data.case_status.can_submit_inquiry else None
     }
+
+
+def build_chart_data(timeline_data: Timeline, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Describe a timeline chart as compact JSON for drawing it in the browser.
+    
+    Carries the milestone dates and label positions, the processing span, the
+    today marker, the date range of the axis and the status texts, so that
+    static/js/script.js can draw the same chart without a server-side render.
+    
+    Args:
+        timeline_data: Timeline to visualize
+        today: Day the chart is drawn for (defaults to the current date)
+    
+    Returns:
+        Dictionary describing the chart
+    """
+    spec = build_chart_spec(timeline_data, today)
+    kinds = ("filing", "estimate", "estimate", "estimate", "today")
+    dates = [spec[key] for key in ("filing_date", "earliest_date", "median_date", "latest_date", "today")]
+    ordinals = [datetime.date.fromisoformat(date).toordinal() for date in dates]
     
-    label_texts = {
-        filing_date_obj: f"Filed: {filing_date_obj.strftime('%b %d, %Y')}",
-        earliest_date: f"Earliest: {earliest_date.strftime('%b %d, %Y')}",
-        median_date: f"Median: {median_date.strftime('%b %d, %Y')}",
-        latest_date: f"Latest: {latest_date.strftime('%b %d, %Y')}",
-        current_date: f"Today: {current_date.strftime('%b %d, %Y')}"
+    return {
+        "title": spec["title"].split("\n"),
+        "milestones": [
+            # offset places the label above (1), below (-1) or on (0) the axis
+            {"label": prefix, "date": date, "kind": kind, "offset": round((label_y - 1.0) * 10)}
+            for (prefix, label_y), date, kind in zip(ChartTemplate.LABELS, dates, kinds)
+        ],
+        "span": {"start": spec["earliest_date"], "end": spec["latest_date"]},
+        "today": spec["today"],
+        "range": {
+            "start": datetime.date.fromordinal(min(ordinals) - 15).isoformat(),
+            "end": datetime.date.fromordinal(max(ordinals) + 15).isoformat()
+        },
+        "status_text": spec["status_text"],
+        "inquiry_text": spec["inquiry_text"]
     }
+
+
+def plot_timeline(timeline_data: Timeline) -> str:
+    """
+    Generate a professional-looking timeline visualization based on USCIS data.
+    
+    Charts are content-addressed: the file name is derived from chart_hash, so an
+    identical request is served from the existing file without invoking matplotlib.
+    CHART_FORMAT selects a PNG rendered with matplotlib or a lightweight SVG.
+    When a chart render service is configured, PNG rendering happens in a worker process.
     
-    for date, y_pos in label_y_positions.items():
-        plt.text(date, y_pos, label_texts[date], ha='center', va='center', 
-                 fontsize=10, fontweight='bold', 
-                 bbox=dict(facecolor='white', alpha=0.8, edgecolor=LIGHT_GRAY, 
-                           boxstyle='round,pad=0.5'))
-    
-    # Improve title and labels
-    form_number = timeline_data["form_info"]["form_number"]
-    form_description = timeline_data["form_info"]["form_description"]
-    service_center = timeline_data["form_info"]["service_center"]
-    form_category = timeline_data["form_info"]["form_category"]
-    
-    # In the plot_timeline function, ensure this line is updated:
-    plt.title(f"{form_number} - {form_description}\n{service_center} - {form_category}", 
-            fontsize=14, fontweight='bold', color=DARK_BLUE)
-    
-    # Configure the axes
-    ax.spines['right'].set_visible(False)
-    ax.spines['left'].set_visible(False)
-    ax.spines['top'].set_visible(False)
-    ax.spines['bottom'].set_color(LIGHT_GRAY)
-    
-    ax.tick_params(axis='x', labelsize=9, colors=DARK_BLUE)
-    ax.yaxis.set_visible(False)
-    
-    # Set date formatter and locator for x-axis
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
-    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=1))
-    plt.xticks(rotation=45, ha='right')
-    
-    # Add progress bar if filing date is in the past
-    if current_date > filing_date_obj:
-        progress_percent = timeline_data["filing_info"]["progress_percent"]
-        status_text = f"Current Status: {timeline_data['case_status']['current_status']} ({progress_percent}% complete)"
-        plt.figtext(0.5, 0.02, status_text, ha='center', fontsize=10, fontweight='bold')
-    
-    # Indicate if case is eligible for inquiry
-    if timeline_data["case_status"]["can_submit_inquiry"]:
-        inquiry_text = "Case eligible for USCIS inquiry"
-        plt.figtext(0.5, 0.06, inquiry_text, ha='center', fontsize=10, 
-                   color=GREEN, fontweight='bold')
-    
-    plt.tight_layout()
-    plt.subplots_adjust(bottom=0.15)
-    
-    # Create directory for charts if it doesn't exist
+    Args:
+        timeline_data: Timeline to visualize
+    
+    Returns:
+        String: Path to the generated chart file
+    """
+    # Reuse a previously rendered chart for identical inputs
+    current_date = datetime.date.today()
+    chart_key = chart_hash(timeline_data, current_date)
     charts_folder = current_app.config.get('CHARTS_FOLDER', 'static/charts')
-    os.makedirs(charts_folder, exist_ok=True)
+    chart_format = current_app.config.get('CHART_FORMAT', 'png')
+    chart_path = f"{charts_folder}/timeline_{chart_key}.{chart_format}"
     
-    # Save chart with form number and date to avoid overwriting previous charts
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    chart_path = f"{charts_folder}/timeline_{form_number}_{timestamp}.png"
+    if os.path.exists(chart_path):
+        logger.info(f"Reusing cached timeline chart at {chart_path}")
+        store = get_chart_store()
+        if store is not None:
+            store.touch(chart_path)
+        return chart_path
+    
+    spec = build_chart_spec(timeline_data, current_date)
     
     # Ensure the directory exists
-    os.makedirs(os.path.dirname(chart_path), exist_ok=True)
+    os.makedirs(charts_folder, exist_ok=True)
+    
+    # SVG and render-service errors (busy, timeout) are left to the caller
+    if chart_format == 'svg' or get_chart_renderer() is not None:
+        return render_chart_file(spec, chart_path)
     
-    # Save the chart
     try:
-        plt.savefig(chart_path)
-        plt.close()
-        logger.info(f"Successfully generated timeline chart at {chart_path}")
+        render_chart_file(spec, chart_path)
     except Exception as e:
         logger.error(f"Error saving chart to {chart_path}: {e}")
         # Create a fallback path in case there's an issue with the configured path
-        fallback_path = f"static/charts/timeline_{form_number}_{timestamp}.png"
+        fallback_path = f"{FALLBACK_CHARTS_FOLDER}/timeline_{chart_key}.png"
         os.makedirs(os.path.dirname(fallback_path), exist_ok=True)
-        plt.savefig(fallback_path)
-        plt.close()
+        store = get_chart_store()
+        if store is not None:
+            # Keep fallback charts within the chart store budget too
+            store.add_folder(FALLBACK_CHARTS_FOLDER)
+        render_chart_file(spec, fallback_path)
         logger.info(f"Saved chart to fallback location: {fallback_path}")
         return fallback_path
     
-    return chart_path
\ No newline at end of file
+    return chart_path
+
+
+class ChartTemplate:
+    """
+    Pre-styled timeline figure that is reused for every chart.
+    
+    Building a figure (axes, spines, colors, tick locators, formatters, text
+    boxes) costs far more than drawing it, so the figure is built once per
+    thread and each render only moves the markers, span and labels and
+    updates the title and status texts. Uses the object-oriented Figure API
+    with an Agg canvas, so no pyplot global state is involved and threads
+    can render their own templates in parallel.
+    """
+    
+    # (label prefix, label y position) for the filing, earliest, median,
+    # latest and today labels
+    LABELS = [("Filed", 1.1), ("Earliest", 0.9), ("Median", 1.1), ("Latest", 0.9), ("Today", 1.0)]
+    
+    def __init__(self):
+        import matplotlib.dates as mdates
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Rectangle
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        
+        self.figure = Figure(figsize=(10, 4), dpi=100)
+        FigureCanvasAgg(self.figure)
+        ax = self.ax = self.figure.add_subplot()
+        
+        # Timeline axis
+        self.axis_line, = ax.plot([0, 1], [1, 1], color=LIGHT_GRAY, linewidth=2, zorder=1)
+        
+        # Milestone markers
+        self.filing_marker, = ax.plot([0], [1], 'o', color=DARK_BLUE, markersize=12,
+                                      label='Filing Date', zorder=3)
+        self.milestone_markers = [
+            ax.plot([0], [1], 'o', color=PRIMARY_BLUE, markersize=12, label=label, zorder=3)[0]
+            for label in ('Earliest Estimated Completion', 'Median Estimated Completion',
+                          'Latest Estimated Completion')
+        ]
+        
+        # Current date line, spanning the full axes height
+        self.today_line = ax.axvline(x=0, color=RED, linestyle='--', linewidth=2,
+                                     label='Current Date', zorder=2)
+        
+        # Processing timeframe span
+        self.span = Rectangle((0, 0), 1, 1, transform=ax.get_xaxis_transform(),
+                              alpha=0.2, color=LIGHT_BLUE, zorder=0)
+        ax.add_patch(self.span)
+        
+        # Milestone labels
+        self.labels = [
+            ax.text(0, y_pos, prefix, ha='center', va='center',
+                    fontsize=10, fontweight='bold',
+                    bbox=dict(facecolor='white', alpha=0.8, edgecolor=LIGHT_GRAY,
+                              boxstyle='round,pad=0.5'))
+            for prefix, y_pos in self.LABELS
+        ]
+        
+        self.title = ax.set_title("Form - Description\nService Center - Category",
+                                  fontsize=14, fontweight='bold', color=DARK_BLUE)
+        
+        # Configure the axes
+        ax.spines['right'].set_visible(False)
+        ax.spines['left'].set_visible(False)
+        ax.spines['top'].set_visible(False)
+        ax.spines['bottom'].set_color(LIGHT_GRAY)
+        
+        ax.tick_params(axis='x', labelsize=9, colors=DARK_BLUE, labelrotation=45)
+        ax.yaxis.set_visible(False)
+        # Fixed vertical range so the labels above and below the axis stay visible
+        ax.set_ylim(0.85, 1.15)
+        
+        # Set date formatter and locator for x-axis
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
+        ax.xaxis.set_major_locator(mdates.MonthLocator(interval=1))
+        
+        # Status and inquiry texts below the axes
+        self.status_text = self.figure.text(0.5, 0.02, "", ha='center', fontsize=10, fontweight='bold')
+        self.inquiry_text = self.figure.text(0.5, 0.06, "", ha='center', fontsize=10,
+                                             color=GREEN, fontweight='bold')
+        
+        # Lay out once with representative content
+        today = datetime.date.today()
+        self.update({
+            "title": "Form - Description\nService Center - Category",
+            "filing_date": (today - datetime.timedelta(days=300)).isoformat(),
+            "earliest_date": (today - datetime.timedelta(days=90)).isoformat(),
+            "median_date": today.isoformat(),
+            "latest_date": (today + datetime.timedelta(days=150)).isoformat(),
+            "today": today.isoformat(),
+            "status_text": "Current Status",
+            "inquiry_text": None
+        })
+        self.figure.tight_layout()
+        # Keep the computed margins but drop the layout engine, which would
+        # otherwise trigger an extra layout draw on every save
+        self.figure.set_layout_engine(None)
+        self.figure.subplots_adjust(bottom=0.15)
+    
+    def to_image(self):
+        """Draw the figure and return a copy of its pixels as a PIL RGBA image."""
+        from PIL import Image
+        
+        canvas = self.figure.canvas
+        canvas.draw()
+        return Image.frombuffer('RGBA', canvas.get_width_height(), canvas.buffer_rgba(),
+                                'raw', 'RGBA', 0, 1).copy()
+    
+    def _align_tick_labels(self) -> None:
+        for label in self.ax.get_xticklabels():
+            label.set_horizontalalignment('right')
+    
+    def update(self, spec: Dict[str, Any]) -> None:
+        """Move the chart elements to the positions described by a chart spec."""
+        from matplotlib.dates import date2num
+        
+        dates = [datetime.date.fromisoformat(spec[key])
+                 for key in ("filing_date", "earliest_date", "median_date", "latest_date", "today")]
+        filing_x, earliest_x, median_x, latest_x, today_x = (date2num(date) for date in dates)
+        
+        # Calculate the date range and proper padding
+        min_x = min(filing_x, earliest_x, median_x, latest_x, today_x) - 15
+        max_x = max(filing_x, earliest_x, median_x, latest_x, today_x) + 15
+        
+        self.axis_line.set_xdata([min_x, max_x])
+        self.filing_marker.set_xdata([filing_x])
+        for marker, x in zip(self.milestone_markers, (earliest_x, median_x, latest_x)):
+            marker.set_xdata([x])
+        self.today_line.set_xdata([today_x, today_x])
+        self.span.set_x(earliest_x)
+        self.span.set_width(latest_x - earliest_x)
+        
+        for label, (prefix, y_pos), date, x in zip(
+                self.labels, self.LABELS, dates, (filing_x, earliest_x, median_x, latest_x, today_x)):
+            label.set_position((x, y_pos))
+            label.set_text(f"{prefix}: {date.strftime('%b %d, %Y')}")
+        
+        self.title.set_text(spec["title"])
+        self.status_text.set_text(spec["status_text"] or "")
+        self.inquiry_text.set_text(spec["inquiry_text"] or "")
+        
+        # Same 5% horizontal margin matplotlib's autoscaling would add
+        margin = (max_x - min_x) * 0.05
+        self.ax.set_xlim(min_x - margin, max_x + margin)
+        self._align_tick_labels()
+
+
+# Per-thread chart templates, created on the first render in each thread
+_chart_templates = threading.local()
+
+
+def get_chart_template() -> ChartTemplate:
+    """Return this thread's chart template, building it on first use."""
+    template = getattr(_chart_templates, "template", None)
+    if template is None:
+        template = _chart_templates.template = ChartTemplate()
+    return template
+
+
+def encode_chart_png(spec: Dict[str, Any], encoding: Optional[Dict[str, Any]] = None) -> Tuple[bytes, Optional[int]]:
+    """
+    Render a chart spec to an optimized PNG in memory.
+    
+    The chart only uses a few colors, so the image is quantized to a small
+    palette and compressed at the configured zlib level. Does not depend on
+    the Flask application, so it can run in a worker process; the encoding
+    options are therefore passed in rather than read from the config.
+    
+    Args:
+        spec: Chart description from build_chart_spec
+        encoding: Options from png_encoding_options (defaults when omitted)
+    
+    Returns:
+        Tuple of the PNG bytes and, if requested by the options, the size of
+        the same chart as a default full-color PNG (otherwise None)
+    """
+    encoding = encoding or {}
+    template = get_chart_template()
+    
+    template.update(spec)
+    image = template.to_image()
+    
+    data = encode_image(image.convert('RGB'), 'png',
+                        colors=encoding.get('colors', DEFAULT_PNG_COLORS),
+                        compress_level=encoding.get('compress_level', DEFAULT_PNG_COMPRESS_LEVEL))
+    baseline_size = baseline_png_size(image) if encoding.get('measure_baseline') else None
+    return data, baseline_size
+
+
+def png_encoding_options() -> Dict[str, Any]:
+    """
+    Return the configured PNG encoding options for the next chart.
+    
+    A sample of the charts (see ChartEncodingStats) also measures its default
+    PNG size so that /api/stats can report the bytes saved.
+    """
+    return {
+        "colors": current_app.config.get('CHART_PNG_COLORS', DEFAULT_PNG_COLORS),
+        "compress_level": current_app.config.get('CHART_PNG_COMPRESS_LEVEL', DEFAULT_PNG_COMPRESS_LEVEL),
+        "measure_baseline": encoding_stats.should_sample()
+    }
+
+
+def variant_encoding_options() -> Dict[str, Any]:
+    """Return the configured options for transcoding charts to WebP or AVIF."""
+    return {
+        "colors": current_app.config.get('CHART_PNG_COLORS', DEFAULT_PNG_COLORS),
+        "avif_quality": current_app.config.get('CHART_AVIF_QUALITY', DEFAULT_AVIF_QUALITY)
+    }
+
+
+def render_chart_bytes(spec: Dict[str, Any], chart_format: str) -> bytes:
+    """
+    Render a chart spec to bytes in the given format.
+    
+    PNG charts go through the chart render service when one is configured.
+    WebP and AVIF charts are transcoded from the PNG.
+    
+    Args:
+        spec: Chart description from build_chart_spec
+        chart_format: 'png', 'svg', 'webp' or 'avif'
+    
+    Returns:
+        Chart image bytes
+    """
+    if chart_format == 'svg':
+        return render_chart_svg(spec).encode('utf-8')
+    if chart_format in ('webp', 'avif'):
+        return transcode_chart(render_chart_bytes(spec, 'png'), chart_format, **variant_encoding_options())
+    
+    encoding = png_encoding_options()
+    renderer = get_chart_renderer()
+    if renderer is not None:
+        data, baseline_size = renderer.render_bytes(spec, encoding)
+    else:
+        data, baseline_size = encode_chart_png(spec, encoding)
+    encoding_stats.record_png(len(data), baseline_size)
+    return data
+
+
+# Variants that were not smaller than their PNG, so they are not transcoded again
+MAX_UNHELPFUL_VARIANTS = 4096
+_unhelpful_variants: "OrderedDict[str, bool]" = OrderedDict()
+_unhelpful_variants_lock = threading.Lock()
+
+
+def load_chart_variant(filename: str, chart_format: str, png_data: Optional[bytes] = None) -> Optional[bytes]:
+    """
+    Return a PNG chart encoded as WebP or AVIF, if that makes it smaller.
+    
+    Variants are stored next to their PNG (timeline_<hash>.webp) in the
+    configured chart storage and transcoded on first request. Variants that
+    turn out no smaller than the PNG are not stored, and the PNG is served.
+    
+    Args:
+        filename: PNG chart file name, e.g. timeline_<hash>.png
+        chart_format: 'webp' or 'avif'
+        png_data: PNG chart bytes, if already loaded
+    
+    Returns:
+        Variant bytes, or None if the PNG should be served instead
+    """
+    variant_name = f"{os.path.splitext(filename)[0]}.{chart_format}"
+    with _unhelpful_variants_lock:
+        if variant_name in _unhelpful_variants:
+            return None
+    
+    data = load_chart_bytes(variant_name)
+    if data is not None:
+        return data
+    
+    if png_data is None:
+        png_data = load_chart_bytes(filename)
+        if png_data is None:
+            return None
+    
+    data = transcode_chart(png_data, chart_format, **variant_encoding_options())
+    if len(data) >= len(png_data):
+        with _unhelpful_variants_lock:
+            _unhelpful_variants[variant_name] = True
+            while len(_unhelpful_variants) > MAX_UNHELPFUL_VARIANTS:
+                _unhelpful_variants.popitem(last=False)
+        return None
+    
+    if get_chart_cache() is not None:
+        store_chart_bytes(variant_name, data)
+    else:
+        chart_path = os.path.join(current_app.config.get('CHARTS_FOLDER', 'static/charts'), variant_name)
+        _write_atomically(chart_path, data)
+        store = get_chart_store()
+        if store is not None:
+            store.record_write(chart_path)
+    
+    logger.info(f"Encoded chart variant {variant_name} ({len(data)} bytes, PNG {len(png_data)} bytes)")
+    return data
+
+
+def load_chart_bytes(filename: str) -> Optional[bytes]:
+    """
+    Look up a rendered chart in the in-memory cache, then in the disk spill tier.
+    
+    Charts found on disk are promoted back into the memory cache.
+    
+    Args:
+        filename: Chart file name, e.g. timeline_<hash>.png
+    
+    Returns:
+        Chart bytes, or None if the chart is in neither tier
+    """
+    cache = get_chart_cache()
+    data = cache.get(filename) if cache is not None else None
+    if data is not None:
+        return data
+    
+    chart_path = os.path.join(current_app.config.get('CHARTS_FOLDER', 'static/charts'), filename)
+    try:
+        with open(chart_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    
+    store = get_chart_store()
+    if store is not None:
+        store.touch(chart_path)
+    if cache is not None:
+        cache.put(filename, data)
+    return data
+
+
+def store_chart_bytes(filename: str, data: bytes, spec: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Keep rendered chart bytes in the in-memory cache and, if enabled, spill them to disk.
+    
+    Args:
+        filename: Chart file name, e.g. timeline_<hash>.png
+        data: Rendered chart bytes
+        spec: Chart spec the bytes were rendered from, remembered for re-rendering (optional)
+    """
+    cache = get_chart_cache()
+    if cache is not None:
+        cache.put(filename, data)
+    
+    store = get_chart_store()
+    if current_app.config.get('CHART_SPILL_TO_DISK'):
+        charts_folder = current_app.config.get('CHARTS_FOLDER', 'static/charts')
+        chart_path = os.path.join(charts_folder, filename)
+        if not os.path.exists(chart_path):
+            os.makedirs(charts_folder, exist_ok=True)
+            _write_atomically(chart_path, data)
+            if store is not None:
+                store.record_write(chart_path, spec)
+            return
+    
+    chart_key = chart_key_from_filename(filename)
+    if store is not None and spec is not None and chart_key is not None:
+        store.remember(chart_key, spec)
+
+
+def timeline_chart_filename(timeline_data: Timeline, today: Optional[datetime.date] = None) -> str:
+    """
+    Return the content-addressed file name of a timeline chart in the configured CHART_FORMAT.
+    
+    Args:
+        timeline_data: Timeline to visualize
+        today: Day the chart is rendered for (defaults to the current date)
+    
+    Returns:
+        String: Chart file name, e.g. timeline_<hash>.png
+    """
+    chart_format = current_app.config.get('CHART_FORMAT', 'png')
+    return f"timeline_{chart_hash(timeline_data, today)}.{chart_format}"
+
+
+def chart_is_available(filename: str) -> bool:
+    """Check whether a chart is already rendered, in memory or on disk."""
+    cache = get_chart_cache()
+    if cache is not None and filename in cache:
+        return True
+    return os.path.exists(os.path.join(current_app.config.get('CHARTS_FOLDER', 'static/charts'), filename))
+
+
+def render_timeline_chart(timeline_data: Timeline) -> str:
+    """
+    Render a timeline chart to the configured CHART_STORAGE.
+    
+    Args:
+        timeline_data: Timeline to visualize
+    
+    Returns:
+        String: File name of the chart, served from /charts/<filename>
+    """
+    if current_app.config.get('CHART_STORAGE') == 'memory':
+        return cache_timeline_chart(timeline_data)
+    return os.path.basename(plot_timeline(timeline_data))
+
+
+def cache_timeline_chart(timeline_data: Timeline) -> str:
+    """
+    Render a timeline chart into the in-memory chart cache.
+    
+    Used with CHART_STORAGE = 'memory'. Like plot_timeline, charts are
+    content-addressed, so an identical request reuses the cached bytes.
+    
+    Args:
+        timeline_data: Timeline to visualize
+    
+    Returns:
+        String: File name of the chart, served from /charts/<filename>
+    """
+    current_date = datetime.date.today()
+    chart_format = current_app.config.get('CHART_FORMAT', 'png')
+    filename = timeline_chart_filename(timeline_data, current_date)
+    
+    if load_chart_bytes(filename) is None:
+        spec = build_chart_spec(timeline_data, current_date)
+        store_chart_bytes(filename, render_chart_bytes(spec, chart_format), spec)
+        logger.info(f"Rendered timeline chart {filename} into memory")
+    
+    return filename
+
+
+def render_chart_file(spec: Dict[str, Any], chart_path: str) -> str:
+    """
+    Render a chart spec to chart_path and register the file with the chart store.
+    
+    The format follows the file extension: SVG charts are rendered in the calling
+    thread, PNG charts through the chart render service when one is configured.
+    
+    Args:
+        spec: Chart description from build_chart_spec
+        chart_path: Destination path of the chart
+    
+    Returns:
+        String: Path to the generated chart file
+    """
+    chart_format = os.path.splitext(chart_path)[1].lstrip('.')
+    _write_atomically(chart_path, render_chart_bytes(spec, chart_format))
+    logger.info(f"Successfully generated timeline chart at {chart_path}")
+    
+    store = get_chart_store()
+    if store is not None:
+        store.record_write(chart_path, spec)
+    return chart_path
+
+
+def _write_atomically(chart_path: str, data: bytes) -> None:
+    """
+    Write chart bytes so that readers never see a partially written chart.
+    
+    Concurrent requests for the same chart each write their own temporary file
+    and atomically move it into place.
+    """
+    temp_path = f"{chart_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, chart_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+# SVG chart geometry, matching the 1000x400 pixel matplotlib figure
+SVG_WIDTH = 1000
+SVG_HEIGHT = 400
+SVG_PLOT_LEFT = 40
+SVG_PLOT_RIGHT = 960
+SVG_PLOT_TOP = 70
+SVG_PLOT_BOTTOM = 310
+
+SVG_DOCUMENT = (
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+    'width="{width}" height="{height}" role="img" aria-label="Processing Timeline Chart" '
+    'font-family="DejaVu Sans, Arial, sans-serif" font-weight="bold">'
+    '<rect width="{width}" height="{height}" fill="#ffffff"/>{body}</svg>'
+)
+SVG_SPAN = ('<rect x="{x:.1f}" y="{top}" width="{width:.1f}" height="{height}" '
+            'fill="' + LIGHT_BLUE + '" fill-opacity="0.2"/>')
+SVG_AXIS_LINE = ('<line x1="{x1:.1f}" y1="{y:.1f}" x2="{x2:.1f}" y2="{y:.1f}" '
+                 'stroke="' + LIGHT_GRAY + '" stroke-width="2.8"/>')
+SVG_TODAY_LINE = ('<line x1="{x:.1f}" y1="{top}" x2="{x:.1f}" y2="{bottom}" stroke="' + RED + '" '
+                  'stroke-width="2.8" stroke-dasharray="10 4"/>')
+SVG_MARKER = '<circle cx="{x:.1f}" cy="{y:.1f}" r="8" fill="{color}"/>'
+SVG_LABEL = ('<rect x="{box_x:.1f}" y="{box_y:.1f}" width="{box_width:.1f}" height="27" rx="6" '
+             'fill="#ffffff" fill-opacity="0.8" stroke="' + LIGHT_GRAY + '"/>'
+             '<text x="{x:.1f}" y="{y:.1f}" font-size="13" text-anchor="middle" '
+             'dominant-baseline="central">{text}</text>')
+SVG_TICK = ('<line x1="{x:.1f}" y1="{bottom}" x2="{x:.1f}" y2="{tick_bottom}" stroke="' + DARK_BLUE + '"/>'
+            '<text x="{x:.1f}" y="{label_y}" font-size="12" font-weight="normal" fill="' + DARK_BLUE + '" '
+            'text-anchor="end" transform="rotate(-45 {x:.1f} {label_y})">{text}</text>')
+SVG_SPINE = ('<line x1="{left}" y1="{bottom}" x2="{right}" y2="{bottom}" '
+             'stroke="' + LIGHT_GRAY + '"/>')
+SVG_TITLE = ('<text x="{x}" font-size="19" fill="' + DARK_BLUE + '" text-anchor="middle">'
+             '<tspan x="{x}" y="26">{line1}</tspan><tspan x="{x}" y="50">{line2}</tspan></text>')
+SVG_FOOTER_TEXT = '<text x="{x}" y="{y}" font-size="13" fill="{color}" text-anchor="middle">{text}</text>'
+
+
+def _svg_month_ticks(start_ordinal: int, end_ordinal: int) -> List[datetime.date]:
+    """Return the first day of every month between two date ordinals."""
+    start = datetime.date.fromordinal(start_ordinal)
+    year, month = start.year, start.month
+    if start.day != 1:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    ticks = []
+    while True:
+        tick = datetime.date(year, month, 1)
+        if tick.toordinal() > end_ordinal:
+            return ticks
+        ticks.append(tick)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def render_chart_svg(spec: Dict[str, Any]) -> str:
+    """
+    Render a chart spec as an SVG document.
+    
+    Draws the same chart as encode_chart_png (markers, processing span, today line,
+    labels, month ticks, title and status texts) from string templates, without
+    matplotlib.
+    
+    Args:
+        spec: Chart description from build_chart_spec
+    
+    Returns:
+        SVG markup
+    """
+    dates = [datetime.date.fromisoformat(spec[key])
+             for key in ("filing_date", "earliest_date", "median_date", "latest_date", "today")]
+    ordinals = [date.toordinal() for date in dates]
+    filing_x, earliest_x, median_x, latest_x, today_x = ordinals
+    
+    # Same date range, padding and margins as the matplotlib chart
+    min_x = min(ordinals) - 15
+    max_x = max(ordinals) + 15
+    margin = (max_x - min_x) * 0.05
+    range_start = min_x - margin
+    range_end = max_x + margin
+    scale = (SVG_PLOT_RIGHT - SVG_PLOT_LEFT) / (range_end - range_start)
+    
+    def x_pos(ordinal: float) -> float:
+        return SVG_PLOT_LEFT + (ordinal - range_start) * scale
+    
+    def y_pos(value: float) -> float:
+        return SVG_PLOT_BOTTOM - (value - 0.85) / 0.3 * (SVG_PLOT_BOTTOM - SVG_PLOT_TOP)
+    
+    axis_y = y_pos(1.0)
+    parts = [
+        SVG_SPAN.format(x=x_pos(earliest_x), top=SVG_PLOT_TOP,
+                        width=(latest_x - earliest_x) * scale, height=SVG_PLOT_BOTTOM - SVG_PLOT_TOP),
+        SVG_AXIS_LINE.format(x1=x_pos(min_x), x2=x_pos(max_x), y=axis_y),
+        SVG_TODAY_LINE.format(x=x_pos(today_x), top=SVG_PLOT_TOP, bottom=SVG_PLOT_BOTTOM)
+    ]
+    
+    parts.append(SVG_MARKER.format(x=x_pos(filing_x), y=axis_y, color=DARK_BLUE))
+    for ordinal in (earliest_x, median_x, latest_x):
+        parts.append(SVG_MARKER.format(x=x_pos(ordinal), y=axis_y, color=PRIMARY_BLUE))
+    
+    for (prefix, label_y), date, ordinal in zip(ChartTemplate.LABELS, dates, ordinals):
+        text = f"{prefix}: {date.strftime('%b %d, %Y')}"
+        box_width = len(text) * 8 + 14
+        x = x_pos(ordinal)
+        y = y_pos(label_y)
+        parts.append(SVG_LABEL.format(box_x=x - box_width / 2, box_y=y - 13.5, box_width=box_width,
+                                      x=x, y=y, text=escape(text)))
+    
+    for tick in _svg_month_ticks(int(range_start) + 1, int(range_end)):
+        parts.append(SVG_TICK.format(x=x_pos(tick.toordinal()), bottom=SVG_PLOT_BOTTOM,
+                                     tick_bottom=SVG_PLOT_BOTTOM + 5, label_y=SVG_PLOT_BOTTOM + 16,
+                                     text=tick.strftime('%b %Y')))
+    parts.append(SVG_SPINE.format(left=SVG_PLOT_LEFT, right=SVG_PLOT_RIGHT, bottom=SVG_PLOT_BOTTOM))
+    
+    title_lines = spec["title"].split("\n", 1) + [""]
+    parts.append(SVG_TITLE.format(x=SVG_WIDTH // 2, line1=escape(title_lines[0]), line2=escape(title_lines[1])))
+    
+    if spec["status_text"]:
+        parts.append(SVG_FOOTER_TEXT.format(x=SVG_WIDTH // 2, y=SVG_HEIGHT - 8, color="#000000",
+                                            text=escape(spec["status_text"])))
+    if spec["inquiry_text"]:
+        parts.append(SVG_FOOTER_TEXT.format(x=SVG_WIDTH // 2, y=SVG_HEIGHT - 24, color=GREEN,
+                                            text=escape(spec["inquiry_text"])))
+    
+    return SVG_DOCUMENT.format(width=SVG_WIDTH, height=SVG_HEIGHT, body="".join(parts))
+
+
+def timeline_svg(timeline_data: Timeline) -> str:
+    """
+    Render a timeline directly to SVG markup, e.g. for inlining in a page.
+    
+    Args:
+        timeline_data: Timeline to visualize
+    
+    Returns:
+        SVG markup
+    """
+    return render_chart_svg(build_chart_spec(timeline_data))
@@ -143,4 +143,162 @@ document.addEventListener('DOMContentLoaded', function() {
             this.parentNode.innerHTML += '<div class="alert alert-warning mt-3"><i class="fas fa-exclamation-triangle me-2"></i> Chart could not be loaded. Please try refreshing the page.</div>';
         });
     }
-});
\ No newline at end of file
+    
+    // Deferred timeline chart: wait for the background render to finish
+    const chartPlaceholder = document.getElementById('timeline-chart-placeholder');
+    if (chartPlaceholder) {
+        pollChartStatus(chartPlaceholder, 0);
+    }
+    
+    // Client-side timeline chart
+    const clientChart = document.getElementById('timeline-chart-client');
+    if (clientChart) {
+        renderTimelineChart(clientChart, JSON.parse(clientChart.dataset.chart));
+    }
+});
+
+// Chart colors - USCIS website colors, matching the server-side charts
+const CHART_COLORS = {
+    primaryBlue: '#0071bc',
+    darkBlue: '#205493',
+    lightBlue: '#02bfe7',
+    lightGray: '#d6d7d9',
+    red: '#e31c3d',
+    green: '#2e8540'
+};
+
+/**
+ * Draw a timeline chart as SVG from the data returned by /api/timeline-chart-data
+ * @param {HTMLElement} container - Element the chart is drawn into
+ * @param {Object} chart - Chart data with milestones, span, today, range and status texts
+ */
+function renderTimelineChart(container, chart) {
+    const svgNS = 'http://www.w3.org/2000/svg';
+    const width = 1000, height = 400;
+    const plot = { left: 40, right: 960, top: 70, bottom: 310 };
+    const dayMs = 24 * 60 * 60 * 1000;
+    
+    const toDay = iso => Date.parse(iso + 'T00:00:00Z') / dayMs;
+    const formatDate = (iso, options) => new Date(iso + 'T00:00:00Z')
+        .toLocaleDateString('en-US', Object.assign({ timeZone: 'UTC' }, options));
+    
+    // Same 5% horizontal margin as the server-side charts
+    const rangeStart = toDay(chart.range.start), rangeEnd = toDay(chart.range.end);
+    const margin = (rangeEnd - rangeStart) * 0.05;
+    const start = rangeStart - margin, end = rangeEnd + margin;
+    const x = day => plot.left + (day - start) * (plot.right - plot.left) / (end - start);
+    const axisY = (plot.top + plot.bottom) / 2;
+    const labelStep = (plot.bottom - plot.top) / 3;
+    
+    const svg = document.createElementNS(svgNS, 'svg');
+    svg.setAttribute('viewBox', `0 0 ${width} ${height}`);
+    svg.setAttribute('role', 'img');
+    svg.setAttribute('aria-label', 'Processing Timeline Chart');
+    svg.setAttribute('font-family', 'DejaVu Sans, Arial, sans-serif');
+    svg.setAttribute('font-weight', 'bold');
+    svg.style.maxWidth = '100%';
+    svg.style.height = 'auto';
+    
+    function add(tag, attributes, text) {
+        const element = document.createElementNS(svgNS, tag);
+        Object.keys(attributes).forEach(name => element.setAttribute(name, attributes[name]));
+        if (text !== undefined) {
+            element.textContent = text;
+        }
+        svg.appendChild(element);
+        return element;
+    }
+    
+    // Processing timeframe span, axis line and current date line
+    const spanStart = x(toDay(chart.span.start));
+    add('rect', { x: spanStart, y: plot.top, width: x(toDay(chart.span.end)) - spanStart,
+                  height: plot.bottom - plot.top, fill: CHART_COLORS.lightBlue, 'fill-opacity': 0.2 });
+    add('line', { x1: x(rangeStart), y1: axisY, x2: x(rangeEnd), y2: axisY,
+                  stroke: CHART_COLORS.lightGray, 'stroke-width': 2.8 });
+    const todayX = x(toDay(chart.today));
+    add('line', { x1: todayX, y1: plot.top, x2: todayX, y2: plot.bottom, stroke: CHART_COLORS.red,
+                  'stroke-width': 2.8, 'stroke-dasharray': '10 4' });
+    
+    // Milestone markers and labels
+    chart.milestones.forEach(milestone => {
+        const markerX = x(toDay(milestone.date));
+        if (milestone.kind !== 'today') {
+            add('circle', { cx: markerX, cy: axisY, r: 8,
+                            fill: milestone.kind === 'filing' ? CHART_COLORS.darkBlue : CHART_COLORS.primaryBlue });
+        }
+        
+        const text = `${milestone.label}: ${formatDate(milestone.date, { month: 'short', day: '2-digit', year: 'numeric' })}`;
+        const labelY = axisY - milestone.offset * labelStep;
+        const boxWidth = text.length * 8 + 14;
+        add('rect', { x: markerX - boxWidth / 2, y: labelY - 13.5, width: boxWidth, height: 27, rx: 6,
+                      fill: '#ffffff', 'fill-opacity': 0.8, stroke: CHART_COLORS.lightGray });
+        add('text', { x: markerX, y: labelY, 'font-size': 13, 'text-anchor': 'middle',
+                      'dominant-baseline': 'central' }, text);
+    });
+    
+    // Month ticks along the bottom axis
+    const first = new Date(Math.ceil(start) * dayMs);
+    let month = first.getUTCMonth() + (first.getUTCDate() === 1 ? 0 : 1);
+    for (let tickDay = Date.UTC(first.getUTCFullYear(), month, 1) / dayMs; tickDay <= end;
+         tickDay = Date.UTC(first.getUTCFullYear(), ++month, 1) / dayMs) {
+        const tick = new Date(tickDay * dayMs);
+        const tickX = x(tickDay);
+        const labelY = plot.bottom + 16;
+        add('line', { x1: tickX, y1: plot.bottom, x2: tickX, y2: plot.bottom + 5, stroke: CHART_COLORS.darkBlue });
+        add('text', { x: tickX, y: labelY, 'font-size': 12, 'font-weight': 'normal', fill: CHART_COLORS.darkBlue,
+                      'text-anchor': 'end', transform: `rotate(-45 ${tickX} ${labelY})` },
+            tick.toLocaleDateString('en-US', { timeZone: 'UTC', month: 'short', year: 'numeric' }));
+    }
+    add('line', { x1: plot.left, y1: plot.bottom, x2: plot.right, y2: plot.bottom, stroke: CHART_COLORS.lightGray });
+    
+    // Title and status texts
+    chart.title.forEach((line, index) => {
+        add('text', { x: width / 2, y: 26 + index * 24, 'font-size': 19, fill: CHART_COLORS.darkBlue,
+                      'text-anchor': 'middle' }, line);
+    });
+    if (chart.status_text) {
+        add('text', { x: width / 2, y: height - 8, 'font-size': 13, 'text-anchor': 'middle' }, chart.status_text);
+    }
+    if (chart.inquiry_text) {
+        add('text', { x: width / 2, y: height - 24, 'font-size': 13, fill: CHART_COLORS.green,
+                      'text-anchor': 'middle' }, chart.inquiry_text);
+    }
+    
+    container.innerHTML = '';
+    container.appendChild(svg);
+}
+
+/**
+ * Long-poll the chart status endpoint and show the chart once it is ready
+ * @param {HTMLElement} placeholder - Placeholder element with data-status-url and data-chart-url
+ * @param {number} failures - Number of consecutive failed status requests
+ */
+function pollChartStatus(placeholder, failures) {
+    const chartError = '<div class="alert alert-warning mt-3"><i class="fas fa-exclamation-triangle me-2"></i> Chart could not be generated. Please try again or contact support.</div>';
+    
+    fetch(placeholder.dataset.statusUrl + '?wait=10')
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'pending') {
+                pollChartStatus(placeholder, 0);
+            } else if (data.status === 'ready') {
+                placeholder.classList.remove('py-5');
+                placeholder.innerHTML = '<img id="timeline-chart" class="img-fluid border rounded shadow-sm" alt="Processing Timeline Chart">';
+                const chart = placeholder.querySelector('img');
+                chart.addEventListener('error', function() {
+                    placeholder.innerHTML = chartError;
+                });
+                chart.src = data.chart_url || placeholder.dataset.chartUrl;
+            } else {
+                placeholder.innerHTML = chartError;
+            }
+        })
+        .catch(() => {
+            // Retry transient errors a few times before giving up
+            if (failures < 3) {
+                setTimeout(() => pollChartStatus(placeholder, failures + 1), 2000);
+            } else {
+                placeholder.innerHTML = chartError;
+            }
+        });
+}
\ No newline at end of file